@@ -0,0 +1,62 @@
+from spatial import SpatialGrid
+
+
+class GreedyAssigner:
+    """Раз в every шагов раздаёт свободным козам свободную капусту.
+
+    Для каждого объекта меньшей стороны берутся candidates ближайших с другой
+    стороны, все пары сортируются по расстоянию, и пара принимается, если ни
+    коза, ни капуста ещё не заняты. Так за одной капустой идёт одна коза,
+    а не всё стадо.
+    """
+
+    def __init__(self, every=1, candidates=8):
+        self.every = every
+        self.candidates = candidates
+
+    def candidate_pairs(self, garden, goats, cabbages):
+        pairs = []
+        if len(goats) <= len(cabbages):
+            for goat in goats:
+                for distance, cabbage in garden.cabbage_index.nearest_k(goat.x, goat.y, self.candidates, garden.cabbage_is_free):
+                    pairs.append((distance, goat.id, cabbage.id, goat, cabbage))
+            return pairs
+
+        goat_index = SpatialGrid(max(32, int((garden.width * garden.height / len(goats)) ** 0.5)))
+        goat_index.rebuild(goats)
+        for cabbage in cabbages:
+            for distance, goat in goat_index.nearest_k(cabbage.x, cabbage.y, self.candidates):
+                pairs.append((distance, goat.id, cabbage.id, goat, cabbage))
+        return pairs
+
+    def assign(self, garden):
+        goats = [goat for goat in garden.goats if not goat.eating and goat.size > 5]
+        cabbages = [cabbage for cabbage in garden.cabbages if garden.cabbage_is_free(cabbage)]
+        if not goats:
+            return
+
+        pairs = self.candidate_pairs(garden, goats, cabbages)
+        pairs.sort(key=lambda pair: pair[:3])
+
+        for goat in goats:
+            goat.chase_target = None
+
+        assigned_goats = set()
+        assigned_cabbages = set()
+        for _, goat_id, cabbage_id, goat, cabbage in pairs:
+            if goat_id in assigned_goats or cabbage_id in assigned_cabbages:
+                continue
+            assigned_goats.add(goat_id)
+            assigned_cabbages.add(cabbage_id)
+            goat.chase_target = cabbage
+            cabbage.reserved_by = goat
+
+        # Коза без пары ищет сама, только если осталась ничья капуста
+        leftover = len(assigned_cabbages) < len(cabbages)
+        for goat in goats:
+            goat.needs_search = goat.chase_target is None and leftover
+
+
+ASSIGNERS = {
+    "greedy": GreedyAssigner,
+}
@@ -0,0 +1,212 @@
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+from garden import Cabbage, FixedStepClock, RULES, DEFAULT_CONFIGS
+
+CASES = ("find_closest_cabbage", "find_closest_sparse", "eat_cabbage", "generate_new_cabbage", "update_frame", "hover", "paint")
+SIZES = (10, 100, 1000, 5000, 10000, 100000)
+
+# Сколько коз берётся для замеров по одной козе
+SAMPLE = 1000
+
+# Сколько кочанов оставляет find_closest_sparse: почти всё съедено, коз много
+SPARSE_CABBAGES = 4
+
+
+class SteppingClock(FixedStepClock):
+    """Часы, которые на каждый update_frame дают ровно один шаг."""
+
+    def advance(self, now=None):
+        return 1
+
+
+def measure(function, repeat, target):
+    """Время одного вызова function: медиана и минимум по repeat замерам."""
+    start = time.perf_counter()
+    function()
+    first = time.perf_counter() - start
+    # Вызовов в замере столько, чтобы он шёл около target секунд
+    number = max(1, int(target / max(first, 1e-9)))
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    return {"median": statistics.median(times), "min": min(times), "number": number}
+
+
+def make_game(rules, size, seed, render_mode, config_dir):
+    """Окно нужного варианта с size козами и size кочанами; рисует в память, на экран не выходит."""
+    if rules == "prac_2":
+        import prac_2 as viewer
+    else:
+        import prac_3 as viewer
+
+    config = dict(DEFAULT_CONFIGS[rules])
+    # Качество закреплено: иначе окно само упростит рисование посреди замеров
+    config.update(num_goats=size, num_cabbages=size, seed=seed, render_mode=render_mode, quality=0)
+    config_path = os.path.join(config_dir, f"{rules}_{size}.json")
+    with open(config_path, 'w') as file:
+        json.dump(config, file)
+
+    # Абсолютный путь заменяет папку скрипта при os.path.join
+    game = viewer.TheGame(config_path)
+    game.timer.stop()
+    game.clock = SteppingClock()
+    return game
+
+
+def run_case(case, game, repeat, target, rng):
+    garden = game.garden
+    goats = rng.sample(garden.goats, min(SAMPLE, len(garden.goats)))
+
+    if case == "find_closest_cabbage":
+        def function():
+            for goat in goats:
+                garden.find_closest_cabbage(goat)
+        result = measure(function, repeat, target)
+        per = len(goats)
+    elif case == "find_closest_sparse":
+        # Сетка нарезана под size кочанов, а осталось несколько: поиск не должен быть медленнее обхода списка
+        for cabbage in garden.cabbages[SPARSE_CABBAGES:]:
+            cabbage.size = 0
+        garden.tick()
+
+        def function():
+            for goat in goats:
+                garden.find_closest_cabbage(goat)
+        result = measure(function, repeat, target)
+        per = len(goats)
+    elif case == "eat_cabbage":
+        # Кочаны вне огорода и такие большие, что не кончатся за замер
+        pairs = [(goat, Cabbage(goat.x, goat.y, 1e12)) for goat in goats]
+
+        def function():
+            for goat, cabbage in pairs:
+                garden.eat_cabbage(goat, cabbage)
+        result = measure(function, repeat, target)
+        per = len(pairs)
+    elif case == "generate_new_cabbage":
+        result = measure(garden.generate_new_cabbage, repeat, target)
+        per = 1
+    elif case == "update_frame":
+        result = measure(game.update_frame, repeat, target)
+        per = 1
+    elif case == "hover":
+        # Половина точек попадает в кочаны и коз, половина в случайные места поля
+        points = [(item.x + item.size / 2, item.y + item.size / 2) for item in rng.sample(garden.cabbages + garden.goats, min(50, garden.cabbage_count + garden.goat_count))]
+        points += [(rng.uniform(0, garden.width), rng.uniform(0, garden.height)) for _ in range(len(points))]
+        position = iter(())
+
+        def function():
+            nonlocal position
+            game.mouse_position = next(position, None)
+            if game.mouse_position is None:
+                position = iter(points)
+                game.mouse_position = next(position)
+            game.refresh_hover()
+        result = measure(function, repeat, target)
+        per = 1
+    elif case == "paint":
+        from PyQt6.QtGui import QImage
+        image = QImage(game.width(), game.height(), QImage.Format.Format_ARGB32_Premultiplied)
+        result = measure(lambda: game.render(image), repeat, target)
+        result["renderer"] = "raster" if game.field_renderer() is game.raster else "vector"
+        per = 1
+
+    result["median"] /= per
+    result["min"] /= per
+    return result
+
+
+def revision():
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return output.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, 'r') as file:
+        baseline = {(row["rules"], row["size"], row["case"]): row for row in json.load(file)["results"]}
+
+    print(f"\nсравнение с {baseline_path}: было / стало, больше 1 значит быстрее")
+    for row in results:
+        old = baseline.get((row["rules"], row["size"], row["case"]))
+        if old:
+            print(f"{row['case']:>22} {row['rules']} {row['size']:>7}: "
+                  f"{old['median'] * 1e6:12.1f} us -> {row['median'] * 1e6:12.1f} us  x{old['median'] / row['median']:.2f}")
+
+
+def print_table(results, rules_list):
+    by_key = {(row["case"], row["size"], row["rules"]): row for row in results}
+    print(f"{'':>22} {'size':>7}" + "".join(f"{rules:>16}" for rules in rules_list))
+    for case in dict.fromkeys(row["case"] for row in results):
+        for size in dict.fromkeys(row["size"] for row in results):
+            cells = [by_key.get((case, size, rules)) for rules in rules_list]
+            if any(cells):
+                print(f"{case:>22} {size:>7}" + "".join(
+                    f"{cell['median'] * 1e6:13.1f} us" if cell else f"{'-':>16}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры горячих мест огорода и окна")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="число коз и кочанов")
+    parser.add_argument("--rules", nargs="+", choices=sorted(RULES), default=sorted(RULES))
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--target", type=float, default=0.2, help="примерная длина одного замера в секундах")
+    parser.add_argument("--render-mode", choices=["auto", "vector", "raster"], default="auto")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench.json")
+    parser.add_argument("--compare", default=None, help="прошлый bench.json для сравнения")
+    args = parser.parse_args()
+
+    # Окна рисуют в память и не появляются на экране
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication(sys.argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as config_dir:
+        for size in args.sizes:
+            for rules in args.rules:
+                for case in args.cases:
+                    # Каждый замер на свежем огороде: прошлые замеры его меняют
+                    game = make_game(rules, size, args.seed, args.render_mode, config_dir)
+                    result = run_case(case, game, args.repeat, args.target, random.Random(args.seed))
+                    game.close()
+                    results.append({"case": case, "rules": rules, "size": size, **result})
+                    print(f"{case:>22} {rules} {size:>7}: {result['median'] * 1e6:12.1f} us", file=sys.stderr)
+
+    report = {
+        "revision": revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "render_mode": args.render_mode,
+        "results": results,
+    }
+    with open(args.out, 'w') as file:
+        json.dump(report, file, indent=4)
+
+    print_table(results, args.rules)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
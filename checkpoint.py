@@ -0,0 +1,209 @@
+import os
+import json
+
+import numpy as np
+
+from garden import Garden, Goat, Cabbage
+from spatial import SpatialGrid
+
+FORMAT_VERSION = 1
+
+
+def save(world, path):
+    """Сохранить Garden или ArrayGarden в .npz: по массиву на поле плюс meta в JSON.
+
+    Файл пишется рядом и подменяется целиком, так что падение посреди
+    записи не портит прошлую точку сохранения.
+    """
+    if hasattr(world, "goat"):
+        meta, arrays = _array_garden_state(world)
+    else:
+        meta, arrays = _garden_state(world)
+    meta["version"] = FORMAT_VERSION
+
+    temporary = path + ".tmp"
+    with open(temporary, 'wb') as file:
+        np.savez(file, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(temporary, path)
+
+
+def load(path, cls=None, **options):
+    """Огород из сохранения.
+
+    Без cls класс берётся по движку в файле: Garden или ArrayGarden. С cls
+    сохранение собирается в этот класс, если движок подходит: Garden и
+    EventGarden читают состояние объектов, ArrayGarden и TiledGarden -
+    массивов; options уходят в конструктор, например workers для TiledGarden.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        if meta["version"] != FORMAT_VERSION:
+            raise ValueError(f"неизвестная версия сохранения: {meta['version']}")
+        arrays = {name: data[name] for name in data.files if name != "meta"}
+
+    if meta["engine"] == "arrays":
+        from garden_arrays import ArrayGarden
+        base = ArrayGarden
+    else:
+        base = Garden
+    if cls is None:
+        cls = base
+    elif not issubclass(cls, base):
+        raise ValueError(f"сохранение {base.__name__} не читается как {cls.__name__}")
+
+    if base is Garden:
+        return _garden_from_state(meta, arrays, cls, **options)
+    return _array_garden_from_state(meta, arrays, cls, **options)
+
+
+def _world_meta(world, engine):
+    return {
+        "engine": engine,
+        "width": world.width,
+        "height": world.height,
+        "rules": world.rules,
+        "cabbage_generation_choices": world.cabbage_generation_choices,
+        "tick_count": world.tick_count,
+        "food_eaten": world.food_eaten,
+    }
+
+
+def _ids(items, attribute):
+    # Ссылка на объект хранится как его id, пустая ссылка как -1
+    return np.fromiter(((getattr(item, attribute).id if getattr(item, attribute) is not None else -1) for item in items),
+                       np.int64, len(items))
+
+
+def _column(items, attribute, dtype):
+    return np.fromiter((getattr(item, attribute) for item in items), dtype, len(items))
+
+
+def _garden_state(garden):
+    from assignment import ASSIGNERS
+
+    meta = _world_meta(garden, "objects")
+    meta["use_index"] = garden.use_index
+    meta["cache_targets"] = garden.cache_targets
+    meta["cell_size"] = garden.cabbage_index.cell_size
+    meta["assigner"] = None
+    if garden.assigner is not None:
+        method = next(name for name, cls in ASSIGNERS.items() if isinstance(garden.assigner, cls))
+        meta["assigner"] = {"method": method, **vars(garden.assigner)}
+
+    version, internal, gauss_next = garden.rng.getstate()
+    meta["rng_version"] = version
+    meta["rng_gauss_next"] = gauss_next
+
+    # По правилам prac_2 коза ещё шаг держит съеденную капусту, которой уже нет в списке:
+    # такие пишутся после живых и в список при загрузке не попадают
+    goats = garden.goats
+    cabbages = list(garden.cabbages)
+    meta["cabbage_count"] = len(cabbages)
+    known = {cabbage.id for cabbage in cabbages}
+    for goat in goats:
+        for target in (goat.target_cabbage, goat.chase_target):
+            if target is not None and target.id not in known:
+                known.add(target.id)
+                cabbages.append(target)
+
+    arrays = {"rng_state": np.array(internal, np.uint32)}
+    for name, dtype in (("id", np.int64), ("x", np.float64), ("y", np.float64), ("size", np.float64),
+                        ("nutrition", np.float64), ("being_eaten", np.bool_)):
+        arrays["cabbage_" + name] = _column(cabbages, name, dtype)
+    arrays["cabbage_reserved_by"] = _ids(cabbages, "reserved_by")
+
+    for name, dtype in (("id", np.int64), ("x", np.float64), ("y", np.float64), ("prev_x", np.float64),
+                        ("prev_y", np.float64), ("size", np.float64), ("speed", np.float64),
+                        ("eating_speed", np.float64), ("stamina", np.float64), ("fertility", np.float64),
+                        ("eating", np.bool_), ("moving", np.bool_), ("needs_search", np.bool_),
+                        ("steps_in_direction", np.int64)):
+        arrays["goat_" + name] = _column(goats, name, dtype)
+    arrays["goat_target_cabbage"] = _ids(goats, "target_cabbage")
+    arrays["goat_chase_target"] = _ids(goats, "chase_target")
+    arrays["goat_wander_direction"] = np.array([goat.wander_direction for goat in goats], np.int8).reshape(-1, 2)
+    return meta, arrays
+
+
+def _garden_from_state(meta, arrays, cls=Garden, **options):
+    from assignment import ASSIGNERS
+
+    assigner = None
+    if meta["assigner"] is not None:
+        settings = dict(meta["assigner"])
+        assigner = ASSIGNERS[settings.pop("method")](**settings)
+
+    garden = cls(meta["width"], meta["height"], 0, 0, meta["cabbage_generation_choices"], rules=meta["rules"],
+                    use_index=meta["use_index"], cache_targets=meta["cache_targets"], assigner=assigner, **options)
+    garden.tick_count = meta["tick_count"]
+    garden.food_eaten = meta["food_eaten"]
+    garden.rng.setstate((meta["rng_version"], tuple(int(value) for value in arrays["rng_state"]), meta["rng_gauss_next"]))
+
+    # Новые id выдаются по порядку сохранённых, так что порядок внутри списков и ничьи в поиске прежние
+    cabbages = [
+        Cabbage(x, y, size)
+        for x, y, size in zip(arrays["cabbage_x"].tolist(), arrays["cabbage_y"].tolist(), arrays["cabbage_size"].tolist())
+    ]
+    for cabbage, nutrition, being_eaten in zip(cabbages, arrays["cabbage_nutrition"].tolist(), arrays["cabbage_being_eaten"].tolist()):
+        cabbage.nutrition = nutrition
+        cabbage.being_eaten = being_eaten
+    cabbage_by_id = dict(zip(arrays["cabbage_id"].tolist(), cabbages))
+
+    columns = {name: arrays["goat_" + name].tolist() for name in (
+        "x", "y", "prev_x", "prev_y", "size", "speed", "eating_speed", "stamina", "fertility", "eating", "moving",
+        "needs_search", "steps_in_direction", "target_cabbage", "chase_target")}
+    directions = arrays["goat_wander_direction"].tolist()
+    goats = []
+    for index, direction in enumerate(directions):
+        goat = Goat(columns["x"][index], columns["y"][index], columns["speed"][index], columns["eating_speed"][index],
+                    columns["fertility"][index], direction, size=columns["size"][index], stamina=columns["stamina"][index])
+        goat.prev_x = columns["prev_x"][index]
+        goat.prev_y = columns["prev_y"][index]
+        goat.eating = columns["eating"][index]
+        goat.moving = columns["moving"][index]
+        goat.needs_search = columns["needs_search"][index]
+        goat.steps_in_direction = columns["steps_in_direction"][index]
+        goat.target_cabbage = cabbage_by_id.get(columns["target_cabbage"][index])
+        goat.chase_target = cabbage_by_id.get(columns["chase_target"][index])
+        goats.append(goat)
+    goat_by_id = dict(zip(arrays["goat_id"].tolist(), goats))
+
+    for cabbage, reserved_by in zip(cabbages, arrays["cabbage_reserved_by"].tolist()):
+        cabbage.reserved_by = goat_by_id.get(reserved_by)
+
+    cabbages = cabbages[:meta["cabbage_count"]]
+    garden.cabbages = cabbages
+    garden.goats = goats
+    garden.cabbages_by_id = {cabbage.id: cabbage for cabbage in cabbages}
+    garden.goats_by_id = {goat.id: goat for goat in goats}
+    cell_size = meta["cell_size"]
+    garden.cabbage_index = SpatialGrid(cell_size)
+    garden.cabbage_index.rebuild(cabbages)
+    garden.grid_cabbages = len(cabbages)
+    garden.goat_index = SpatialGrid(cell_size)
+    garden.released_cabbages = SpatialGrid(cell_size)
+    garden.max_cabbage_size = max((cabbage.size for cabbage in cabbages), default=0)
+    return garden
+
+
+def _array_garden_state(world):
+    meta = _world_meta(world, "arrays")
+    meta["rng_state"] = world.rng.bit_generator.state
+    arrays = {"goat_" + name: column for name, column in world.goat.items()}
+    arrays.update({"cabbage_" + name: column for name, column in world.cabbage.items()})
+    return meta, arrays
+
+
+def _array_garden_from_state(meta, arrays, cls, **options):
+    from garden_arrays import GOAT_FIELDS, CABBAGE_FIELDS
+
+    if hasattr(cls, "default_halo"):
+        # Огород собирается пустым, а полоса плиток должна быть под сохранённую капусту
+        options.setdefault("halo", cls.default_halo(meta["width"], meta["height"], len(arrays["cabbage_x"])))
+    world = cls(meta["width"], meta["height"], 0, 0, meta["cabbage_generation_choices"], rules=meta["rules"], **options)
+    world.tick_count = meta["tick_count"]
+    world.food_eaten = meta["food_eaten"]
+    world.rng.bit_generator.state = meta["rng_state"]
+    # Через _append: у TiledGarden столбцы лежат в общей памяти
+    world._append(world.goat, GOAT_FIELDS, {name: arrays["goat_" + name] for name, _ in GOAT_FIELDS})
+    world._append(world.cabbage, CABBAGE_FIELDS, {name: arrays["cabbage_" + name] for name, _ in CABBAGE_FIELDS})
+    return world
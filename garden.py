@@ -0,0 +1,1015 @@
+import sys
+import random
+import json
+import os
+import time
+import argparse
+import itertools
+
+from spatial import SpatialGrid
+
+# Шаг симуляции в миллисекундах
+FRAME_MS = 60
+
+# Сколько шагов симуляции можно догнать за один кадр, остальное отставание отбрасывается
+MAX_CATCH_UP = 5
+
+# Ускорения времени; None - "max": шагов столько, сколько влезет в бюджет кадра
+WARP_LEVELS = (1, 10, 100, None)
+# Сколько мс кадра в ускоренном режиме можно тратить на шаги, остальное остаётся на рисование
+WARP_BUDGET_MS = 40
+
+# Во сколько раз должно измениться число капусты, чтобы сетки нарезались заново
+REGRID_FACTOR = 4
+
+# Отличия правил между лабораторными
+RULES = {
+    "prac_2": {
+        "stamina_decay": 0.01,
+        "cabbage_interval": 1000,
+        "bite_first": True,
+    },
+    "prac_3": {
+        "stamina_decay": 0.5,
+        "cabbage_interval": 3000,
+        "bite_first": False,
+    },
+}
+
+DEFAULT_CONFIGS = {
+    "prac_2": {
+        "window_width": 800,
+        "window_height": 800,
+        "num_goats": 10,
+        "num_cabbages": 20,
+        "cabbage_generation_choices": [2, 3, 4, 8]
+    },
+    "prac_3": {
+        "window_width": 1500,
+        "window_height": 800,
+        "num_goats": 10,
+        "num_cabbages": 20,
+        "cabbage_generation_choices": [1, 2, 3, 4]
+    },
+}
+
+
+class FixedStepClock:
+    """Копит реальное время и выдаёт его целыми шагами симуляции по FRAME_MS мс.
+
+    Если кадр затянулся, за следующий выполняется несколько шагов, но не больше
+    max_steps. alpha показывает, какая доля следующего шага уже прошла.
+    speed ускоряет время: за секунду копится speed секунд симуляции.
+    """
+
+    def __init__(self, step_ms=FRAME_MS, max_steps=MAX_CATCH_UP):
+        self.step_seconds = step_ms / 1000
+        self.max_steps = max_steps
+        self.speed = 1
+        self.lag = 0.0
+        self.last_time = None
+
+    def reset(self):
+        # После паузы время, пока игра стояла, не догоняется
+        self.last_time = None
+
+    def advance(self, now=None):
+        if now is None:
+            now = time.perf_counter()
+        if self.last_time is not None:
+            self.lag += (now - self.last_time) * self.speed
+        self.last_time = now
+
+        steps = min(int(self.lag // self.step_seconds), self.max_steps * self.speed)
+        self.lag -= steps * self.step_seconds
+        if self.lag >= self.step_seconds:
+            self.lag %= self.step_seconds
+        return steps
+
+    @property
+    def alpha(self):
+        return min(self.lag / self.step_seconds, 1.0)
+
+
+# Сквозная нумерация: id растёт в порядке создания, то есть в порядке списков
+entity_ids = itertools.count()
+
+
+def hits(item, x, y, box):
+    if box:
+        return item.x <= x <= item.x + item.size and item.y <= y <= item.y + item.size
+    radius = item.size / 2
+    return (item.x + radius - x) ** 2 + (item.y + radius - y) ** 2 <= radius ** 2
+
+
+def first_hit(candidates, x, y, box):
+    # Как при обходе списка: из нескольких попаданий берём созданный раньше объект
+    hit = None
+    for item in candidates:
+        if hits(item, x, y, box) and (hit is None or item.id < hit.id):
+            hit = item
+    return hit
+
+
+def grid_cell_size(width, height, cabbage_count):
+    # Клетка сетки примерно на одну-две капусты
+    return max(32, int((width * height / max(cabbage_count, 1)) ** 0.5))
+
+
+def check_choices(choices):
+    """Проверить cabbage_generation_choices: непустой список целых неотрицательных чисел."""
+    if not isinstance(choices, (list, tuple)) or not choices:
+        raise ValueError(f"cabbage_generation_choices - непустой список, а не {choices!r}")
+    for choice in choices:
+        if isinstance(choice, bool) or not isinstance(choice, int) or choice < 0:
+            raise ValueError(f"в cabbage_generation_choices не число капусты: {choice!r}")
+
+
+def check_config(config):
+    """Проверить числа из конфига, по которым строится огород; ошибка - ValueError."""
+    for key in ("num_goats", "num_cabbages"):
+        value = config[key]
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            raise ValueError(f"{key} - целое неотрицательное число, а не {value!r}")
+    check_choices(config["cabbage_generation_choices"])
+
+
+def load_config(config_path, default_config):
+    # Проверяем наличие файла конфигурации и создаем его, если он отсутствует
+    if not os.path.exists(config_path):
+        with open(config_path, 'w') as file:
+            json.dump(default_config, file, indent=4)
+        print(f"Файл конфигурации не найден. Создан файл с базовыми настройками: {config_path}")
+
+    with open(config_path, 'r') as file:
+        return json.load(file)
+
+
+def first_dead(items, minimum_size):
+    """Номер первого объекта размером не больше minimum_size или None."""
+    for index, item in enumerate(items):
+        if item.size <= minimum_size:
+            return index
+    return None
+
+
+def compact(items, first, minimum_size, dead):
+    """Убрать из items с позиции first всё размером не больше minimum_size, сохранив порядок остальных.
+
+    Список меняется на месте, убранное дописывается в dead.
+    """
+    write = first
+    for read in range(first, len(items)):
+        item = items[read]
+        if item.size > minimum_size:
+            items[write] = item
+            write += 1
+        else:
+            dead.append(item)
+    del items[write:]
+
+
+class Cabbage:
+    __slots__ = ("id", "x", "y", "size", "nutrition", "being_eaten", "reserved_by")
+
+    def __init__(self, x, y, size):
+        self.reset(x, y, size)
+
+    def reset(self, x, y, size):
+        # Капуста из пула Garden получает новый id, как только что созданная
+        self.id = next(entity_ids)
+        self.x = x
+        self.y = y
+        self.size = size
+        self.nutrition = self.size * 2
+        self.being_eaten = False
+        # Коза, которой капусту отдал распределитель (см. assignment.py)
+        self.reserved_by = None
+
+    def is_eaten(self):
+        return self.size <= 0
+
+
+class Goat:
+    __slots__ = ("id", "x", "y", "size", "speed", "eating_speed", "eating", "moving", "stamina", "target_cabbage",
+                 "chase_target", "needs_search", "wander_direction", "steps_in_direction", "fertility", "prev_x", "prev_y")
+
+    def __init__(self, x, y, speed, eating_speed, fertility, wander_direction, size=20, stamina=100):
+        self.reset(x, y, speed, eating_speed, fertility, wander_direction, size, stamina)
+
+    def reset(self, x, y, speed, eating_speed, fertility, wander_direction, size=20, stamina=100):
+        self.id = next(entity_ids)
+        self.x = x
+        self.y = y
+        self.size = size
+        self.speed = speed
+        self.eating_speed = eating_speed
+        self.eating = False
+        self.moving = True
+        self.stamina = stamina
+        self.target_cabbage = None
+        # Капуста, к которой коза идёт, и нужно ли искать её заново (режим cache_targets)
+        self.chase_target = None
+        self.needs_search = True
+        self.wander_direction = wander_direction
+        self.steps_in_direction = 0
+        self.fertility = fertility
+        # Положение до последнего шага, между ними окно рисует козу плавно
+        self.prev_x = self.x
+        self.prev_y = self.y
+
+    def position(self, alpha):
+        return self.prev_x + (self.x - self.prev_x) * alpha, self.prev_y + (self.y - self.prev_y) * alpha
+
+    def move_towards(self, target_x, target_y):
+        direction_x = target_x - self.x
+        direction_y = target_y - self.y
+        distance = (direction_x ** 2 + direction_y ** 2) ** 0.5
+
+        if distance > 0:
+            self.x += (direction_x / distance) * self.speed
+            self.y += (direction_y / distance) * self.speed
+
+    def is_near_cabbage(self, cabbage):
+        goat_left = self.x
+        goat_right = self.x + self.size
+        goat_top = self.y
+        goat_bottom = self.y + self.size
+
+        cabbage_left = cabbage.x
+        cabbage_right = cabbage.x + cabbage.size
+        cabbage_top = cabbage.y
+        cabbage_bottom = cabbage.y + cabbage.size
+
+        overlaps_horizontally = goat_right >= cabbage_left and goat_left <= cabbage_right
+        overlaps_vertically = goat_bottom >= cabbage_top and goat_top <= cabbage_bottom
+
+        return overlaps_horizontally and overlaps_vertically
+
+    def wander(self, window_width, window_height, rng):
+        # Порог от 30 до 60 шагов заново на каждом шаге, как randint(30, 60)
+        if self.steps_in_direction >= 30 + int(rng.random() * 31):
+            # Список направления у каждой козы свой и меняется на месте
+            self.wander_direction[0] = rng.choice((-1, 1))
+            self.wander_direction[1] = rng.choice((-1, 1))
+            self.steps_in_direction = 0
+
+        self.x += self.wander_direction[0] * self.speed
+        self.y += self.wander_direction[1] * self.speed
+
+        self.x = max(0, min(self.x, window_width - self.size))
+        self.y = max(0, min(self.y, window_height - self.size))
+
+        self.steps_in_direction += 1
+
+
+class Garden:
+    """Огород без окна: козы, капуста и правила одного шага симуляции."""
+
+    def __init__(self, width, height, num_goats, num_cabbages, cabbage_generation_choices, rules="prac_3", use_index=True,
+                 cache_targets=False, assigner=None, seed=None):
+        self.width = width
+        self.height = height
+        self.cabbage_generation_choices = cabbage_generation_choices
+        self.rules = rules
+
+        rule_set = RULES[rules]
+        self.stamina_decay = rule_set["stamina_decay"]
+        self.bite_first = rule_set["bite_first"]
+        # Капуста появляется раз в cabbage_interval мс, то есть раз в столько шагов
+        self.cabbage_every = max(1, round(rule_set["cabbage_interval"] / FRAME_MS))
+
+        # Свой генератор у каждого огорода: один seed даёт один и тот же прогон
+        self.rng = random.Random(seed)
+
+        self.tick_count = 0
+        # Сколько капусты (в единицах размера) съедено за всё время
+        self.food_eaten = 0.0
+
+        # Погибшие объекты идут на новые. Шаг они ждут в dying_*: за шаг каждая живая коза
+        # перепроверяет или сбрасывает свои ссылки на них, и только потом они попадают в пул
+        self.cabbage_pool = []
+        self.goat_pool = []
+        self.dying_cabbages = []
+        self.dying_goats = []
+
+        self.cabbages = self.new_cabbages(num_cabbages)
+        self.goats = self.new_goats(num_goats)
+        # Живые объекты по id: поток окна находит по ним объекты из снимка, не обходя списки
+        self.cabbages_by_id = {cabbage.id: cabbage for cabbage in self.cabbages}
+        self.goats_by_id = {goat.id: goat for goat in self.goats}
+
+        # Сетка капусты для поиска ближайшей
+        self.use_index = use_index
+        self.cabbage_index = SpatialGrid(grid_cell_size(width, height, num_cabbages))
+        self.cabbage_index.rebuild(self.cabbages)
+        # Под какое число капусты нарезаны сетки
+        self.grid_cabbages = num_cabbages
+        self.max_cabbage_size = max((cabbage.size for cabbage in self.cabbages), default=0)
+
+        # Сетка коз для выбора мышью строится заново, только когда её спросили после шага
+        self.goat_index = SpatialGrid(self.cabbage_index.cell_size)
+        self.goat_index_tick = None
+        self.max_goat_size = 0
+
+        # Козы помнят цель и ищут заново, только когда она занята, съедена
+        # или рядом появилась капуста ближе
+        self.cache_targets = cache_targets
+        self.released_cabbages = SpatialGrid(self.cabbage_index.cell_size)
+
+        # Пакетное распределение коз по капусте вместо жадного захвата по порядку списка
+        self.assigner = assigner
+
+        # Прямоугольники (left, top, right, bottom), которые окну нужно перерисовать
+        self.track_dirty = False
+        self.dirty_rects = []
+
+        # Запоминать положения коз до шага, чтобы окно рисовало промежуточные кадры
+        self.interpolate = False
+        self.max_goat_speed = 0
+
+        # PhaseProfiler из profiler.py; None - шаг не замеряется
+        self.profiler = None
+        # StatsRecorder из stats.py получает выборку после каждого шага; None - статистика не собирается
+        self.stats = None
+        # Сколько коз бродило без цели на последнем шаге
+        self.wandering = 0
+
+    @classmethod
+    def from_config(cls, config, rules="prac_3", **options):
+        check_config(config)
+        options.setdefault("cache_targets", config.get("cache_targets", False))
+        options.setdefault("seed", config.get("seed"))
+        if "assigner" not in options and config.get("assignment"):
+            from assignment import ASSIGNERS
+            settings = dict(config["assignment"])
+            options["assigner"] = ASSIGNERS[settings.pop("method", "greedy")](**settings)
+        return cls(
+            # Огород может быть больше окна, тогда окно показывает его часть (см. камеру в prac_3)
+            config.get("world_width", config["window_width"]),
+            config.get("world_height", config["window_height"]),
+            config["num_goats"],
+            config["num_cabbages"],
+            config["cabbage_generation_choices"],
+            rules=rules,
+            **options,
+        )
+
+    @property
+    def goat_count(self):
+        return len(self.goats)
+
+    @property
+    def cabbage_count(self):
+        return len(self.cabbages)
+
+    def eat_cabbage(self, goat, cabbage):
+        if cabbage.size <= 0:
+            goat.eating = False
+            cabbage.being_eaten = False
+            goat.target_cabbage = None
+            return
+
+        self.food_eaten += min(goat.eating_speed, cabbage.size)
+        if self.bite_first:
+            cabbage.size -= goat.eating_speed
+            stamina_increase = min(cabbage.nutrition * goat.eating_speed / cabbage.size, 100 - goat.stamina)
+            goat.stamina = min(goat.stamina + stamina_increase, 100)
+            goat.size += 0.2 * goat.fertility
+            return
+
+        stamina_increase = min(cabbage.nutrition * goat.eating_speed / cabbage.size, 100 - goat.stamina)
+        goat.stamina = min(goat.stamina + stamina_increase, 100)
+        goat.size += 0.2 * goat.fertility
+
+        cabbage.size -= goat.eating_speed
+        if cabbage.size <= 0:
+            goat.eating = False
+            cabbage.being_eaten = False
+            goat.target_cabbage = None
+            # До чистки списка пустая капуста снова свободна для коз дальше по списку
+            if self.cache_targets:
+                self.released_cabbages.insert(cabbage)
+
+    def find_closest_cabbage(self, goat):
+        if self.use_index:
+            return self.cabbage_index.nearest(goat.x, goat.y, lambda cabbage: not cabbage.being_eaten)
+
+        closest_cabbage = None
+        min_distance = float('inf')
+
+        for cabbage in self.cabbages:
+            if cabbage.being_eaten:
+                continue
+
+            distance = ((goat.x - cabbage.x) ** 2 + (goat.y - cabbage.y) ** 2) ** 0.5
+            if distance < min_distance:
+                min_distance = distance
+                closest_cabbage = cabbage
+
+        return closest_cabbage
+
+    def chased_cabbage(self, goat):
+        target = goat.chase_target
+        if goat.needs_search or (target is not None and (target.being_eaten or target.size <= 0)):
+            target = self.find_closest_cabbage(goat)
+            goat.chase_target = target
+            goat.needs_search = False
+        elif self.released_cabbages.count:
+            if target is None:
+                distance = float('inf')
+                max_distance = None
+            else:
+                distance = (goat.x - target.x) ** 2 + (goat.y - target.y) ** 2
+                max_distance = distance ** 0.5
+            released = self.released_cabbages.nearest(
+                goat.x, goat.y, lambda cabbage: not cabbage.being_eaten, max_distance)
+            if released is not None:
+                released_distance = (goat.x - released.x) ** 2 + (goat.y - released.y) ** 2
+                if released_distance < distance or (released_distance == distance and released.id < target.id):
+                    target = released
+                    goat.chase_target = target
+        return target
+
+    def cabbage_is_free(self, cabbage):
+        return not cabbage.being_eaten and cabbage.size > 0
+
+    def cabbage_is_unreserved(self, cabbage):
+        goat = cabbage.reserved_by
+        if goat is not None and goat.size > 5 and goat.chase_target is cabbage:
+            return False
+        return self.cabbage_is_free(cabbage)
+
+    def assigned_cabbage(self, goat):
+        target = goat.chase_target
+        if target is not None and target.reserved_by is goat and self.cabbage_is_free(target):
+            return target
+
+        if target is not None:
+            goat.needs_search = True
+        goat.chase_target = None
+        if not goat.needs_search:
+            return None
+
+        # Козе ничего не досталось: ближайшая капуста, которую никто не забрал
+        goat.needs_search = False
+        target = self.cabbage_index.nearest(goat.x, goat.y, self.cabbage_is_unreserved)
+        if target is not None:
+            goat.chase_target = target
+            target.reserved_by = goat
+        return target
+
+    def cabbage_available(self, cabbage):
+        if self.assigner is not None:
+            for goat in self.goats:
+                if goat.chase_target is None and not goat.eating:
+                    goat.needs_search = True
+            return
+
+        if not self.cache_targets:
+            return
+
+        for goat in self.goats:
+            if goat.eating or goat.needs_search:
+                continue
+
+            target = goat.chase_target
+            if target is None:
+                goat.chase_target = cabbage
+                continue
+
+            # Старая цель была ближайшей из свободных, так что сравнить достаточно с ней
+            new_distance = (goat.x - cabbage.x) ** 2 + (goat.y - cabbage.y) ** 2
+            old_distance = (goat.x - target.x) ** 2 + (goat.y - target.y) ** 2
+            if new_distance < old_distance or (new_distance == old_distance and cabbage.id < target.id):
+                goat.chase_target = cabbage
+
+    def goat_bounds(self, goat):
+        """Где коза нарисована: круг или две половинки посередине между козой и капустой."""
+        if goat.eating and goat.target_cabbage:
+            cabbage = goat.target_cabbage
+            half = max(goat.size, cabbage.size) / 2
+            center_x = (goat.x + cabbage.x) / 2
+            center_y = (goat.y + cabbage.y) / 2
+            bounds = (center_x - half, center_y - half, center_x + half, center_y + half)
+        else:
+            bounds = (goat.x, goat.y, goat.x + goat.size, goat.y + goat.size)
+
+        if self.interpolate:
+            # Между шагами коза рисуется где-то на отрезке от прошлого положения до нового
+            shift_x = goat.prev_x - goat.x
+            shift_y = goat.prev_y - goat.y
+            left, top, right, bottom = bounds
+            bounds = (left + min(shift_x, 0), top + min(shift_y, 0), right + max(shift_x, 0), bottom + max(shift_y, 0))
+        return bounds
+
+    def cabbage_bounds(self, cabbage):
+        return (cabbage.x, cabbage.y, cabbage.x + cabbage.size, cabbage.y + cabbage.size)
+
+    def mark_dirty(self, bounds):
+        if self.track_dirty:
+            self.dirty_rects.append(bounds)
+
+    def take_dirty(self):
+        rects = self.dirty_rects
+        self.dirty_rects = []
+        return rects
+
+    def mark_moving_dirty(self):
+        """Козы, сдвинувшиеся на последнем шаге: в промежуточных кадрах они перерисовываются."""
+        for goat in self.goats:
+            if goat.x != goat.prev_x or goat.y != goat.prev_y:
+                self.mark_dirty(self.goat_bounds(goat))
+
+    def goats_in_rect(self, left, top, right, bottom):
+        """Козы, чей рисунок задевает прямоугольник."""
+        self._refresh_goat_index()
+        # Половинки при еде сдвинуты к капусте не дальше, чем на размер козы или капусты
+        margin = self.max_goat_size + self.max_cabbage_size
+        if self.interpolate:
+            margin += self.max_goat_speed
+        for goat in self.goat_index.query_rect(left - margin, top - margin, right + margin, bottom + margin):
+            goat_left, goat_top, goat_right, goat_bottom = self.goat_bounds(goat)
+            if goat_right >= left and goat_left <= right and goat_bottom >= top and goat_top <= bottom:
+                yield goat
+
+    def cabbages_in_rect(self, left, top, right, bottom):
+        size = self.max_cabbage_size
+        for cabbage in self.cabbage_index.query_rect(left - size, top - size, right, bottom):
+            if cabbage.x + cabbage.size >= left and cabbage.x <= right and cabbage.y + cabbage.size >= top and cabbage.y <= bottom:
+                yield cabbage
+
+    def cabbage_at(self, x, y, box=False):
+        """Капуста под точкой: по кругу (наведение) или по квадрату (клик)."""
+        size = self.max_cabbage_size
+        return first_hit(self.cabbage_index.query_rect(x - size, y - size, x, y), x, y, box)
+
+    def _refresh_goat_index(self):
+        if self.goat_index_tick != self.tick_count:
+            self.goat_index.rebuild(self.goats)
+            self.max_goat_size = max((goat.size for goat in self.goats), default=0)
+            self.max_goat_speed = max((goat.speed for goat in self.goats), default=0)
+            self.goat_index_tick = self.tick_count
+
+    def goat_at(self, x, y, box=False):
+        self._refresh_goat_index()
+        size = self.max_goat_size
+        return first_hit(self.goat_index.query_rect(x - size, y - size, x, y), x, y, box)
+
+    def tick(self):
+        profiler = self.profiler
+        if profiler is not None:
+            mark = time.perf_counter()
+
+        if self.assigner is not None and self.tick_count % self.assigner.every == 0:
+            self.assigner.assign(self)
+            if profiler is not None:
+                mark = profiler.lap("search", mark)
+
+        goats = self.goats
+        wandered = 0
+        if self.track_dirty:
+            bounds_before = [self.goat_bounds(goat) for goat in goats]
+        if self.interpolate:
+            for goat in goats:
+                goat.prev_x = goat.x
+                goat.prev_y = goat.y
+
+        for goat in goats:
+            if profiler is not None:
+                mark = time.perf_counter()
+            goat.stamina = max(goat.stamina - self.stamina_decay * (goat.size / 20), 0)
+
+            if goat.stamina <= 0:
+                goat.size -= 0.01
+            if profiler is not None:
+                mark = profiler.lap("stamina", mark)
+
+            if goat.size > 5:
+                if goat.eating and goat.target_cabbage:
+                    self.eat_cabbage(goat, goat.target_cabbage)
+                    if profiler is not None:
+                        profiler.lap("eating", mark)
+                else:
+                    if self.assigner is not None:
+                        closest_cabbage = self.assigned_cabbage(goat)
+                    elif self.cache_targets:
+                        closest_cabbage = self.chased_cabbage(goat)
+                    else:
+                        closest_cabbage = self.find_closest_cabbage(goat)
+                    if profiler is not None:
+                        mark = profiler.lap("search", mark)
+
+                    if closest_cabbage:
+                        if goat.is_near_cabbage(closest_cabbage):
+                            goat.eating = True
+                            goat.target_cabbage = closest_cabbage
+                            goat.chase_target = None
+                            goat.needs_search = True
+                            closest_cabbage.being_eaten = True
+                            self.mark_dirty(self.cabbage_bounds(closest_cabbage))
+                        else:
+                            # Прямо к цели ближайшая капуста не меняется, пока коза не проскочит её
+                            if (goat.x - closest_cabbage.x) ** 2 + (goat.y - closest_cabbage.y) ** 2 <= goat.speed ** 2:
+                                goat.needs_search = True
+                            goat.move_towards(closest_cabbage.x, closest_cabbage.y)
+                    else:
+                        goat.wander(self.width, self.height, self.rng)
+                        wandered += 1
+                    if profiler is not None:
+                        profiler.lap("eating" if goat.eating else "movement", mark)
+
+        if self.track_dirty:
+            for goat, before in zip(goats, bounds_before):
+                after = self.goat_bounds(goat)
+                if after != before or goat.size <= 5:
+                    self.dirty_rects.append(before)
+                    self.dirty_rects.append(after)
+
+        if profiler is not None:
+            mark = time.perf_counter()
+        self._release_dying()
+        first = first_dead(self.cabbages, 0)
+        if first is not None:
+            compact(self.cabbages, first, 0, self.dying_cabbages)
+            for cabbage in self.dying_cabbages:
+                self.cabbage_index.remove(cabbage)
+                del self.cabbages_by_id[cabbage.id]
+                self.mark_dirty(self.cabbage_bounds(cabbage))
+        if self.released_cabbages.count:
+            self.released_cabbages.rebuild([])
+        first = first_dead(self.goats, 5)
+        if first is not None:
+            compact(self.goats, first, 5, self.dying_goats)
+            for goat in self.dying_goats:
+                del self.goats_by_id[goat.id]
+        self.check_grid()
+        self.wandering = wandered
+        self.tick_count += 1
+        if profiler is not None:
+            profiler.lap("compaction", mark)
+
+    def _release_dying(self):
+        for cabbage in self.dying_cabbages:
+            cabbage.reserved_by = None
+        for goat in self.dying_goats:
+            goat.target_cabbage = None
+            goat.chase_target = None
+        self.cabbage_pool.extend(self.dying_cabbages)
+        self.goat_pool.extend(self.dying_goats)
+        self.dying_cabbages.clear()
+        self.dying_goats.clear()
+
+    def step(self):
+        # Шаг вместе с появлением капусты по расписанию в шагах, а не по таймеру
+        profiler = self.profiler
+        if profiler is not None:
+            start = time.perf_counter()
+
+        self.tick()
+        if self.tick_count % self.cabbage_every == 0:
+            if profiler is not None:
+                mark = time.perf_counter()
+            self.generate_new_cabbage()
+            if profiler is not None:
+                profiler.lap("spawning", mark)
+
+        if profiler is not None:
+            profiler.lap("step", start)
+            profiler.end_tick()
+        if self.stats is not None:
+            self.stats.record(self)
+
+    def run(self, ticks):
+        for _ in range(ticks):
+            self.step()
+
+    def run_for(self, seconds, ticks=None):
+        """Шагать, пока не пройдёт seconds секунд или ticks шагов; вернуть число сделанных шагов.
+
+        Так пачка шагов в ускоренном режиме сама подстраивается под
+        цену шага: тяжёлый огород успевает меньше шагов за кадр.
+        """
+        deadline = time.perf_counter() + seconds
+        done = 0
+        while (ticks is None or done < ticks) and time.perf_counter() < deadline:
+            self.step()
+            done += 1
+        return done
+
+    def _random_ints(self, low, high, count):
+        # Столбец целых от low до high включительно; быстрее, чем randint на каждое значение
+        span = high - low + 1
+        random = self.rng.random
+        return [low + int(random() * span) for _ in range(count)]
+
+    def _random_floats(self, low, high, count):
+        span = high - low
+        random = self.rng.random
+        return [low + span * random() for _ in range(count)]
+
+    def _random_signs(self, count):
+        random = self.rng.random
+        return [-1 if random() < 0.5 else 1 for _ in range(count)]
+
+    def new_cabbages(self, count):
+        """count капуст в случайных местах; каждое поле тянется из self.rng одним столбцом."""
+        xs = self._random_ints(50, self.width - 50, count)
+        ys = self._random_ints(50, self.height - 50, count)
+        sizes = self._random_ints(10, 30, count)
+        return [self._new_cabbage(x, y, size) for x, y, size in zip(xs, ys, sizes)]
+
+    def _new_cabbage(self, x, y, size):
+        if self.cabbage_pool:
+            cabbage = self.cabbage_pool.pop()
+            cabbage.reset(x, y, size)
+            return cabbage
+        return Cabbage(x, y, size)
+
+    def _new_goat(self, *args, **kwargs):
+        if self.goat_pool:
+            goat = self.goat_pool.pop()
+            goat.reset(*args, **kwargs)
+            return goat
+        return Goat(*args, **kwargs)
+
+    def new_goats(self, count):
+        xs = self._random_ints(50, self.width - 50, count)
+        ys = self._random_ints(50, self.height - 50, count)
+        speeds = self._random_floats(1.0, 3.0, count)
+        eating_speeds = self._random_floats(1.0, 3.0, count)
+        fertilities = self._random_floats(0.1, 1.0, count)
+        directions_x = self._random_signs(count)
+        directions_y = self._random_signs(count)
+        return [
+            self._new_goat(x, y, speed, eating_speed, fertility, [direction_x, direction_y])
+            for x, y, speed, eating_speed, fertility, direction_x, direction_y
+            in zip(xs, ys, speeds, eating_speeds, fertilities, directions_x, directions_y)
+        ]
+
+    def _place_cabbages(self, new_cabbages):
+        self.cabbages.extend(new_cabbages)
+        self.cabbages_by_id.update((cabbage.id, cabbage) for cabbage in new_cabbages)
+        self.cabbage_index.extend(new_cabbages)
+        self.max_cabbage_size = max(self.max_cabbage_size, max((cabbage.size for cabbage in new_cabbages), default=0))
+        if self.track_dirty:
+            self.dirty_rects.extend(self.cabbage_bounds(cabbage) for cabbage in new_cabbages)
+        if self.cache_targets or self.assigner is not None:
+            for cabbage in new_cabbages:
+                self.cabbage_available(cabbage)
+
+    def _place_goats(self, new_goats):
+        self.goats.extend(new_goats)
+        self.goats_by_id.update((goat.id, goat) for goat in new_goats)
+        self.goat_index_tick = None
+        if self.track_dirty:
+            self.dirty_rects.extend(self.goat_bounds(goat) for goat in new_goats)
+
+    def spawn_cabbages(self, count):
+        """Добавить count случайных капуст разом; для больших сценариев быстрее, чем по одной."""
+        new_cabbages = self.new_cabbages(count)
+        self._place_cabbages(new_cabbages)
+        return new_cabbages
+
+    def spawn_goats(self, count):
+        new_goats = self.new_goats(count)
+        self._place_goats(new_goats)
+        return new_goats
+
+    def add_cabbages(self, columns):
+        """Добавить капусту пачкой из столбцов x, y, size (см. scenario.py)."""
+        new_cabbages = [self._new_cabbage(x, y, size) for x, y, size in zip(columns["x"], columns["y"], columns["size"])]
+        self._place_cabbages(new_cabbages)
+        return new_cabbages
+
+    def add_goats(self, columns):
+        """Добавить коз пачкой из столбцов x, y, size, speed, eating_speed, fertility, stamina."""
+        count = len(columns["x"])
+        directions_x = self._random_signs(count)
+        directions_y = self._random_signs(count)
+        new_goats = [
+            self._new_goat(x, y, speed, eating_speed, fertility, [direction_x, direction_y], size=size, stamina=stamina)
+            for x, y, size, speed, eating_speed, fertility, stamina, direction_x, direction_y in zip(
+                columns["x"], columns["y"], columns["size"], columns["speed"], columns["eating_speed"],
+                columns["fertility"], columns["stamina"], directions_x, directions_y)
+        ]
+        self._place_goats(new_goats)
+        return new_goats
+
+    def reindex(self):
+        """Построить сетки заново с клеткой под нынешние размер огорода и число капусты."""
+        cell_size = grid_cell_size(self.width, self.height, len(self.cabbages))
+        self.cabbage_index = SpatialGrid(cell_size)
+        self.cabbage_index.rebuild(self.cabbages)
+        self.grid_cabbages = len(self.cabbages)
+        self.goat_index = SpatialGrid(cell_size)
+        self.goat_index_tick = None
+        self.released_cabbages = SpatialGrid(cell_size)
+
+    def check_grid(self):
+        """Нарезать сетки заново, если капусты стало в REGRID_FACTOR раз больше или меньше.
+
+        Границы сетки при удалении не сжимаются, а клетка под сотни кочанов
+        на десяток оставшихся даёт кольца из пустых клеток. Вызывается после
+        чистки списков, когда в сетке ровно живая капуста.
+        """
+        count = max(len(self.cabbages), 1)
+        built = max(self.grid_cabbages, 1)
+        if count * REGRID_FACTOR <= built or count >= built * REGRID_FACTOR:
+            self.reindex()
+
+    def reconfigure(self, config):
+        """Применить на ходу то из конфига, что не требует нового огорода: выбор числа новой капусты и размер."""
+        check_choices(config["cabbage_generation_choices"])
+        self.cabbage_generation_choices = config["cabbage_generation_choices"]
+        width = config.get("world_width", config["window_width"])
+        height = config.get("world_height", config["window_height"])
+        if (width, height) == (self.width, self.height):
+            return
+        self.width = width
+        self.height = height
+        # Кто оказался за новым краем, переносится на край; запомненные цели ищутся заново
+        for goat in self.goats:
+            goat.x = goat.prev_x = max(0, min(goat.x, width - goat.size))
+            goat.y = goat.prev_y = max(0, min(goat.y, height - goat.size))
+            goat.needs_search = True
+        for cabbage in self.cabbages:
+            cabbage.x = max(0, min(cabbage.x, width - cabbage.size))
+            cabbage.y = max(0, min(cabbage.y, height - cabbage.size))
+        self.reindex()
+
+    def generate_new_cabbage(self):
+        self.spawn_cabbages(self.rng.choice(self.cabbage_generation_choices))
+
+    def add_cabbage(self, x, y, size):
+        new_cabbage = self._new_cabbage(x, y, size)
+        self._place_cabbages([new_cabbage])
+        return new_cabbage
+
+    def add_goat(self, x, y, size, speed, fertility, stamina, eating_speed):
+        wander_direction = self._random_signs(2)
+        new_goat = self._new_goat(x, y, speed, eating_speed, fertility, wander_direction, size=size, stamina=stamina)
+        self._place_goats([new_goat])
+        return new_goat
+
+    def save_checkpoint(self, path):
+        import checkpoint
+        checkpoint.save(self, path)
+
+    def modify_goat(self, goat, size, speed, fertility, stamina, eating_speed):
+        self.mark_dirty(self.goat_bounds(goat))
+        goat.size = size
+        goat.speed = speed
+        goat.fertility = fertility
+        goat.stamina = stamina
+        goat.eating_speed = eating_speed
+        self.goat_index_tick = None
+        self.mark_dirty(self.goat_bounds(goat))
+
+    def modify_cabbage(self, cabbage, size):
+        # Капуста, которую едят, нарисована вместе с козой
+        eaters = [goat for goat in self.goats if goat.target_cabbage is cabbage] if self.track_dirty else []
+        for goat in eaters:
+            self.mark_dirty(self.goat_bounds(goat))
+        self.mark_dirty(self.cabbage_bounds(cabbage))
+
+        cabbage.size = size
+        cabbage.nutrition = cabbage.size * 2
+        self.max_cabbage_size = max(self.max_cabbage_size, size)
+
+        self.mark_dirty(self.cabbage_bounds(cabbage))
+        for goat in eaters:
+            self.mark_dirty(self.goat_bounds(goat))
+
+        if self.cache_targets or self.assigner is not None:
+            for goat in self.goats:
+                if goat.chase_target is cabbage:
+                    goat.needs_search = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Запуск огорода без окна")
+    parser.add_argument("--ticks", type=int, default=10000)
+    parser.add_argument("--rules", choices=sorted(RULES), default="prac_3")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--backend", choices=["objects", "arrays", "events", "tiled"], default=None,
+                        help="по умолчанию objects, а с --resume - движок из сохранения; "
+                             "events - перескакивать между событиями (см. events.py), "
+                             "tiled - массивы по плиткам в нескольких процессах (см. tiled.py)")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов-плиток для tiled, по умолчанию по ядрам")
+    parser.add_argument("--cache-targets", action="store_true", default=None)
+    parser.add_argument("--assign-every", type=int, default=None,
+                        help="раздавать капусту козам пакетно раз в столько шагов")
+    parser.add_argument("--resume", default=None, help="продолжить с сохранения .npz вместо нового огорода")
+    parser.add_argument("--scenario", default=None,
+                        help="добавить коз и капусту из сценария .jsonl или .npz (см. scenario.py)")
+    parser.add_argument("--save", default=None, help="сохранить огород в .npz после прогона")
+    parser.add_argument("--save-every", type=int, default=None, help="и сохранять его каждые столько шагов")
+    parser.add_argument("--record", default=None, help="дописывать шаги в каталог записи для просмотра в prac_3")
+    parser.add_argument("--record-every", type=int, default=1)
+    parser.add_argument("--profile", default=None, help="замерять фазы шага и сохранить их в .json или .csv")
+    parser.add_argument("--stats", default=None, help="писать статистику стада в каталог CSV-файлов")
+    parser.add_argument("--stats-every", type=int, default=1,
+                        help="строка CSV - среднее за столько шагов: 1, 100 или 10000")
+    args = parser.parse_args()
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    config = load_config(os.path.join(script_dir, args.config), DEFAULT_CONFIGS[args.rules])
+
+    if args.resume:
+        import checkpoint
+        cls = None
+        options = {}
+        if args.backend == "objects":
+            # Сам файл запущен как __main__, а checkpoint сверяет класс с garden.Garden
+            from garden import Garden as cls
+        elif args.backend == "events":
+            # Планы коз событийный огород строит сам при первом run
+            from events import EventGarden as cls
+        elif args.backend == "arrays":
+            from garden_arrays import ArrayGarden as cls
+        elif args.backend == "tiled":
+            from tiled import TiledGarden as cls
+            options["workers"] = args.workers
+        # Движок сохранения должен подходить к --backend: объекты не переводятся в массивы и обратно
+        try:
+            garden = checkpoint.load(args.resume, cls, **options)
+        except ValueError as error:
+            parser.error(f"{args.resume}: {error}")
+    elif args.backend == "arrays":
+        from garden_arrays import ArrayGarden
+        garden = ArrayGarden.from_config(config, rules=args.rules, seed=args.seed)
+    elif args.backend == "tiled":
+        from tiled import TiledGarden
+        garden = TiledGarden.from_config(config, rules=args.rules, seed=args.seed, workers=args.workers)
+    else:
+        options = {} if args.cache_targets is None else {"cache_targets": True}
+        if args.seed is not None:
+            options["seed"] = args.seed
+        if args.assign_every is not None:
+            from assignment import GreedyAssigner
+            options["assigner"] = GreedyAssigner(every=args.assign_every)
+        cls = Garden
+        if args.backend == "events":
+            from events import EventGarden as cls
+        garden = cls.from_config(config, rules=args.rules, **options)
+
+    # Плиточный огород держит процессы и общую память: они освобождаются и при ошибке посреди прогона
+    try:
+        if args.scenario:
+            from scenario import load_scenario
+            start = time.perf_counter()
+            goats, cabbages = load_scenario(garden, args.scenario)
+            print(f"scenario: {goats} goats, {cabbages} cabbages in {time.perf_counter() - start:.2f}s")
+
+        if args.profile:
+            from profiler import PhaseProfiler
+            garden.profiler = PhaseProfiler(size=max(args.ticks, 1))
+
+        if args.stats:
+            from stats import ChunkedCSVWriter, StatsRecorder
+            garden.stats = StatsRecorder(writer=ChunkedCSVWriter(args.stats), write_resolution=args.stats_every)
+
+        recorder = None
+        if args.record:
+            from trajectory import TrajectoryRecorder
+            recorder = TrajectoryRecorder(args.record, garden)
+        if args.save:
+            import checkpoint
+
+        start = time.perf_counter()
+        if args.stats and args.backend == "events":
+            # Событийный огород отдаёт выборку раз в run, поэтому run идёт интервалами строк CSV
+            for done in range(0, args.ticks, args.stats_every):
+                garden.run(min(args.stats_every, args.ticks - done))
+        elif recorder is None and not args.save_every:
+            garden.run(args.ticks)
+        else:
+            for _ in range(args.ticks):
+                garden.step()
+                if recorder is not None and garden.tick_count % args.record_every == 0:
+                    recorder.record(garden)
+                if args.save and args.save_every and garden.tick_count % args.save_every == 0:
+                    checkpoint.save(garden, args.save)
+        elapsed = time.perf_counter() - start
+
+        if recorder is not None:
+            recorder.close()
+        if garden.stats is not None:
+            garden.stats.close()
+        if args.save:
+            checkpoint.save(garden, args.save)
+
+        print(f"ticks: {garden.tick_count}, goats: {garden.goat_count}, cabbages: {garden.cabbage_count}, "
+              f"time: {elapsed:.2f}s ({garden.tick_count / max(elapsed, 1e-9):.0f} ticks/s)")
+        if args.profile:
+            print("\n".join(garden.profiler.hud_lines()[:-1]))
+            garden.profiler.export(args.profile)
+    finally:
+        if args.backend == "tiled":
+            garden.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
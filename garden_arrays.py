@@ -0,0 +1,468 @@
+import time
+
+import numpy as np
+
+from garden import RULES, FRAME_MS, check_choices, check_config
+
+GOAT_FIELDS = (
+    ("x", np.float64),
+    ("y", np.float64),
+    ("size", np.float64),
+    ("speed", np.float64),
+    ("eating_speed", np.float64),
+    ("stamina", np.float64),
+    ("fertility", np.float64),
+    ("eating", np.bool_),
+    ("target", np.int64),
+    ("wander_dx", np.int8),
+    ("wander_dy", np.int8),
+    ("steps", np.int64),
+)
+
+CABBAGE_FIELDS = (
+    ("x", np.float64),
+    ("y", np.float64),
+    ("size", np.float64),
+    ("nutrition", np.float64),
+    ("being_eaten", np.bool_),
+)
+
+# Сколько пар коза-капуста считается за раз при поиске ближайшей
+SEARCH_BLOCK = 1 << 22
+
+
+class ArrayGarden:
+    """Огород на массивах NumPy: одна колонка на каждое поле козы или капусты.
+
+    Правила те же, что у Garden. Внутри шага все козы видят одно и то же
+    состояние, а спор за одну капусту выигрывает коза, которая раньше в списке.
+    """
+
+    def __init__(self, width, height, num_goats, num_cabbages, cabbage_generation_choices, rules="prac_3", seed=None):
+        self.width = width
+        self.height = height
+        self.cabbage_generation_choices = cabbage_generation_choices
+        self.rules = rules
+
+        rule_set = RULES[rules]
+        self.stamina_decay = rule_set["stamina_decay"]
+        self.bite_first = rule_set["bite_first"]
+        self.cabbage_every = max(1, round(rule_set["cabbage_interval"] / FRAME_MS))
+
+        self.rng = np.random.default_rng(seed)
+        self.tick_count = 0
+        self.food_eaten = 0.0
+        self.profiler = None
+        self.stats = None
+        self.wandering = 0
+
+        self.goat = {name: np.empty(0, dtype) for name, dtype in GOAT_FIELDS}
+        self.cabbage = {name: np.empty(0, dtype) for name, dtype in CABBAGE_FIELDS}
+        self.spawn_cabbages(num_cabbages)
+        self.spawn_goats(num_goats)
+
+    @classmethod
+    def from_config(cls, config, rules="prac_3", seed=None):
+        check_config(config)
+        return cls(
+            # Огород может быть больше окна, тогда окно показывает его часть (см. камеру в prac_3)
+            config.get("world_width", config["window_width"]),
+            config.get("world_height", config["window_height"]),
+            config["num_goats"],
+            config["num_cabbages"],
+            config["cabbage_generation_choices"],
+            rules=rules,
+            seed=seed,
+        )
+
+    @property
+    def goat_count(self):
+        return len(self.goat["x"])
+
+    @property
+    def cabbage_count(self):
+        return len(self.cabbage["x"])
+
+    def _append(self, columns, fields, values):
+        for name, dtype in fields:
+            columns[name] = np.concatenate((columns[name], np.asarray(values[name], dtype=dtype)))
+
+    def spawn_cabbages(self, count):
+        size = self.rng.integers(10, 31, count).astype(np.float64)
+        self._append(self.cabbage, CABBAGE_FIELDS, {
+            "x": self.rng.integers(50, self.width - 50 + 1, count),
+            "y": self.rng.integers(50, self.height - 50 + 1, count),
+            "size": size,
+            "nutrition": size * 2,
+            "being_eaten": np.zeros(count, np.bool_),
+        })
+
+    def spawn_goats(self, count):
+        self._append(self.goat, GOAT_FIELDS, {
+            "x": self.rng.integers(50, self.width - 50 + 1, count),
+            "y": self.rng.integers(50, self.height - 50 + 1, count),
+            "size": np.full(count, 20.0),
+            "speed": self.rng.uniform(1.0, 3.0, count),
+            "eating_speed": self.rng.uniform(1.0, 3.0, count),
+            "stamina": np.full(count, 100.0),
+            "fertility": self.rng.uniform(0.1, 1.0, count),
+            "eating": np.zeros(count, np.bool_),
+            "target": np.full(count, -1),
+            "wander_dx": self.rng.choice([-1, 1], count),
+            "wander_dy": self.rng.choice([-1, 1], count),
+            "steps": np.zeros(count, np.int64),
+        })
+
+    def add_cabbage(self, x, y, size):
+        self._append(self.cabbage, CABBAGE_FIELDS, {
+            "x": [x], "y": [y], "size": [size], "nutrition": [size * 2], "being_eaten": [False],
+        })
+        return self.cabbage_count - 1
+
+    def add_goat(self, x, y, size, speed, fertility, stamina, eating_speed):
+        self._append(self.goat, GOAT_FIELDS, {
+            "x": [x], "y": [y], "size": [size], "speed": [speed], "eating_speed": [eating_speed],
+            "stamina": [stamina], "fertility": [fertility], "eating": [False], "target": [-1],
+            "wander_dx": self.rng.choice([-1, 1], 1), "wander_dy": self.rng.choice([-1, 1], 1), "steps": [0],
+        })
+        return self.goat_count - 1
+
+    def add_cabbages(self, columns):
+        """Добавить капусту пачкой из столбцов x, y, size (см. scenario.py)."""
+        size = np.asarray(columns["size"], np.float64)
+        self._append(self.cabbage, CABBAGE_FIELDS, {
+            "x": columns["x"],
+            "y": columns["y"],
+            "size": size,
+            "nutrition": size * 2,
+            "being_eaten": np.zeros(len(size), np.bool_),
+        })
+
+    def add_goats(self, columns):
+        """Добавить коз пачкой из столбцов x, y, size, speed, eating_speed, fertility, stamina."""
+        count = len(columns["x"])
+        self._append(self.goat, GOAT_FIELDS, {
+            "x": columns["x"],
+            "y": columns["y"],
+            "size": columns["size"],
+            "speed": columns["speed"],
+            "eating_speed": columns["eating_speed"],
+            "stamina": columns["stamina"],
+            "fertility": columns["fertility"],
+            "eating": np.zeros(count, np.bool_),
+            "target": np.full(count, -1),
+            "wander_dx": self.rng.choice([-1, 1], count),
+            "wander_dy": self.rng.choice([-1, 1], count),
+            "steps": np.zeros(count, np.int64),
+        })
+
+    def reconfigure(self, config):
+        """Как Garden.reconfigure: выбор числа новой капусты и размер огорода."""
+        check_choices(config["cabbage_generation_choices"])
+        self.cabbage_generation_choices = config["cabbage_generation_choices"]
+        width = config.get("world_width", config["window_width"])
+        height = config.get("world_height", config["window_height"])
+        if (width, height) == (self.width, self.height):
+            return
+        self.width = width
+        self.height = height
+        for columns in (self.goat, self.cabbage):
+            columns["x"][:] = np.maximum(0, np.minimum(columns["x"], width - columns["size"]))
+            columns["y"][:] = np.maximum(0, np.minimum(columns["y"], height - columns["size"]))
+
+    def modify_goat(self, index, size, speed, fertility, stamina, eating_speed):
+        self.goat["size"][index] = size
+        self.goat["speed"][index] = speed
+        self.goat["fertility"][index] = fertility
+        self.goat["stamina"][index] = stamina
+        self.goat["eating_speed"][index] = eating_speed
+
+    def modify_cabbage(self, index, size):
+        self.cabbage["size"][index] = size
+        self.cabbage["nutrition"][index] = size * 2
+
+    def generate_new_cabbage(self):
+        self.spawn_cabbages(int(self.rng.choice(self.cabbage_generation_choices)))
+
+    def find_closest_cabbages(self, goats, free_after=None, claimed_by=None):
+        """Индекс ближайшей свободной капусты для каждой козы из goats, -1 если такой нет.
+
+        free_after[c] - номер козы, после которой капуста c освободилась в этом шаге,
+        claimed_by[c] - номер козы, которая заняла её в этом шаге. Коза g видит капусту,
+        только если free_after[c] < g и claimed_by[c] >= g, как при обходе списка по порядку.
+        """
+        if free_after is None:
+            free_after = np.where(self.cabbage["being_eaten"], self.goat_count, -1)
+        if claimed_by is None:
+            claimed_by = np.full(self.cabbage_count, self.goat_count)
+        return self._closest_among(goats, np.flatnonzero(free_after < claimed_by), free_after, claimed_by)
+
+    def _closest_among(self, goats, candidates, free_after, claimed_by):
+        """То же, что find_closest_cabbages, но только среди капусты candidates (по возрастанию)."""
+        closest = np.full(len(goats), -1)
+        if len(candidates) == 0 or len(goats) == 0:
+            return closest
+
+        closest, resolved = self._grid_closest(goats, candidates, free_after, claimed_by)
+        unresolved = np.flatnonzero(~resolved)
+        if len(unresolved):
+            closest[unresolved] = self._scan_closest(goats[unresolved], candidates, free_after, claimed_by)
+        return closest
+
+    def _grid_closest(self, goats, candidates, free_after, claimed_by):
+        """Поиск в клетке козы и восьми соседних.
+
+        Ответ точен, если найденная капуста ближе размера клетки: всё, что за
+        пределами этих девяти клеток, не ближе. Для остальных коз resolved ложно.
+        """
+        cx = self.cabbage["x"][candidates]
+        cy = self.cabbage["y"][candidates]
+        # Клетка по площади, которую занимают кандидаты: у плитки (см. tiled.py) это не весь огород
+        area = max(float(np.ptp(cx)) * float(np.ptp(cy)), 1.0)
+        cell_size = max(32.0, 2 * (area / len(candidates)) ** 0.5)
+        gx = self.goat["x"][goats]
+        gy = self.goat["y"][goats]
+
+        # Клетки считаются от левого верхнего объекта, с пустой рамкой в одну клетку
+        left = min(cx.min(), gx.min())
+        top = min(cy.min(), gy.min())
+        columns = int((max(cx.max(), gx.max()) - left) // cell_size) + 3
+        cabbage_cell = (((cy - top) // cell_size).astype(np.int64) + 1) * columns + ((cx - left) // cell_size).astype(np.int64) + 1
+        order = np.argsort(cabbage_cell, kind='stable')
+        sorted_cells = cabbage_cell[order]
+
+        goat_col = ((gx - left) // cell_size).astype(np.int64) + 1
+        goat_row = ((gy - top) // cell_size).astype(np.int64) + 1
+
+        owners = []
+        members = []
+        for row_shift in (-1, 0, 1):
+            for col_shift in (-1, 0, 1):
+                cell = (goat_row + row_shift) * columns + goat_col + col_shift
+                start = np.searchsorted(sorted_cells, cell, 'left')
+                count = np.searchsorted(sorted_cells, cell, 'right') - start
+                owner = np.repeat(np.arange(len(goats)), count)
+                offset = np.arange(len(owner)) - np.repeat(np.cumsum(count) - count, count)
+                owners.append(owner)
+                members.append(order[start[owner] + offset])
+
+        owner = np.concatenate(owners)
+        member = np.concatenate(members)
+        goat_index = goats[owner]
+        distance = (gx[owner] - cx[member]) ** 2 + (gy[owner] - cy[member]) ** 2
+        visible = (free_after[candidates[member]] < goat_index) & (claimed_by[candidates[member]] >= goat_index)
+        owner, member, distance = owner[visible], member[visible], distance[visible]
+
+        # Для каждой козы - пара с наименьшим расстоянием, при равенстве - капуста раньше в списке
+        ranking = np.lexsort((member, distance, owner))
+        first = ranking[np.r_[True, owner[ranking][1:] != owner[ranking][:-1]]] if len(ranking) else ranking
+
+        closest = np.full(len(goats), -1)
+        best_distance = np.full(len(goats), np.inf)
+        closest[owner[first]] = candidates[member[first]]
+        best_distance[owner[first]] = distance[first]
+        return closest, best_distance < cell_size ** 2
+
+    def _scan_closest(self, goats, candidates, free_after, claimed_by):
+        closest = np.full(len(goats), -1)
+        cx = self.cabbage["x"][candidates]
+        cy = self.cabbage["y"][candidates]
+        free_after = free_after[candidates]
+        claimed_by = claimed_by[candidates]
+        chunk_size = max(1, SEARCH_BLOCK // len(candidates))
+        for start in range(0, len(goats), chunk_size):
+            chunk = goats[start:start + chunk_size]
+            dx = self.goat["x"][chunk, None] - cx[None, :]
+            dy = self.goat["y"][chunk, None] - cy[None, :]
+            distance = dx * dx + dy * dy
+            hidden = (free_after[None, :] >= chunk[:, None]) | (claimed_by[None, :] < chunk[:, None])
+            distance[hidden] = np.inf
+            best = np.argmin(distance, axis=1)
+            found = np.isfinite(distance[np.arange(len(chunk)), best])
+            closest[start:start + len(chunk)] = np.where(found, candidates[best], -1)
+        return closest
+
+    def _is_near(self, goats, cabbages):
+        gx, gy, gs = self.goat["x"][goats], self.goat["y"][goats], self.goat["size"][goats]
+        cx, cy, cs = self.cabbage["x"][cabbages], self.cabbage["y"][cabbages], self.cabbage["size"][cabbages]
+        return (gx + gs >= cx) & (gx <= cx + cs) & (gy + gs >= cy) & (gy <= cy + cs)
+
+    def _release(self, goats):
+        self.cabbage["being_eaten"][self.goat["target"][goats]] = False
+        self.goat["eating"][goats] = False
+        self.goat["target"][goats] = -1
+
+    def eat_cabbage(self, goats):
+        goat, cabbage = self.goat, self.cabbage
+
+        # Капуста закончилась на прошлом шаге: коза только отпускает её
+        gone = goat["target"][goats] < 0
+        gone[~gone] = cabbage["size"][goat["target"][goats[~gone]]] <= 0
+        finished = goats[gone]
+        self._release(finished[goat["target"][finished] >= 0])
+        goat["eating"][finished] = False
+
+        goats = goats[~gone]
+        targets = goat["target"][goats]
+        eating_speed = goat["eating_speed"][goats]
+
+        self.food_eaten += float(np.minimum(eating_speed, cabbage["size"][targets]).sum())
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if self.bite_first:
+                cabbage["size"][targets] -= eating_speed
+
+            stamina = goat["stamina"][goats]
+            stamina_increase = np.minimum(cabbage["nutrition"][targets] * eating_speed / cabbage["size"][targets], 100 - stamina)
+            goat["stamina"][goats] = np.minimum(stamina + stamina_increase, 100)
+            goat["size"][goats] += 0.2 * goat["fertility"][goats]
+
+        if not self.bite_first:
+            cabbage["size"][targets] -= eating_speed
+            done = cabbage["size"][targets] <= 0
+            self._release(goats[done])
+            return goats[done], targets[done]
+
+        return goats[:0], targets[:0]
+
+    def _search(self, searchers, free_after):
+        """Захват капусты и цели движения так, как если бы козы ходили по очереди.
+
+        Капусту получает коза, которая раньше в списке; коза, у которой цель
+        заняла более ранняя коза, ищет заново. Возвращает цель движения каждой козы.
+        """
+        goat, cabbage = self.goat, self.cabbage
+        claimed_by = np.full(self.cabbage_count, self.goat_count)
+        claim = np.full(self.goat_count, -1)
+        move_target = np.full(self.goat_count, -1)
+
+        pending = searchers
+        while len(pending):
+            closest = self.find_closest_cabbages(pending, free_after, claimed_by)
+            found = closest >= 0
+            near = np.zeros(len(pending), np.bool_)
+            near[found] = self._is_near(pending[found], closest[found])
+
+            # pending отсортирован, поэтому первое вхождение капусты - коза раньше в списке
+            claims, first = np.unique(closest[near], return_index=True)
+            winners = pending[near][first]
+            previous = claimed_by[claims]
+            revoked = previous[previous < self.goat_count]
+            claim[revoked] = -1
+            claimed_by[claims] = winners
+            claim[winners] = claims
+
+            move_target[pending] = np.where(found, closest, -1)
+            move_target[winners] = -1
+
+            chasing = np.flatnonzero(move_target >= 0)
+            stale = chasing[claimed_by[move_target[chasing]] < chasing]
+            pending = np.union1d(stale, revoked)
+            move_target[pending] = -1
+
+        winners = np.flatnonzero(claim >= 0)
+        goat["eating"][winners] = True
+        goat["target"][winners] = claim[winners]
+        cabbage["being_eaten"][claim[winners]] = True
+        return move_target
+
+    def _move_towards(self, goats, targets):
+        dx = self.cabbage["x"][targets] - self.goat["x"][goats]
+        dy = self.cabbage["y"][targets] - self.goat["y"][goats]
+        distance = (dx ** 2 + dy ** 2) ** 0.5
+        moving = distance > 0
+        speed = self.goat["speed"][goats][moving]
+        self.goat["x"][goats[moving]] += (dx[moving] / distance[moving]) * speed
+        self.goat["y"][goats[moving]] += (dy[moving] / distance[moving]) * speed
+
+    def _wander(self, goats):
+        goat = self.goat
+        turn = goats[goat["steps"][goats] >= self.rng.integers(30, 61, len(goats))]
+        goat["wander_dx"][turn] = self.rng.choice([-1, 1], len(turn))
+        goat["wander_dy"][turn] = self.rng.choice([-1, 1], len(turn))
+        goat["steps"][turn] = 0
+
+        speed = goat["speed"][goats]
+        size = goat["size"][goats]
+        x = goat["x"][goats] + goat["wander_dx"][goats] * speed
+        y = goat["y"][goats] + goat["wander_dy"][goats] * speed
+        goat["x"][goats] = np.maximum(0, np.minimum(x, self.width - size))
+        goat["y"][goats] = np.maximum(0, np.minimum(y, self.height - size))
+        goat["steps"][goats] += 1
+
+    def _compact(self):
+        goat, cabbage = self.goat, self.cabbage
+
+        keep = cabbage["size"] > 0
+        if not keep.all():
+            new_index = np.cumsum(keep) - 1
+            targets = goat["target"]
+            has_target = targets >= 0
+            kept_target = np.zeros(len(targets), np.bool_)
+            kept_target[has_target] = keep[targets[has_target]]
+            goat["target"] = np.where(kept_target, new_index[np.maximum(targets, 0)], -1)
+            for name, _ in CABBAGE_FIELDS:
+                cabbage[name] = cabbage[name][keep]
+
+        alive = goat["size"] > 5
+        if not alive.all():
+            for name, _ in GOAT_FIELDS:
+                goat[name] = goat[name][alive]
+
+    def tick(self):
+        profiler = self.profiler
+        if profiler is not None:
+            mark = time.perf_counter()
+
+        goat = self.goat
+        goat["stamina"] = np.maximum(goat["stamina"] - self.stamina_decay * (goat["size"] / 20), 0)
+        goat["size"][goat["stamina"] <= 0] -= 0.01
+        if profiler is not None:
+            mark = profiler.lap("stamina", mark)
+
+        active = goat["size"] > 5
+        eating = active & goat["eating"]
+        free_after = np.where(self.cabbage["being_eaten"], self.goat_count, -1)
+        released_by, released = self.eat_cabbage(np.flatnonzero(eating))
+        # Освобождённая капуста видна только козам после той, что её доела
+        free_after[released] = released_by
+        if profiler is not None:
+            mark = profiler.lap("eating", mark)
+
+        move_target = self._search(np.flatnonzero(active & ~eating), free_after)
+        if profiler is not None:
+            mark = profiler.lap("search", mark)
+        movers = np.flatnonzero(move_target >= 0)
+        self._move_towards(movers, move_target[movers])
+        wanderers = np.flatnonzero(active & ~eating & ~goat["eating"] & (move_target < 0))
+        self._wander(wanderers)
+        self.wandering = len(wanderers)
+        if profiler is not None:
+            mark = profiler.lap("movement", mark)
+
+        self._compact()
+        self.tick_count += 1
+        if profiler is not None:
+            profiler.lap("compaction", mark)
+
+    def step(self):
+        profiler = self.profiler
+        if profiler is not None:
+            start = time.perf_counter()
+
+        self.tick()
+        if self.tick_count % self.cabbage_every == 0:
+            if profiler is not None:
+                mark = time.perf_counter()
+            self.generate_new_cabbage()
+            if profiler is not None:
+                profiler.lap("spawning", mark)
+
+        if profiler is not None:
+            profiler.lap("step", start)
+            profiler.end_tick()
+        if self.stats is not None:
+            self.stats.record(self)
+
+    def run(self, ticks):
+        for _ in range(ticks):
+            self.step()
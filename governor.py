@@ -0,0 +1,83 @@
+# Уровни качества от лучшего к худшему:
+# hover - подсказки под мышью, interpolate - промежуточные кадры между шагами,
+# dots - точки вместо кругов, render_every - перерисовка раз в столько периодов таймера,
+# tick_share - доля бюджета кадра на шаги симуляции (None - догонять по часам как обычно)
+QUALITY_LEVELS = (
+    {"name": "полное", "hover": True, "interpolate": True, "dots": False, "render_every": 1, "tick_share": None},
+    {"name": "без подсказок", "hover": False, "interpolate": True, "dots": False, "render_every": 1, "tick_share": None},
+    {"name": "без промежуточных кадров", "hover": False, "interpolate": False, "dots": False, "render_every": 1,
+     "tick_share": None},
+    {"name": "точки", "hover": False, "interpolate": False, "dots": True, "render_every": 2, "tick_share": 0.5},
+    {"name": "точки, редко", "hover": False, "interpolate": False, "dots": True, "render_every": 4, "tick_share": 0.5},
+)
+
+
+class QualityGovernor:
+    """Следит за ценой кадров окна и меняет уровень качества под бюджет.
+
+    Цена кадра - время update_frame и paintEvent, накопленное через add до
+    end_frame. Бюджет кадра растёт вместе с render_every уровня, а окно замера
+    в кадрах во столько же раз короче, так что по времени оно всегда около
+    window кадров по RENDER_MS. Окно закрывается и раньше, если цена кадров в
+    нём уже больше бюджета всего окна: так огромное стадо снижает качество за
+    пару кадров, а не за секунды. Среднее выше бюджета - уровень хуже; ниже
+    recover доли бюджета recover_windows окон подряд - уровень лучше.
+    """
+
+    def __init__(self, budget_ms, level=0, auto=True, window=30, recover=0.5, recover_windows=3):
+        self.budget = budget_ms / 1000
+        self.level = level
+        self.auto = auto
+        self.window = window
+        self.recover = recover
+        self.recover_windows = recover_windows
+
+        self.cost = 0.0
+        self.total = 0.0
+        self.frames = 0
+        self.calm = 0
+
+    @classmethod
+    def from_config(cls, config, budget_ms):
+        """"quality": "auto" или номер уровня из QUALITY_LEVELS, "frame_budget_ms": бюджет кадра."""
+        quality = config.get("quality", "auto")
+        auto = quality == "auto"
+        level = 0 if auto else min(max(int(quality), 0), len(QUALITY_LEVELS) - 1)
+        return cls(config.get("frame_budget_ms", budget_ms), level=level, auto=auto)
+
+    @property
+    def settings(self):
+        return QUALITY_LEVELS[self.level]
+
+    def label(self):
+        return f"Качество: {self.settings['name']}" + (", авто" if self.auto else "")
+
+    def add(self, seconds):
+        self.cost += seconds
+
+    def end_frame(self):
+        """Закрыть кадр; True, если уровень поменялся."""
+        self.total += self.cost
+        self.cost = 0.0
+        self.frames += 1
+        every = self.settings["render_every"]
+        budget = self.budget * every
+        if not self.auto or (self.frames < max(self.window // every, 1) and self.total < self.window * self.budget):
+            return False
+
+        mean = self.total / self.frames
+        self.total = 0.0
+        self.frames = 0
+        if mean > budget and self.level < len(QUALITY_LEVELS) - 1:
+            self.level += 1
+            self.calm = 0
+            return True
+        if mean < budget * self.recover and self.level > 0:
+            self.calm += 1
+            if self.calm >= self.recover_windows:
+                self.level -= 1
+                self.calm = 0
+                return True
+            return False
+        self.calm = 0
+        return False
@@ -1,552 +1,987 @@
-import sys
-import random
-import json
-import os
-from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QSlider, QLabel, QPushButton, QStackedWidget, QMenu, QFrame
-from PyQt6.QtGui import QPainter, QColor, QFont
-from PyQt6.QtCore import QTimer, QRectF, Qt
-
-class Cabbage:
-    def __init__(self, window_width, window_height):
-        self.x = random.randint(50, window_width - 50)
-        self.y = random.randint(50, window_height - 50)
-        self.size = random.randint(10, 30)
-        self.nutrition = self.size * 2
-        self.being_eaten = False
-
-    def is_eaten(self):
-        return self.size <= 0
-
-class Goat:
-    def __init__(self, window_width, window_height):
-        self.x = random.randint(50, window_width - 50)
-        self.y = random.randint(50, window_height - 50)
-        self.size = 20
-        self.speed = random.uniform(1.0, 3.0)
-        self.eating_speed = random.uniform(1.0, 3.0)
-        self.eating = False
-        self.moving = True
-        self.stamina = 100
-        self.target_cabbage = None
-        self.wander_direction = [random.choice([-1, 1]), random.choice([-1, 1])]
-        self.steps_in_direction = 0
-        self.fertility = random.uniform(0.1, 1.0)
-
-    def move_towards(self, target_x, target_y):
-        direction_x = target_x - self.x
-        direction_y = target_y - self.y
-        distance = (direction_x ** 2 + direction_y ** 2) ** 0.5
-
-        if distance > 0:
-            self.x += (direction_x / distance) * self.speed
-            self.y += (direction_y / distance) * self.speed
-
-    def is_near_cabbage(self, cabbage):
-        goat_left = self.x
-        goat_right = self.x + self.size
-        goat_top = self.y
-        goat_bottom = self.y + self.size
-
-        cabbage_left = cabbage.x
-        cabbage_right = cabbage.x + cabbage.size
-        cabbage_top = cabbage.y
-        cabbage_bottom = cabbage.y + cabbage.size
-
-        overlaps_horizontally = goat_right >= cabbage_left and goat_left <= cabbage_right
-        overlaps_vertically = goat_bottom >= cabbage_top and goat_top <= cabbage_bottom
-        
-        return overlaps_horizontally and overlaps_vertically
-
-    def wander(self, window_width, window_height):
-        if self.steps_in_direction >= random.randint(30, 60):
-            self.wander_direction = [random.choice([-1, 1]), random.choice([-1, 1])]
-            self.steps_in_direction = 0
-
-        self.x += self.wander_direction[0] * self.speed
-        self.y += self.wander_direction[1] * self.speed
-
-        self.x = max(0, min(self.x, window_width - self.size))
-        self.y = max(0, min(self.y, window_height - self.size))
-
-        self.steps_in_direction += 1
-
-
-class TheGame(QWidget):
-    def __init__(self, config_file='config.json'):
-        super().__init__()
-
-        self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
-        self.setFocus()
-
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        config_path = os.path.join(script_dir, config_file)
-
-        if not os.path.exists(config_path):
-            default_config = {
-                "window_width": 1500,
-                "window_height": 800,
-                "num_goats": 10,
-                "num_cabbages": 20,
-                "cabbage_generation_choices": [1, 2, 3, 4   ]
-            }
-            with open(config_path, 'w') as file:
-                json.dump(default_config, file, indent=4)
-
-        with open(config_path, 'r') as file:
-            config = json.load(file)
-
-        self.window_width = config["window_width"]
-        self.window_height = config["window_height"]
-        
-        num_goats = config["num_goats"]
-        num_cabbages = config["num_cabbages"]
-        self.cabbage_generation_choices = config["cabbage_generation_choices"]
-
-        self.cabbages = [Cabbage(self.window_width, self.window_height) for _ in range(num_cabbages)]
-        self.goats = [Goat(self.window_width, self.window_height) for _ in range(num_goats)]
-
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_frame)
-        self.timer.start(60)
-
-        self.cabbage_timer = QTimer(self)
-        self.cabbage_timer.timeout.connect(self.generate_new_cabbage)
-        self.cabbage_timer.start(3000)
-
-        self.paused = False
-        self.hovered_cabbage = None
-        self.hovered_goat = None
-
-        self.setMouseTracking(True)
-
-        self.init_settings_button()
-        self.init_settings_window()
-
-        self.setWindowTitle('Огород')
-
-        self.setGeometry(100, 100, self.window_width, self.window_height)
-        self.show()
-
-
-    def init_settings_window(self):
-        margin = 50
-        self.settings_window = QWidget(self)
-        self.settings_window.setGeometry(
-            margin,
-            margin,
-            self.window_width - 2 * margin,
-            self.window_height - 2 * margin
-        )
-        self.settings_window.setWindowFlags(Qt.WindowType.FramelessWindowHint)
-
-        self.settings_window.setStyleSheet("""
-            background-color: #fefefe;
-            border-radius: 12px;
-            border: 2px solid #D1D1D1;
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            font-size: 14px;
-            padding: 15px;
-        """)
-
-        layout = QVBoxLayout()
-
-        class CustomSlider(QSlider):
-            def __init__(self, orientation):
-                super().__init__(orientation)
-                self.setStyleSheet("""
-            QSlider{
-                background: #E3DEE2;
-            }
-            QSlider::groove:horizontal {  
-                height: 10px;
-                margin: 0px;
-                border-radius: 5px;
-                background: #B0AEB1;
-            }
-            QSlider::handle:horizontal {
-                background: #fff;
-                border: 1px solid #E3DEE2;
-                width: 17px;
-                margin: -5px 0; 
-                border-radius: 8px;
-            }
-            QSlider::sub-page:qlineargradient {
-                background: #3B99FC;
-                border-radius: 5px;
-            }
-        """)
-
-        cabbage_label = QLabel("Размер капусты")
-        cabbage_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
-        self.cabbage_size_slider = CustomSlider(Qt.Orientation.Horizontal)
-        self.cabbage_size_slider.setMinimum(1)
-        self.cabbage_size_slider.setMaximum(100)
-        self.cabbage_size_slider.setValue(20)
-        cabbage_value_label = QLabel(f"{self.cabbage_size_slider.value()}")
-        cabbage_value_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
-
-        self.cabbage_size_slider.valueChanged.connect(
-            lambda: cabbage_value_label.setText(f"{self.cabbage_size_slider.value()}")
-        )
-        layout.addWidget(cabbage_label)
-        layout.addWidget(self.cabbage_size_slider)
-        layout.addWidget(cabbage_value_label)
-
-        separator = QFrame(self)
-        separator.setFrameShape(QFrame.Shape.HLine)
-        separator.setFrameShadow(QFrame.Shadow.Sunken)
-        separator.setStyleSheet("background-color: #ff0000; height: 2px; margin: 10px 0;")
-        layout.addWidget(separator)
-
-        goat_label = QLabel("Размер стада")
-        goat_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
-        self.goat_size_slider = CustomSlider(Qt.Orientation.Horizontal)
-        self.goat_size_slider.setMinimum(10)
-        self.goat_size_slider.setMaximum(100)
-        self.goat_size_slider.setValue(20)
-        goat_value_label = QLabel(f"{self.goat_size_slider.value()}")
-        goat_value_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
-
-        self.goat_size_slider.valueChanged.connect(
-            lambda: goat_value_label.setText(f"{self.goat_size_slider.value()}")
-        )
-        layout.addWidget(goat_label)
-        layout.addWidget(self.goat_size_slider)
-        layout.addWidget(goat_value_label)
-
-        fertility_label = QLabel("Плодовитость стада")
-        fertility_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
-        self.goat_fertility_slider = CustomSlider(Qt.Orientation.Horizontal)
-        self.goat_fertility_slider.setMinimum(1)
-        self.goat_fertility_slider.setMaximum(5)
-        self.goat_fertility_slider.setValue(1)
-        fertility_value_label = QLabel(f"{self.goat_fertility_slider.value()}")
-        fertility_value_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
-
-        self.goat_fertility_slider.valueChanged.connect(
-            lambda: fertility_value_label.setText(f"{self.goat_fertility_slider.value()}")
-        )
-        layout.addWidget(fertility_label)
-        layout.addWidget(self.goat_fertility_slider)
-        layout.addWidget(fertility_value_label)
-
-        stamina_label = QLabel("Стамина стада")
-        stamina_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
-        self.goat_stamina_slider = CustomSlider(Qt.Orientation.Horizontal)
-        self.goat_stamina_slider.setMinimum(50)
-        self.goat_stamina_slider.setMaximum(150)
-        self.goat_stamina_slider.setValue(100)
-        stamina_value_label = QLabel(f"{self.goat_stamina_slider.value()}")
-        stamina_value_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
-
-        self.goat_stamina_slider.valueChanged.connect(
-            lambda: stamina_value_label.setText(f"{self.goat_stamina_slider.value()}")
-        )
-        layout.addWidget(stamina_label)
-        layout.addWidget(self.goat_stamina_slider)
-        layout.addWidget(stamina_value_label)
-
-        eating_speed_label = QLabel("Скорость поедания стада")
-        eating_speed_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
-        self.goat_eating_speed_slider = CustomSlider(Qt.Orientation.Horizontal)
-        self.goat_eating_speed_slider.setMinimum(1)
-        self.goat_eating_speed_slider.setMaximum(5)
-        self.goat_eating_speed_slider.setValue(1)
-        eating_speed_value_label = QLabel(f"{self.goat_eating_speed_slider.value()}")
-        eating_speed_value_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
-
-        self.goat_eating_speed_slider.valueChanged.connect(
-            lambda: eating_speed_value_label.setText(f"{self.goat_eating_speed_slider.value()}")
-        )
-        layout.addWidget(eating_speed_label)
-        layout.addWidget(self.goat_eating_speed_slider)
-        layout.addWidget(eating_speed_value_label)
-
-        speed_label = QLabel("Скорость стада")
-        speed_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
-        self.goat_speed_slider = CustomSlider(Qt.Orientation.Horizontal)
-        self.goat_speed_slider.setMinimum(1)
-        self.goat_speed_slider.setMaximum(5)
-        self.goat_speed_slider.setValue(1)
-        speed_value_label = QLabel(f"{self.goat_speed_slider.value()}")
-        speed_value_label   .setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
-
-        self.goat_speed_slider.valueChanged.connect(
-            lambda: speed_value_label.setText(f"{self.goat_speed_slider.value()}")
-        )
-        layout.addWidget(speed_label)
-        layout.addWidget(self.goat_speed_slider)
-        layout.addWidget(speed_value_label)
-
-        close_button = QPushButton("Закрыть настройки")
-        close_button.setStyleSheet("""
-            background-color: #0078d7;
-            color: white;
-            border-radius: 5px;
-            padding: 5px;
-        """)
-        close_button.clicked.connect(self.toggle_settings)
-        layout.addWidget(close_button)
-
-        self.settings_window.setLayout(layout)
-        self.settings_window.hide()
-
-    def init_settings_button(self):
-        self.settings_button = QPushButton("Настройки", self)
-        self.settings_button.setGeometry(10, 10, 100, 30)
-        self.settings_button.clicked.connect(self.toggle_settings)
-
-    def toggle_settings(self):
-        if self.settings_window.isVisible():
-            self.settings_window.hide()
-            self.paused = False
-        else:
-            self.settings_window.show()
-            self.paused = True
-
-    def eat_cabbage(self, goat, cabbage):
-        if cabbage.size <= 0:
-            goat.eating = False
-            cabbage.being_eaten = False
-            goat.target_cabbage = None
-            return
-
-        if cabbage.size > 0:
-            stamina_increase = min(cabbage.nutrition * goat.eating_speed / cabbage.size, 100 - goat.stamina)
-            goat.stamina = min(goat.stamina + stamina_increase, 100)
-            goat.size += 0.2 * goat.fertility
-
-        cabbage.size -= goat.eating_speed
-        if cabbage.size <= 0:
-            goat.eating = False
-            cabbage.being_eaten = False
-            goat.target_cabbage = None
-
-    def find_closest_cabbage(self, goat):
-        closest_cabbage = None
-        min_distance = float('inf')
-
-        for cabbage in self.cabbages:
-            if cabbage.being_eaten:
-                continue
-
-            distance = ((goat.x - cabbage.x) ** 2 + (goat.y - cabbage.y) ** 2) ** 0.5
-            if distance < min_distance:
-                min_distance = distance
-                closest_cabbage = cabbage
-
-        return closest_cabbage
-
-    def update_frame(self):
-        if self.paused:
-            return
-
-        for goat in self.goats:
-            goat.stamina = max(goat.stamina - 0.5 * (goat.size / 20), 0)
-
-            if goat.stamina <= 0:
-                goat.size -= 0.01
-
-            if goat.size > 5:
-                if goat.eating and goat.target_cabbage:
-                    self.eat_cabbage(goat, goat.target_cabbage)
-                else:
-                    closest_cabbage = self.find_closest_cabbage(goat)
-
-                    if closest_cabbage:
-                        if goat.is_near_cabbage(closest_cabbage):
-                            goat.eating = True
-                            goat.target_cabbage = closest_cabbage
-                            closest_cabbage.being_eaten = True
-                        else:
-                            goat.move_towards(closest_cabbage.x, closest_cabbage.y)
-                    else:
-                        goat.wander(self.window_width, self.window_height)
-
-        self.cabbages = [cabbage for cabbage in self.cabbages if cabbage.size > 0]
-        self.goats = [goat for goat in self.goats if goat.size > 5]
-        self.update()
-
-    def generate_new_cabbage(self):
-        if not self.paused:
-            num_new_cabbages = random.choice(self.cabbage_generation_choices)
-            for _ in range(num_new_cabbages):
-                self.cabbages.append(Cabbage(self.window_width, self.window_height))
-
-    def paintEvent(self, event):
-        painter = QPainter(self)
-
-        for goat in self.goats:
-            if goat.eating and goat.target_cabbage:
-                cabbage = goat.target_cabbage
-
-                goat_size = goat.size
-                cabbage_size = cabbage.size
-
-                center_x = (goat.x + cabbage.x) / 2
-                center_y = (goat.y + cabbage.y) / 2
-
-                painter.setBrush(QColor(0, 255, 0))  
-                painter.drawPie(QRectF(center_x - cabbage_size / 2, center_y - cabbage_size / 2, cabbage_size, cabbage_size), 90 * 16, 180 * 16)
-
-                painter.setBrush(QColor(255, 255, 255)) 
-                painter.drawPie(QRectF(center_x - goat_size / 2, center_y - goat_size / 2, goat_size, goat_size), 270 * 16, 180 * 16)
-            else:
-                painter.setBrush(QColor(255, 255, 255))
-                painter.drawEllipse(QRectF(goat.x, goat.y, goat.size, goat.size))
-
-        for cabbage in self.cabbages:
-            if not cabbage.is_eaten() and not cabbage.being_eaten:
-                painter.setBrush(QColor(0, 255, 0))
-                painter.drawEllipse(QRectF(cabbage.x, cabbage.y, cabbage.size, cabbage.size))
-
-        if self.hovered_cabbage:
-            font = QFont('Arial', 10)
-            painter.setFont(font)
-            info_text = f"Size: {self.hovered_cabbage.size:.1f}, Nutrition: {self.hovered_cabbage.nutrition:.1f}"
-            painter.drawText(int(self.hovered_cabbage.x + 20), int(self.hovered_cabbage.y - 10), info_text)
-
-        if self.hovered_goat:
-            font = QFont('Arial', 10)
-            painter.setFont(font)
-            info_text = f"Size: {self.hovered_goat.size:.1f}, Stamina: {self.hovered_goat.stamina:.1f}, Eating Speed: {self.hovered_goat.eating_speed:.1f}, Fertility: {self.hovered_goat.fertility:.1f}, Speed: {self.hovered_goat.speed:.1f}"
-            painter.drawText(int(self.hovered_goat.x + 20), int(self.hovered_goat.y - 10), info_text)
-
-    def mouseMoveEvent(self, event):
-        self.hovered_cabbage = None
-        self.hovered_goat = None
-        mouse_x = event.position().x()
-        mouse_y = event.position().y()
-
-        for cabbage in self.cabbages:
-            distance = ((cabbage.x + cabbage.size / 2 - mouse_x) ** 2 + (cabbage.y + cabbage.size / 2 - mouse_y) ** 2) ** 0.5
-            if distance <= cabbage.size / 2:
-                self.hovered_cabbage = cabbage
-                break
-
-        if not self.hovered_cabbage:  
-            for goat in self.goats:
-                distance = ((goat.x + goat.size / 2 - mouse_x) ** 2 + (goat.y + goat.size / 2 - mouse_y) ** 2) ** 0.5
-                if distance <= goat.size / 2:
-                    self.hovered_goat = goat
-                    break
-
-        self.update() 
-
-    def mousePressEvent(self, event):
-        x, y = event.position().x(), event.position().y()
-
-        if event.button() == Qt.MouseButton.RightButton:
-            for goat in self.goats:
-                if goat.x <= x <= goat.x + goat.size and goat.y <= y <= goat.y + goat.size:
-                    self.paused = True
-                    self.last_click_position = (x, y)
-                    context_menu = self.create_context_menu_for_object("goat", goat)
-                    context_menu.exec(event.globalPosition().toPoint())
-                    return
-
-            for cabbage in self.cabbages:
-                if cabbage.x <= x <= cabbage.x + cabbage.size and cabbage.y <= y <= cabbage.y + cabbage.size:
-                    self.paused = True
-                    self.last_click_position = (x, y)
-                    context_menu = self.create_context_menu_for_object("cabbage", cabbage)
-                    context_menu.exec(event.globalPosition().toPoint())
-                    return
-
-            self.last_click_position = (x, y)
-            context_menu = self.create_context_menu(x, y)
-            context_menu.exec(event.globalPosition().toPoint())
-
-    def create_context_menu(self, x, y):
-        menu = QMenu(self)
-
-        add_cabbage_action = menu.addAction("Добавить капусту")
-        add_cabbage_action.triggered.connect(lambda: self.add_cabbage(x, y))
-
-        add_goat_action = menu.addAction("Добавить стадо")
-        add_goat_action.triggered.connect(lambda: self.add_goat(x, y))
-
-        return menu
-
-    def create_context_menu_for_object(self, obj_type, obj):
-        menu = QMenu(self)
-
-        if obj_type == "goat":
-            modify_action = menu.addAction("Изменить параметры стада")
-            modify_action.triggered.connect(lambda: self.modify_goat(obj))
-        elif obj_type == "cabbage":
-            modify_action = menu.addAction("Изменить параметры капусты")
-            modify_action.triggered.connect(lambda: self.modify_cabbage(obj))
-
-        cancel_action = menu.addAction("Отмена")
-        cancel_action.triggered.connect(self.continue_game)
-
-        return menu
-    
-    def continue_game(self):
-        self.paused = False
-        self.update()
-
-    def add_cabbage(self, x, y):
-        cabbage_size = self.cabbage_size_slider.value()
-        new_cabbage = Cabbage(self.window_width, self.window_height)
-        new_cabbage.x = x
-        new_cabbage.y = y
-        new_cabbage.size = cabbage_size
-        new_cabbage.nutrition = cabbage_size * 2
-        self.cabbages.append(new_cabbage)
-        self.update()
-
-    def add_goat(self, x, y):
-        goat_size = self.goat_size_slider.value()
-        goat_speed = self.goat_speed_slider.value()
-        goat_fertility = self.goat_fertility_slider.value()
-        goat_stamina = self.goat_stamina_slider.value()
-        goat_eating_speed = self.goat_eating_speed_slider.value()
-
-        new_goat = Goat(self.window_width, self.window_height)
-        new_goat.x = x
-        new_goat.y = y
-        new_goat.size = goat_size
-        new_goat.speed = goat_speed
-        new_goat.fertility = goat_fertility
-        new_goat.stamina = goat_stamina
-        new_goat.eating_speed = goat_eating_speed
-        self.goats.append(new_goat)
-        self.update()
-
-    def modify_goat(self, goat):
-        goat.size = self.goat_size_slider.value()
-        goat.speed = self.goat_speed_slider.value()
-        goat.fertility = self.goat_fertility_slider.value()
-        goat.stamina = self.goat_stamina_slider.value()
-        goat.eating_speed = self.goat_eating_speed_slider.value()
-        self.paused = False
-        self.update()
-
-    def modify_cabbage(self, cabbage):
-        cabbage.size = self.cabbage_size_slider.value()
-        cabbage.nutrition = cabbage.size * 2
-        self.paused = False
-        self.update()
-
-    def keyPressEvent(self, event):
-        if event.key() == Qt.Key.Key_Space:
-            self.paused = not self.paused
-            self.update()
-        elif event.key() == Qt.Key.Key_Escape:
-            if self.settings_window.isVisible():
-                self.settings_window.hide()
-                self.paused = False
-            else:
-                self.settings_window.show()
-                self.paused = True
-        else:
-            super().keyPressEvent(event)
-
-def main():
-    app = QApplication(sys.argv)
-    ex = TheGame()
-    app.exec()
-
-main()
+import sys
+import os
+import json
+import time
+from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QSlider, QLabel, QPushButton, QStackedWidget, QMenu, QFrame
+from PyQt6.QtGui import QPainter, QRegion, QTransform
+from PyQt6.QtCore import QFileSystemWatcher, QTimer, QRect, Qt
+
+from garden import Garden, FixedStepClock, DEFAULT_CONFIGS, WARP_LEVELS, WARP_BUDGET_MS, load_config, check_choices
+from render import FieldRenderer, RASTER_THRESHOLD, wants_raster
+from governor import QualityGovernor
+
+# Грязные прямоугольники собираются в плитки такого размера
+DIRTY_TILE = 32
+
+# Период перерисовки в мс, от шага симуляции не зависит
+RENDER_MS = 16
+
+# Клавиши 1-4 выбирают ускорение времени по порядку WARP_LEVELS
+WARP_KEYS = dict(zip((Qt.Key.Key_1, Qt.Key.Key_2, Qt.Key.Key_3, Qt.Key.Key_4), WARP_LEVELS))
+
+# Камера: наибольшее приближение, шаг колеса и сдвиг стрелками в пикселях окна
+MAX_ZOOM = 8.0
+ZOOM_STEP = 1.25
+PAN_STEP = 100
+
+# Через сколько мс после последней записи в config.json он перечитывается: редактор пишет файл в несколько приёмов
+CONFIG_RELOAD_MS = 200
+# Ключи конфига, от которых зависит размер огорода и окна
+SIZE_KEYS = {"world_width", "world_height", "window_width", "window_height"}
+
+# Подписи рядов статистики (см. stats.STAT_FIELDS) и формат последнего значения
+CHART_ROWS = {
+    "goats": ("козы", "{:.0f}"),
+    "cabbage_mass": ("капуста", "{:.0f}"),
+    "mean_stamina": ("стамина", "{:.1f}"),
+    "eating": ("едят", "{:.0%}"),
+    "wandering": ("бродят", "{:.0%}"),
+}
+
+class TheGame(QWidget):
+    def __init__(self, config_file='config.json'):
+        super().__init__()
+
+        self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
+        self.setFocus()
+
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        config_path = os.path.join(script_dir, config_file)
+
+        config = load_config(config_path, DEFAULT_CONFIGS["prac_3"])
+
+        # С "replay" окно проигрывает запись garden.py --record вместо живого огорода
+        self.replay = None
+        self.worker = None
+        self.checkpoint_path = None
+        # С "stats" огород собирает статистику стада, G переключает графики по 1, 100 и 10000 шагов;
+        # "stats_export" - каталог, куда она ещё и пишется в CSV
+        self.stats = None
+        self.chart_level = None
+        self.chart_version = None
+        self.stats_export = config.get("stats_export") and os.path.join(script_dir, config["stats_export"])
+        if config.get("replay"):
+            from trajectory import Trajectory
+            self.replay = Trajectory(os.path.join(script_dir, config["replay"]))
+            self.garden = None
+            self.world_width = self.replay.width
+            self.world_height = self.replay.height
+        else:
+            # С "checkpoint" огород продолжается с сохранения и сохраняется при закрытии
+            if config.get("checkpoint"):
+                self.checkpoint_path = os.path.join(script_dir, config["checkpoint"])
+            if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+                import checkpoint
+                self.garden = checkpoint.load(self.checkpoint_path)
+            else:
+                self.garden = Garden.from_config(config, rules="prac_3")
+                # С "scenario" к огороду добавляются козы и капуста из файла сценария (см. scenario.py)
+                if config.get("scenario"):
+                    from scenario import load_scenario
+                    load_scenario(self.garden, os.path.join(script_dir, config["scenario"]))
+            self.world_width = self.garden.width
+            self.world_height = self.garden.height
+            self.garden.track_dirty = True
+            self.garden.interpolate = True
+            if config.get("stats", False):
+                # До запуска потока, чтобы в статистику попал и первый шаг
+                self.enable_stats()
+                self.chart_level = 0
+
+            # С "threaded" огород шагает в отдельном потоке, а окно рисует его снимки
+            if config.get("threaded", False):
+                from worker import SimulationWorker
+                self.garden.track_dirty = False
+                self.worker = SimulationWorker(self.garden)
+                self.worker.start()
+
+        # Огород с "world_width"/"world_height" больше окна; окно показывает его через камеру
+        self.window_width = min(config["window_width"], self.world_width)
+        self.window_height = min(config["window_height"], self.world_height)
+        # Камера: точка огорода в левом верхнем углу окна и масштаб
+        self.camera_x = 0.0
+        self.camera_y = 0.0
+        self.zoom = 1.0
+        self.drag_start = None
+
+        # Таймер только рисует, шаги симуляции (и появление капусты) отмеряет clock
+        self.clock = FixedStepClock()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.update_frame)
+        self.timer.start(RENDER_MS)
+
+        self.checkpoint_timer = QTimer(self)
+        self.checkpoint_timer.timeout.connect(self.save_checkpoint)
+        if self.checkpoint_path and config.get("checkpoint_minutes"):
+            self.checkpoint_timer.start(int(config["checkpoint_minutes"] * 60000))
+
+        self.paused = False
+        self.warp = 1
+        self.hovered_cabbage = None
+        self.hovered_goat = None
+        # Погибший объект Garden уходит в пул и возвращается с новым id, поэтому id запоминается отдельно
+        self.hovered_id = None
+        self.renderer = FieldRenderer()
+        self.raster = None
+        self.render_mode = config.get("render_mode", "auto")
+        self.raster_threshold = config.get("raster_threshold", RASTER_THRESHOLD)
+        self.painted_raster = False
+        self.painted_tooltip = QRect()
+
+        # Окно замеряет свои кадры и упрощает рисование, когда не укладывается в бюджет
+        self.governor = QualityGovernor.from_config(config, RENDER_MS)
+
+        # С "profile" шаги и рисование замеряются по фазам; P показывает сводку поверх поля
+        self.profiler = None
+        self.show_hud = False
+        self.profile_export = os.path.join(script_dir, config.get("profile_export", "profile.json"))
+        if config.get("profile", False):
+            self.enable_profiler()
+
+        # Правки config.json применяются на ходу, без перезапуска (см. reload_config)
+        self.config_path = config_path
+        self.config = config
+        self.config_watcher = QFileSystemWatcher([config_path], self)
+        self.config_timer = QTimer(self)
+        self.config_timer.setSingleShot(True)
+        self.config_timer.setInterval(CONFIG_RELOAD_MS)
+        self.config_timer.timeout.connect(self.reload_config)
+        self.config_watcher.fileChanged.connect(lambda path: self.config_timer.start())
+
+        self.mouse_position = (0, 0)
+        self.hover_timer = QTimer(self)
+        self.hover_timer.setSingleShot(True)
+        self.hover_timer.setInterval(16)
+        self.hover_timer.timeout.connect(self.refresh_hover)
+
+        self.setMouseTracking(True)
+
+        self.init_settings_button()
+        self.init_quality_label()
+        self.init_settings_window()
+        if self.replay is not None:
+            self.init_replay()
+
+        self.setWindowTitle('Огород')
+
+        self.setGeometry(100, 100, self.window_width, self.window_height)
+        self.apply_quality()
+        self.show()
+
+
+    def init_settings_window(self):
+        margin = 50
+        self.settings_window = QWidget(self)
+        self.settings_window.setGeometry(
+            margin,
+            margin,
+            self.window_width - 2 * margin,
+            self.window_height - 2 * margin
+        )
+        self.settings_window.setWindowFlags(Qt.WindowType.FramelessWindowHint)
+
+        self.settings_window.setStyleSheet("""
+            background-color: #fefefe;
+            border-radius: 12px;
+            border: 2px solid #D1D1D1;
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            font-size: 14px;
+            padding: 15px;
+        """)
+
+        layout = QVBoxLayout()
+
+        class CustomSlider(QSlider):
+            def __init__(self, orientation):
+                super().__init__(orientation)
+                self.setStyleSheet("""
+            QSlider{
+                background: #E3DEE2;
+            }
+            QSlider::groove:horizontal {  
+                height: 10px;
+                margin: 0px;
+                border-radius: 5px;
+                background: #B0AEB1;
+            }
+            QSlider::handle:horizontal {
+                background: #fff;
+                border: 1px solid #E3DEE2;
+                width: 17px;
+                margin: -5px 0; 
+                border-radius: 8px;
+            }
+            QSlider::sub-page:qlineargradient {
+                background: #3B99FC;
+                border-radius: 5px;
+            }
+        """)
+
+        cabbage_label = QLabel("Размер капусты")
+        cabbage_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
+        self.cabbage_size_slider = CustomSlider(Qt.Orientation.Horizontal)
+        self.cabbage_size_slider.setMinimum(1)
+        self.cabbage_size_slider.setMaximum(100)
+        self.cabbage_size_slider.setValue(20)
+        cabbage_value_label = QLabel(f"{self.cabbage_size_slider.value()}")
+        cabbage_value_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
+
+        self.cabbage_size_slider.valueChanged.connect(
+            lambda: cabbage_value_label.setText(f"{self.cabbage_size_slider.value()}")
+        )
+        layout.addWidget(cabbage_label)
+        layout.addWidget(self.cabbage_size_slider)
+        layout.addWidget(cabbage_value_label)
+
+        separator = QFrame(self)
+        separator.setFrameShape(QFrame.Shape.HLine)
+        separator.setFrameShadow(QFrame.Shadow.Sunken)
+        separator.setStyleSheet("background-color: #ff0000; height: 2px; margin: 10px 0;")
+        layout.addWidget(separator)
+
+        goat_label = QLabel("Размер стада")
+        goat_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
+        self.goat_size_slider = CustomSlider(Qt.Orientation.Horizontal)
+        self.goat_size_slider.setMinimum(10)
+        self.goat_size_slider.setMaximum(100)
+        self.goat_size_slider.setValue(20)
+        goat_value_label = QLabel(f"{self.goat_size_slider.value()}")
+        goat_value_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
+
+        self.goat_size_slider.valueChanged.connect(
+            lambda: goat_value_label.setText(f"{self.goat_size_slider.value()}")
+        )
+        layout.addWidget(goat_label)
+        layout.addWidget(self.goat_size_slider)
+        layout.addWidget(goat_value_label)
+
+        fertility_label = QLabel("Плодовитость стада")
+        fertility_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
+        self.goat_fertility_slider = CustomSlider(Qt.Orientation.Horizontal)
+        self.goat_fertility_slider.setMinimum(1)
+        self.goat_fertility_slider.setMaximum(5)
+        self.goat_fertility_slider.setValue(1)
+        fertility_value_label = QLabel(f"{self.goat_fertility_slider.value()}")
+        fertility_value_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
+
+        self.goat_fertility_slider.valueChanged.connect(
+            lambda: fertility_value_label.setText(f"{self.goat_fertility_slider.value()}")
+        )
+        layout.addWidget(fertility_label)
+        layout.addWidget(self.goat_fertility_slider)
+        layout.addWidget(fertility_value_label)
+
+        stamina_label = QLabel("Стамина стада")
+        stamina_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
+        self.goat_stamina_slider = CustomSlider(Qt.Orientation.Horizontal)
+        self.goat_stamina_slider.setMinimum(50)
+        self.goat_stamina_slider.setMaximum(150)
+        self.goat_stamina_slider.setValue(100)
+        stamina_value_label = QLabel(f"{self.goat_stamina_slider.value()}")
+        stamina_value_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
+
+        self.goat_stamina_slider.valueChanged.connect(
+            lambda: stamina_value_label.setText(f"{self.goat_stamina_slider.value()}")
+        )
+        layout.addWidget(stamina_label)
+        layout.addWidget(self.goat_stamina_slider)
+        layout.addWidget(stamina_value_label)
+
+        eating_speed_label = QLabel("Скорость поедания стада")
+        eating_speed_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
+        self.goat_eating_speed_slider = CustomSlider(Qt.Orientation.Horizontal)
+        self.goat_eating_speed_slider.setMinimum(1)
+        self.goat_eating_speed_slider.setMaximum(5)
+        self.goat_eating_speed_slider.setValue(1)
+        eating_speed_value_label = QLabel(f"{self.goat_eating_speed_slider.value()}")
+        eating_speed_value_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
+
+        self.goat_eating_speed_slider.valueChanged.connect(
+            lambda: eating_speed_value_label.setText(f"{self.goat_eating_speed_slider.value()}")
+        )
+        layout.addWidget(eating_speed_label)
+        layout.addWidget(self.goat_eating_speed_slider)
+        layout.addWidget(eating_speed_value_label)
+
+        speed_label = QLabel("Скорость стада")
+        speed_label.setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
+        self.goat_speed_slider = CustomSlider(Qt.Orientation.Horizontal)
+        self.goat_speed_slider.setMinimum(1)
+        self.goat_speed_slider.setMaximum(5)
+        self.goat_speed_slider.setValue(1)
+        speed_value_label = QLabel(f"{self.goat_speed_slider.value()}")
+        speed_value_label   .setStyleSheet("font-weight: bold; color:black; margin-bottom: 10px;")
+
+        self.goat_speed_slider.valueChanged.connect(
+            lambda: speed_value_label.setText(f"{self.goat_speed_slider.value()}")
+        )
+        layout.addWidget(speed_label)
+        layout.addWidget(self.goat_speed_slider)
+        layout.addWidget(speed_value_label)
+
+        close_button = QPushButton("Закрыть настройки")
+        close_button.setStyleSheet("""
+            background-color: #0078d7;
+            color: white;
+            border-radius: 5px;
+            padding: 5px;
+        """)
+        close_button.clicked.connect(self.toggle_settings)
+        layout.addWidget(close_button)
+
+        self.settings_window.setLayout(layout)
+        self.settings_window.hide()
+
+    def init_settings_button(self):
+        self.settings_button = QPushButton("Настройки", self)
+        self.settings_button.setGeometry(10, 10, 100, 30)
+        self.settings_button.clicked.connect(self.toggle_settings)
+
+    def init_quality_label(self):
+        self.quality_label = QLabel(self)
+        self.quality_label.move(10, 45)
+        self.quality_label.setStyleSheet("color: white; background-color: rgba(0, 0, 0, 120); padding: 2px;")
+
+    def apply_quality(self):
+        """Включить настройки текущего уровня качества."""
+        settings = self.governor.settings
+        self.timer.setInterval(RENDER_MS * settings["render_every"])
+        if self.garden is not None and self.worker is None and self.garden.interpolate != settings["interpolate"]:
+            if settings["interpolate"]:
+                # Без интерполяции положения до шага не обновлялись
+                for goat in self.garden.goats:
+                    goat.prev_x, goat.prev_y = goat.x, goat.y
+            self.garden.interpolate = settings["interpolate"]
+        if not settings["hover"]:
+            self.hovered_cabbage = self.hovered_goat = None
+            self.hovered_id = None
+        self.quality_label.setText(self.governor.label())
+        self.quality_label.adjustSize()
+        self.update()
+
+    def reload_config(self):
+        """Применить изменённый config.json: выбор числа новой капусты, размеры огорода и окна, рисование, качество.
+
+        Число коз и капусты, поток, запись и прочее действуют только при запуске.
+        """
+        # Редактор мог заменить файл новым, и старый больше не наблюдается
+        if self.config_path not in self.config_watcher.files() and os.path.exists(self.config_path):
+            self.config_watcher.addPath(self.config_path)
+        try:
+            with open(self.config_path) as file:
+                config = json.load(file)
+        except (OSError, ValueError):
+            # Файл ещё дописывается или с ошибкой: прежний конфиг остаётся до следующей правки
+            return
+        if any(key not in config for key in DEFAULT_CONFIGS["prac_3"]):
+            return
+        try:
+            check_choices(config["cabbage_generation_choices"])
+        except ValueError:
+            return
+        changed = {key for key in config.keys() | self.config.keys() if config.get(key) != self.config.get(key)}
+        self.config = config
+        if not changed:
+            return
+
+        if self.garden is not None:
+            self.edit("reconfigure", config)
+        if changed & SIZE_KEYS:
+            if self.garden is not None:
+                self.world_width = config.get("world_width", config["window_width"])
+                self.world_height = config.get("world_height", config["window_height"])
+            self.window_width = min(config["window_width"], self.world_width)
+            self.window_height = min(config["window_height"], self.world_height)
+            self.resize(self.window_width, self.window_height)
+            self.set_camera(self.camera_x, self.camera_y, self.zoom)
+
+        self.render_mode = config.get("render_mode", "auto")
+        self.raster_threshold = config.get("raster_threshold", RASTER_THRESHOLD)
+        if changed & {"quality", "frame_budget_ms"}:
+            self.governor = QualityGovernor.from_config(config, RENDER_MS)
+            self.apply_quality()
+        self.update()
+
+    def init_replay(self):
+        # Позиция в записи дробная, чтобы скорость могла быть меньше кадра за шаг
+        self.replay_position = 0.0
+        self.replay_speed = 1.0
+        self.replay_index = None
+        self.replay_frame = None
+
+        self.replay_slider = QSlider(Qt.Orientation.Horizontal, self)
+        self.replay_slider.setGeometry(120, 10, self.window_width - 130, 30)
+        self.replay_slider.setRange(0, max(len(self.replay) - 1, 0))
+        self.replay_slider.valueChanged.connect(self.seek_replay)
+        self.show_replay_frame()
+
+    def seek_replay(self, index):
+        self.replay_position = float(index)
+        self.show_replay_frame()
+
+    def advance_replay(self):
+        if self.paused:
+            self.clock.reset()
+            return
+        steps = self.clock.advance()
+        if not steps:
+            return
+
+        # Запись может ещё дописываться, пока её смотрят
+        shown = len(self.replay)
+        self.replay.refresh()
+        if not shown:
+            self.replay_index = None
+        last = max(len(self.replay) - 1, 0)
+        self.replay_slider.setMaximum(last)
+        self.replay_position = min(max(self.replay_position + steps * self.replay_speed, 0.0), float(last))
+        self.show_replay_frame()
+
+    def show_replay_frame(self):
+        index = int(self.replay_position)
+        if index != self.replay_index:
+            self.replay_index = index
+            self.replay_frame = self.replay.frame(index)
+        self.replay_slider.blockSignals(True)
+        self.replay_slider.setValue(index)
+        self.replay_slider.blockSignals(False)
+        self.setWindowTitle(f'Огород: запись, шаг {self.replay_frame.tick_count}, x{self.replay_speed:g}')
+        self.update()
+
+    def replay_key(self, key):
+        """Перемотка записи с клавиатуры; False, если клавиша не про запись."""
+        if key == Qt.Key.Key_Left:
+            self.seek_replay(max(self.replay_index - 1, 0))
+        elif key == Qt.Key.Key_Right:
+            self.seek_replay(min(self.replay_index + 1, max(len(self.replay) - 1, 0)))
+        elif key == Qt.Key.Key_Home:
+            self.seek_replay(0)
+        elif key == Qt.Key.Key_End:
+            self.seek_replay(max(len(self.replay) - 1, 0))
+        elif key == Qt.Key.Key_Up:
+            self.replay_speed *= 2
+        elif key == Qt.Key.Key_Down:
+            self.replay_speed /= 2
+        elif key == Qt.Key.Key_R:
+            self.replay_speed = -self.replay_speed
+        else:
+            return False
+        self.show_replay_frame()
+        return True
+
+    def enable_profiler(self):
+        from profiler import PhaseProfiler
+        self.profiler = PhaseProfiler()
+        if self.garden is not None:
+            self.garden.profiler = self.profiler
+
+    def hud_rect(self, lines=None):
+        if not self.show_hud or self.profiler is None:
+            return QRect()
+        return self.renderer.hud_rect(self.width() - 10, 50, lines or self.profiler.hud_lines())
+
+    def enable_stats(self):
+        from stats import ChunkedCSVWriter, StatsRecorder
+        writer = ChunkedCSVWriter(self.stats_export) if self.stats_export else None
+        self.stats = StatsRecorder(writer=writer)
+        self.garden.stats = self.stats
+
+    def chart_rect(self):
+        if self.chart_level is None:
+            return QRect()
+        return self.renderer.chart_rect(self.width() - 10, self.height() - 10, len(CHART_ROWS))
+
+    def toggle_chart(self):
+        # Запись проигрывается без огорода, статистику собирать не с чего
+        if self.garden is None:
+            return
+        if self.stats is None:
+            self.enable_stats()
+        self.update(self.chart_rect())
+        # Графики по шагам, по сотням, по десяткам тысяч и снова скрыты
+        if self.chart_level is None:
+            self.chart_level = 0
+        elif self.chart_level + 1 < len(self.stats.series):
+            self.chart_level += 1
+        else:
+            self.chart_level = None
+        self.update(self.chart_rect())
+
+    def draw_chart(self, painter):
+        from stats import STAT_FIELDS
+        series = self.stats.series[self.chart_level]
+        ticks, values = series.ordered()
+        rows = []
+        for column, field in enumerate(STAT_FIELDS):
+            label, value_format = CHART_ROWS[field]
+            if len(values):
+                label = f"{label} {value_format.format(values[-1, column])}"
+            rows.append((label, values[:, column]))
+        title = f"шагов на точку: {series.resolution}" + (f", шаг {ticks[-1]}" if len(ticks) else "")
+        rect = self.chart_rect()
+        self.renderer.draw_chart(painter, rect, (self.stats.version, self.chart_level, rect.getRect()), title, rows)
+        self.chart_version = self.stats.version
+
+    def toggle_hud(self):
+        if self.profiler is None:
+            self.enable_profiler()
+        self.show_hud = not self.show_hud
+        self.update()
+
+    def shows_snapshots(self):
+        # Снимок потока и кадр записи рисуются одинаково: целиком и без грязных прямоугольников
+        return self.worker is not None or self.replay is not None
+
+    def view(self):
+        """QTransform из координат огорода в координаты окна."""
+        return QTransform(self.zoom, 0, 0, self.zoom, -self.camera_x * self.zoom, -self.camera_y * self.zoom)
+
+    def to_world(self, x, y):
+        return x / self.zoom + self.camera_x, y / self.zoom + self.camera_y
+
+    def to_screen(self, x, y):
+        return (x - self.camera_x) * self.zoom, (y - self.camera_y) * self.zoom
+
+    def shows_whole_world(self, left=0, top=0, right=None, bottom=None):
+        """Виден ли весь огород в прямоугольнике окна (по умолчанию во всём окне)."""
+        left, top = self.to_world(left, top)
+        right, bottom = self.to_world(self.width() if right is None else right, self.height() if bottom is None else bottom)
+        return left <= 0 and top <= 0 and right >= self.world_width and bottom >= self.world_height
+
+    def set_camera(self, x, y, zoom=None):
+        if zoom is not None:
+            # Отдалять дальше, чем нужно, чтобы огород целиком влез в окно, незачем
+            fit = min(1.0, self.width() / self.world_width, self.height() / self.world_height)
+            self.zoom = min(max(zoom, fit), MAX_ZOOM)
+        # Камера не уходит за край огорода, а огород уже окна стоит по центру
+        span_x = self.width() / self.zoom
+        span_y = self.height() / self.zoom
+        self.camera_x = (self.world_width - span_x) / 2 if span_x >= self.world_width else min(max(x, 0), self.world_width - span_x)
+        self.camera_y = (self.world_height - span_y) / 2 if span_y >= self.world_height else min(max(y, 0), self.world_height - span_y)
+        self.update()
+
+    def zoom_at(self, x, y, factor):
+        # Точка огорода под курсором остаётся под курсором
+        world_x, world_y = self.to_world(x, y)
+        self.set_camera(self.camera_x, self.camera_y, self.zoom * factor)
+        self.set_camera(world_x - x / self.zoom, world_y - y / self.zoom)
+
+    def camera_key(self, key):
+        """Сдвиг и масштаб камеры с клавиатуры; False, если клавиша не про камеру."""
+        step = PAN_STEP / self.zoom
+        # В записи стрелки перематывают её, камера там двигается только мышью
+        if self.replay is None and key in (Qt.Key.Key_Left, Qt.Key.Key_Right, Qt.Key.Key_Up, Qt.Key.Key_Down):
+            shift_x = {Qt.Key.Key_Left: -step, Qt.Key.Key_Right: step}.get(key, 0)
+            shift_y = {Qt.Key.Key_Up: -step, Qt.Key.Key_Down: step}.get(key, 0)
+            self.set_camera(self.camera_x + shift_x, self.camera_y + shift_y)
+        elif key in (Qt.Key.Key_Plus, Qt.Key.Key_Equal):
+            self.zoom_at(self.width() / 2, self.height() / 2, ZOOM_STEP)
+        elif key == Qt.Key.Key_Minus:
+            self.zoom_at(self.width() / 2, self.height() / 2, 1 / ZOOM_STEP)
+        elif key == Qt.Key.Key_0:
+            # Весь огород в окне
+            self.set_camera(0, 0, 0)
+        else:
+            return False
+        return True
+
+    def toggle_settings(self):
+        if self.settings_window.isVisible():
+            self.settings_window.hide()
+            self.paused = False
+        else:
+            self.settings_window.show()
+            self.paused = True
+
+    def world(self):
+        """Что показывать: огород, в потоковом режиме его последний снимок, при просмотре кадр записи."""
+        if self.replay is not None:
+            return self.replay_frame
+        if self.worker is not None:
+            return self.worker.snapshot
+        return self.garden
+
+    def world_alpha(self, world):
+        if self.warp != 1 or not self.governor.settings["interpolate"]:
+            # В ускорении между кадрами десятки шагов, на низком качестве рисуется только последний шаг
+            return 1.0
+        if self.shows_snapshots():
+            return world.alpha()
+        return self.clock.alpha
+
+    def update_frame(self):
+        start = time.perf_counter()
+        self.step_frame()
+        self.governor.add(time.perf_counter() - start)
+        if self.governor.end_frame():
+            self.apply_quality()
+
+    def step_frame(self):
+        if self.replay is not None:
+            self.advance_replay()
+            return
+
+        if self.worker is not None:
+            # Шаги делает поток, окно только перерисовывается
+            if self.worker.error is not None:
+                # Поток остановился на ошибке: на экране последний снимок, причина в заголовке
+                self.setWindowTitle(f'Огород: поток остановлен, {type(self.worker.error).__name__}: {self.worker.error}')
+            self.worker.paused = self.paused
+            self.update()
+            return
+
+        if self.paused:
+            self.clock.reset()
+            return
+
+        settings = self.governor.settings
+        if self.warp != 1:
+            # Пачка шагов ограничена бюджетом кадра, рисуется только последнее состояние
+            steps = self.clock.advance()
+            self.garden.run_for(WARP_BUDGET_MS / 1000, steps if self.warp else None)
+        elif settings["tick_share"] is not None:
+            # На низком качестве шаги тоже в бюджете кадра: не влезшие пропускаются,
+            # и огород идёт медленнее, а окно не встаёт
+            steps = self.clock.advance()
+            self.garden.run_for(settings["tick_share"] * self.governor.budget * settings["render_every"], steps)
+        else:
+            for _ in range(self.clock.advance()):
+                self.garden.step()
+        if self.garden.track_dirty and settings["interpolate"]:
+            self.garden.mark_moving_dirty()
+        self.update_dirty()
+
+    def hover_info(self, world=None):
+        world = world or self.world()
+        cabbage, goat = self.hovered_cabbage, self.hovered_goat
+        if self.shows_snapshots():
+            # Объект под мышью берётся из свежего снимка по id
+            cabbage = cabbage and world.cabbages_by_id.get(cabbage.id)
+            goat = goat and world.goats_by_id.get(goat.id)
+        elif (cabbage or goat) and (cabbage or goat).id != self.hovered_id:
+            cabbage = goat = None
+
+        # Подсказка рисуется в координатах окна
+        if cabbage:
+            return (*self.to_screen(cabbage.x, cabbage.y), self.renderer.cabbage_tooltip(cabbage))
+        if goat:
+            return (*self.to_screen(*goat.position(self.world_alpha(world))), self.renderer.goat_tooltip(goat))
+        return None
+
+    def tooltip_rect(self, world=None):
+        info = self.hover_info(world)
+        if info is None:
+            return QRect()
+        return self.renderer.tooltip_rect(*info)
+
+    def tooltip_region(self):
+        # Старая подсказка стирается, новая рисуется с новым текстом
+        return QRegion(self.painted_tooltip).united(QRegion(self.tooltip_rect()))
+
+    def field_renderer(self, world=None):
+        world = world or self.world()
+        if not wants_raster(self.render_mode, self.raster_threshold, world.goat_count + world.cabbage_count):
+            return self.renderer
+
+        # NumPy нужен только растровому режиму
+        if self.raster is None:
+            from raster import RasterRenderer
+            self.raster = RasterRenderer(self.width(), self.height())
+        elif (self.raster.width, self.raster.height) != (self.width(), self.height()):
+            self.raster.resize(self.width(), self.height())
+        return self.raster
+
+    def update_dirty(self):
+        if self.shows_snapshots():
+            self.update()
+            return
+
+        # Растровый кадр, кадр после пачки ускоренных шагов и часть большого огорода
+        # перерисовываются целиком: в последнем случае грязные прямоугольники пришлось бы
+        # собирать по всему огороду ради того, что видно в окне. Точки на низком качестве
+        # тоже: нарисовать их все дешевле, чем собрать и отфильтровать прямоугольники
+        full = (self.field_renderer(self.garden) is self.raster or self.warp != 1 or not self.shows_whole_world()
+                or self.governor.settings["dots"])
+        self.garden.track_dirty = not full
+        if full or self.painted_raster:
+            self.garden.take_dirty()
+            self.update()
+            return
+
+        tiles = set()
+        for left, top, right, bottom in self.garden.take_dirty():
+            left, top = self.to_screen(left, top)
+            right, bottom = self.to_screen(right, bottom)
+            for tile_y in range(int(top - 2) // DIRTY_TILE, int(bottom + 2) // DIRTY_TILE + 1):
+                for tile_x in range(int(left - 2) // DIRTY_TILE, int(right + 2) // DIRTY_TILE + 1):
+                    tiles.add((tile_y, tile_x))
+
+        # Соседние плитки одной строки сливаются в полосу
+        region = self.tooltip_region().united(QRegion(self.hud_rect()))
+        if self.stats is not None and self.stats.version != self.chart_version:
+            region = region.united(QRegion(self.chart_rect()))
+        run_start = None
+        previous = None
+        for tile in sorted(tiles):
+            if previous is None or tile != (previous[0], previous[1] + 1):
+                if run_start is not None:
+                    region = region.united(self.tile_run(run_start, previous))
+                run_start = tile
+            previous = tile
+        if run_start is not None:
+            region = region.united(self.tile_run(run_start, previous))
+
+        if not region.isEmpty():
+            self.update(region)
+
+    def tile_run(self, first, last):
+        return QRect(first[1] * DIRTY_TILE, first[0] * DIRTY_TILE, (last[1] - first[1] + 1) * DIRTY_TILE, DIRTY_TILE)
+
+    def entities_in_region(self, world, region):
+        """Что рисовать в области окна: всё, если в ней виден весь огород, иначе выборка из сеток."""
+        area = region.boundingRect()
+        if self.shows_whole_world(area.left(), area.top(), area.right() + 1, area.bottom() + 1):
+            return world.goats, world.cabbages
+
+        # Запас в пару пикселей окна: контур и округление у растрового вывода
+        left, top = self.to_world(area.left() - 2, area.top() - 2)
+        right, bottom = self.to_world(area.right() + 3, area.bottom() + 3)
+        goats = world.goats_in_rect(left, top, right, bottom)
+        cabbages = world.cabbages_in_rect(left, top, right, bottom)
+        if region.rectCount() > 1 and not self.shows_snapshots():
+            # Точные границы рисунка есть только у живого огорода
+            goats = [goat for goat in goats if self.bounds_in_region(world.goat_bounds(goat), region)]
+            cabbages = [cabbage for cabbage in cabbages if self.bounds_in_region(world.cabbage_bounds(cabbage), region)]
+
+        # Порядок рисования как у списков: кто создан позже, тот сверху
+        return sorted(goats, key=lambda goat: goat.id), sorted(cabbages, key=lambda cabbage: cabbage.id)
+
+    def bounds_in_region(self, bounds, region):
+        left, top, right, bottom = bounds
+        left, top = self.to_screen(left, top)
+        right, bottom = self.to_screen(right, bottom)
+        return region.intersects(QRect(int(left) - 1, int(top) - 1, int(right - left) + 3, int(bottom - top) + 3))
+
+    def paintEvent(self, event):
+        start = time.perf_counter()
+        painter = QPainter(self)
+        # Снимок читается один раз: поток может опубликовать новый посреди рисования
+        world = self.world()
+        renderer = self.field_renderer(world)
+        self.painted_raster = renderer is self.raster
+        renderer.dots = self.governor.settings["dots"]
+        # Рисуется только то, что попало в окно: у большого огорода это малая часть
+        goats, cabbages = self.entities_in_region(world, event.region())
+        renderer.draw_field(painter, goats, cabbages, self.world_alpha(world), self.view())
+
+        info = self.hover_info(world)
+        if info:
+            self.renderer.draw_tooltip(painter, *info)
+        self.painted_tooltip = self.tooltip_rect(world)
+
+        if self.profiler is not None and self.show_hud:
+            lines = self.profiler.hud_lines()
+            self.renderer.draw_hud(painter, self.hud_rect(lines), lines)
+        if self.chart_level is not None:
+            self.draw_chart(painter)
+        painter.end()
+        elapsed = time.perf_counter() - start
+        self.governor.add(elapsed)
+        if self.profiler is not None:
+            self.profiler.record("paint", elapsed)
+
+    def mouseMoveEvent(self, event):
+        if self.drag_start is not None:
+            # Огород тянется за мышью
+            start_x, start_y, camera_x, camera_y = self.drag_start
+            self.set_camera(camera_x - (event.position().x() - start_x) / self.zoom,
+                            camera_y - (event.position().y() - start_y) / self.zoom)
+
+        # Несколько движений мыши за кадр сводятся к одной проверке
+        self.mouse_position = (event.position().x(), event.position().y())
+        if not self.hover_timer.isActive():
+            self.hover_timer.start()
+
+    def refresh_hover(self):
+        if not self.governor.settings["hover"]:
+            return
+        mouse_x, mouse_y = self.to_world(*self.mouse_position)
+        world = self.world()
+        hovered_cabbage = world.cabbage_at(mouse_x, mouse_y)
+        hovered_goat = None if hovered_cabbage else world.goat_at(mouse_x, mouse_y)
+        hovered = hovered_cabbage or hovered_goat
+        hovered_id = hovered.id if hovered else None
+
+        if hovered_cabbage is not self.hovered_cabbage or hovered_goat is not self.hovered_goat or hovered_id != self.hovered_id:
+            self.hovered_cabbage = hovered_cabbage
+            self.hovered_goat = hovered_goat
+            self.hovered_id = hovered_id
+            self.update(self.tooltip_region())
+
+    def wheelEvent(self, event):
+        self.zoom_at(event.position().x(), event.position().y(), ZOOM_STEP ** (event.angleDelta().y() / 120))
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.drag_start = None
+
+    def resizeEvent(self, event):
+        self.set_camera(self.camera_x, self.camera_y, self.zoom)
+        super().resizeEvent(event)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.drag_start = (event.position().x(), event.position().y(), self.camera_x, self.camera_y)
+            return
+
+        if self.replay is not None:
+            # Запись только смотрят, правок в ней нет
+            return
+
+        x, y = self.to_world(event.position().x(), event.position().y())
+
+        if event.button() == Qt.MouseButton.RightButton:
+            world = self.world()
+            goat = world.goat_at(x, y, box=True)
+            if goat:
+                self.paused = True
+                self.last_click_position = (x, y)
+                context_menu = self.create_context_menu_for_object("goat", goat)
+                context_menu.exec(event.globalPosition().toPoint())
+                return
+
+            cabbage = world.cabbage_at(x, y, box=True)
+            if cabbage:
+                self.paused = True
+                self.last_click_position = (x, y)
+                context_menu = self.create_context_menu_for_object("cabbage", cabbage)
+                context_menu.exec(event.globalPosition().toPoint())
+                return
+
+            self.last_click_position = (x, y)
+            context_menu = self.create_context_menu(x, y)
+            context_menu.exec(event.globalPosition().toPoint())
+
+    def create_context_menu(self, x, y):
+        menu = QMenu(self)
+
+        add_cabbage_action = menu.addAction("Добавить капусту")
+        add_cabbage_action.triggered.connect(lambda: self.add_cabbage(x, y))
+
+        add_goat_action = menu.addAction("Добавить стадо")
+        add_goat_action.triggered.connect(lambda: self.add_goat(x, y))
+
+        return menu
+
+    def create_context_menu_for_object(self, obj_type, obj):
+        menu = QMenu(self)
+
+        if obj_type == "goat":
+            modify_action = menu.addAction("Изменить параметры стада")
+            modify_action.triggered.connect(lambda: self.modify_goat(obj))
+        elif obj_type == "cabbage":
+            modify_action = menu.addAction("Изменить параметры капусты")
+            modify_action.triggered.connect(lambda: self.modify_cabbage(obj))
+
+        cancel_action = menu.addAction("Отмена")
+        cancel_action.triggered.connect(self.continue_game)
+
+        return menu
+    
+    def continue_game(self):
+        self.paused = False
+        self.update()
+
+    def edit(self, method, *args, **kwargs):
+        # В потоковом режиме правка уходит в очередь потока и применится между шагами
+        if self.worker is not None:
+            self.worker.submit(method, *args, **kwargs)
+        else:
+            getattr(self.garden, method)(*args, **kwargs)
+
+    def add_cabbage(self, x, y):
+        self.edit("add_cabbage", x, y, self.cabbage_size_slider.value())
+        self.update_dirty()
+
+    def add_goat(self, x, y):
+        self.edit("add_goat", x, y, **self.goat_slider_values())
+        self.update_dirty()
+
+    def modify_goat(self, goat):
+        self.edit("modify_goat", goat, **self.goat_slider_values())
+        self.paused = False
+        self.update_dirty()
+
+    def modify_cabbage(self, cabbage):
+        self.edit("modify_cabbage", cabbage, self.cabbage_size_slider.value())
+        self.paused = False
+        self.update_dirty()
+
+    def goat_slider_values(self):
+        return {
+            "size": self.goat_size_slider.value(),
+            "speed": self.goat_speed_slider.value(),
+            "fertility": self.goat_fertility_slider.value(),
+            "stamina": self.goat_stamina_slider.value(),
+            "eating_speed": self.goat_eating_speed_slider.value(),
+        }
+
+    def save_checkpoint(self):
+        if self.checkpoint_path:
+            self.edit("save_checkpoint", self.checkpoint_path)
+
+    def closeEvent(self, event):
+        if self.worker is not None:
+            self.worker.stop()
+        if self.profiler is not None:
+            self.profiler.export(self.profile_export)
+        if self.stats is not None:
+            self.stats.close()
+        if self.checkpoint_path:
+            # Поток уже остановлен, поэтому сохранять можно прямо из окна
+            self.garden.save_checkpoint(self.checkpoint_path)
+        super().closeEvent(event)
+
+    def set_warp(self, warp):
+        self.warp = warp
+        speed = warp or 1
+        self.clock.speed = speed
+        if self.worker is not None:
+            self.worker.clock.speed = speed
+            self.worker.warp = warp
+        self.setWindowTitle('Огород' if warp == 1 else f'Огород: ускорение x{warp or "max"}')
+        self.update()
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key.Key_Space:
+            self.paused = not self.paused
+            self.update()
+        elif self.replay is not None and self.replay_key(event.key()):
+            pass
+        elif self.replay is None and event.key() in WARP_KEYS:
+            self.set_warp(WARP_KEYS[event.key()])
+        elif self.camera_key(event.key()):
+            pass
+        elif event.key() == Qt.Key.Key_P:
+            self.toggle_hud()
+        elif event.key() == Qt.Key.Key_G:
+            self.toggle_chart()
+        elif event.key() == Qt.Key.Key_F5:
+            self.save_checkpoint()
+        elif event.key() == Qt.Key.Key_Escape:
+            if self.settings_window.isVisible():
+                self.settings_window.hide()
+                self.paused = False
+            else:
+                self.settings_window.show()
+                self.paused = True
+        else:
+            super().keyPressEvent(event)
+
+def main():
+    app = QApplication(sys.argv)
+    ex = TheGame()
+    app.exec()
+
+if __name__ == '__main__':
+    main()
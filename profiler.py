@@ -0,0 +1,97 @@
+import csv
+import json
+import time
+
+# Фазы шага огорода; step - весь шаг вместе с тем, что не попало в фазы
+TICK_PHASES = ("stamina", "search", "movement", "eating", "compaction", "spawning", "step")
+PHASES = TICK_PHASES + ("paint",)
+
+PERCENTILES = (50, 95, 99)
+
+
+class RingBuffer:
+    """Последние size значений; старые затираются по кругу."""
+
+    def __init__(self, size):
+        self.values = [0.0] * size
+        self.index = 0
+        self.count = 0
+
+    def append(self, value):
+        self.values[self.index] = value
+        self.index = (self.index + 1) % len(self.values)
+        self.count = min(self.count + 1, len(self.values))
+
+    def ordered(self):
+        """Значения от старого к новому."""
+        if self.count < len(self.values):
+            return self.values[:self.count]
+        return self.values[self.index:] + self.values[:self.index]
+
+
+def percentile(ordered, q):
+    # ordered уже отсортирован; ближайший ранг без интерполяции
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class PhaseProfiler:
+    """Время фаз шага по последним size шагам.
+
+    Garden копит время фаз за шаг через lap и отдаёт его одной выборкой в
+    end_tick; paint окно пишет сразу через record. Пока garden.profiler
+    равен None, в шаге остаются только проверки на None.
+    """
+
+    def __init__(self, size=600):
+        self.buffers = {phase: RingBuffer(size) for phase in PHASES}
+        self.pending = dict.fromkeys(TICK_PHASES, 0.0)
+
+    def lap(self, phase, mark):
+        """Добавить к фазе время от mark до сейчас и вернуть сейчас как следующую отметку."""
+        now = time.perf_counter()
+        self.pending[phase] += now - mark
+        return now
+
+    def end_tick(self):
+        pending = self.pending
+        for phase in TICK_PHASES:
+            self.buffers[phase].append(pending[phase])
+            pending[phase] = 0.0
+
+    def record(self, phase, seconds):
+        self.buffers[phase].append(seconds)
+
+    def summary(self):
+        """Для каждой фазы: число выборок, среднее, перцентили и максимум в миллисекундах."""
+        result = {}
+        for phase, buffer in self.buffers.items():
+            ordered = sorted(buffer.ordered())
+            row = {"samples": len(ordered), "mean": sum(ordered) / len(ordered) * 1000 if ordered else 0.0}
+            for q in PERCENTILES:
+                row[f"p{q}"] = percentile(ordered, q) * 1000
+            row["max"] = ordered[-1] * 1000 if ordered else 0.0
+            result[phase] = row
+        return result
+
+    def hud_lines(self):
+        lines = [f"{'ms':<10}" + "".join(f"{'p' + str(q):>7}" for q in PERCENTILES)]
+        for phase, row in self.summary().items():
+            lines.append(f"{phase:<10}" + "".join(f"{row[f'p{q}']:7.2f}" for q in PERCENTILES))
+        return lines
+
+    def export(self, path):
+        """JSON со сводкой и выборками или CSV со сводкой - по расширению path."""
+        summary = self.summary()
+        if path.endswith(".csv"):
+            with open(path, 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=["phase", *next(iter(summary.values()))])
+                writer.writeheader()
+                for phase, row in summary.items():
+                    writer.writerow({"phase": phase, **row})
+            return
+
+        samples = {phase: [value * 1000 for value in buffer.ordered()] for phase, buffer in self.buffers.items()}
+        with open(path, 'w') as file:
+            json.dump({"summary": summary, "samples_ms": samples}, file, indent=4)
@@ -0,0 +1,191 @@
+import numpy as np
+from PyQt6.QtGui import QImage
+
+from render import GOAT_COLOR, CABBAGE_COLOR, DOT_SIZE, FieldRenderer
+
+
+OUTLINE = 0xff000000
+
+
+class RasterRenderer:
+    """Растровый режим для очень больших популяций.
+
+    Круги не рисуются QPainter'ом по одному: каждая строка круга даёт отрезок,
+    концы отрезков складываются в разностный массив, а cumsum превращает его в
+    маску покрытия слоя. Контур получается расширением маски на пиксель.
+    Кадр лежит в массиве NumPy, QImage смотрит в ту же память без копии и
+    выводится одним drawImage.
+
+    Внутри слоя контуры сливаются: соседние круги одного цвета рисуются
+    общим пятном, а не перекрывают друг друга по порядку создания.
+
+    С dots, как у FieldRenderer, вместо кругов ставятся точки в центрах.
+    """
+
+    def __init__(self, width, height):
+        self.margin = 2
+        self.dots = False
+        self.rows_cache = {}
+        self.resize(width, height)
+
+    def resize(self, width, height):
+        self.width = width
+        self.height = height
+        self.frame = np.zeros((height, width), np.uint32)
+        # QImage не копирует кадр, поэтому массив живёт вместе с ним в self.frame
+        self.image = QImage(self.frame.data, width, height, width * 4, QImage.Format.Format_ARGB32_Premultiplied)
+
+    def disc_rows(self, size):
+        """Строки круга диаметром size: номер строки, левый и правый край (не включая)."""
+        rows = self.rows_cache.get(size)
+        if rows is None:
+            radius = size / 2
+            dy = np.arange(size)
+            half = np.sqrt(np.maximum(radius * radius - (dy + 0.5 - radius) ** 2, 0))
+            left = np.floor(radius - half + 0.5).astype(np.int32)
+            right = np.floor(radius + half + 0.5).astype(np.int32)
+            keep = right > left
+            rows = dy[keep].astype(np.int32), left[keep], right[keep]
+            self.rows_cache[size] = rows
+        return rows
+
+    def coverage(self, x, y, size, half=None):
+        """Маска пикселей, покрытых кругами (или их половинками: 'left'/'right'), с полем margin."""
+        margin = self.margin
+        stride = self.width + 2 * margin
+
+        sizes = np.maximum(np.round(size).astype(np.int32), 1)
+        # Поле шире любого круга, так что отрезки не переходят на соседнюю строку;
+        # круги за краем кадра прижимаются к полю так, чтобы и контур остался за краем
+        left_x = np.clip(np.round(x).astype(np.int32), 1 - margin, self.width + 1)
+        top_y = np.clip(np.round(y).astype(np.int32), 1 - margin, self.height + 1)
+        base = (top_y + margin) * stride + left_x + margin
+
+        starts = []
+        ends = []
+        for size_value in np.unique(sizes):
+            selected = base[sizes == size_value][:, None]
+            dy, left, right = self.disc_rows(int(size_value))
+            center = (size_value + 1) // 2
+            if half == 'left':
+                right = np.minimum(right, center)
+            elif half == 'right':
+                left = np.maximum(left, center)
+            row_start = selected + dy * stride
+            starts.append((row_start + left).ravel())
+            ends.append((row_start + np.maximum(left, right)).ravel())
+
+        mask = np.zeros((self.height + 2 * margin, stride), bool)
+        if not starts:
+            return mask
+
+        # Разностный массив строится только по полосе строк, где есть круги
+        starts = np.concatenate(starts)
+        ends = np.concatenate(ends)
+        first_row = int(top_y.min()) + margin
+        last_row = int(top_y.max()) + margin + int(sizes.max())
+        offset = first_row * stride
+        length = (last_row - first_row) * stride
+
+        widths = ends - starts
+        total = int(widths.sum())
+        if total < length:
+            # Мало пикселей: быстрее разложить отрезки в индексы и записать их напрямую
+            run_start = np.repeat(starts - np.cumsum(widths) + widths, widths)
+            mask.ravel()[run_start + np.arange(total)] = True
+            return mask
+
+        counts = np.bincount(starts - offset, minlength=length + 1)
+        counts -= np.bincount(ends - offset, minlength=length + 1)
+        mask[first_row:last_row] = (np.cumsum(counts[:length], dtype=np.int32) > 0).reshape(-1, stride)
+        return mask
+
+    def paint_layer(self, mask, color):
+        margin = self.margin
+        inner = mask[margin - 1:margin + self.height + 1, margin - 1:margin + self.width + 1]
+        body = inner[1:-1, 1:-1]
+
+        outline = body.copy()
+        outline |= inner[:-2, 1:-1]
+        outline |= inner[2:, 1:-1]
+        outline |= inner[1:-1, :-2]
+        outline |= inner[1:-1, 2:]
+
+        self.frame[outline] = OUTLINE
+        self.frame[body] = color
+
+    def paint_dots(self, x, y, color):
+        # Квадрат DOT_SIZE вокруг каждого центра; точки за краем кадра отбрасываются
+        x = np.round(x).astype(np.int32) - DOT_SIZE // 2
+        y = np.round(y).astype(np.int32) - DOT_SIZE // 2
+        for dy in range(DOT_SIZE):
+            for dx in range(DOT_SIZE):
+                keep = (x + dx >= 0) & (x + dx < self.width) & (y + dy >= 0) & (y + dy < self.height)
+                self.frame[y[keep] + dy, x[keep] + dx] = color
+
+    def draw_field(self, painter, goats, cabbages, alpha=1.0, view=None):
+        # Камера - сдвиг и одинаковый масштаб по осям, её проще применить к столбцам, чем к QImage
+        scale, shift_x, shift_y = (1.0, 0.0, 0.0) if view is None else (view.m11(), view.dx(), view.dy())
+        if self.dots:
+            self.draw_dots(goats, cabbages, alpha, scale, shift_x, shift_y)
+            painter.drawImage(0, 0, self.image)
+            return
+
+        largest = max((item.size for item in goats), default=0)
+        largest = max(largest, max((item.size for item in cabbages), default=0))
+        self.margin = max(self.margin, int(largest * scale) + 4)
+        self.frame.fill(0)
+
+        bitten = [goat for goat in goats if goat.eating and goat.target_cabbage]
+        walking = [goat for goat in goats if not (goat.eating and goat.target_cabbage)]
+        free = [cabbage for cabbage in cabbages if not cabbage.is_eaten() and not cabbage.being_eaten]
+
+        # Тот же порядок слоёв, что у FieldRenderer
+        if bitten:
+            centers = np.array([FieldRenderer.bite_center(goat, alpha) for goat in bitten])
+            center_x, center_y = centers[:, 0] * scale + shift_x, centers[:, 1] * scale + shift_y
+            cabbage_size = np.array([goat.target_cabbage.size for goat in bitten]) * scale
+            goat_size = np.array([goat.size for goat in bitten]) * scale
+
+            self.paint_layer(self.coverage(center_x - cabbage_size / 2, center_y - cabbage_size / 2, cabbage_size, 'left'), CABBAGE_COLOR.rgba())
+            self.paint_layer(self.coverage(center_x - goat_size / 2, center_y - goat_size / 2, goat_size, 'right'), GOAT_COLOR.rgba())
+
+        if walking:
+            x, y, size = self.columns(walking)
+            if alpha < 1.0:
+                count = len(walking)
+                prev_x = np.fromiter((goat.prev_x for goat in walking), float, count)
+                prev_y = np.fromiter((goat.prev_y for goat in walking), float, count)
+                x = prev_x + (x - prev_x) * alpha
+                y = prev_y + (y - prev_y) * alpha
+            self.paint_layer(self.coverage(x * scale + shift_x, y * scale + shift_y, size * scale), GOAT_COLOR.rgba())
+        if free:
+            x, y, size = self.columns(free)
+            self.paint_layer(self.coverage(x * scale + shift_x, y * scale + shift_y, size * scale), CABBAGE_COLOR.rgba())
+
+        painter.drawImage(0, 0, self.image)
+
+    def draw_dots(self, goats, cabbages, alpha, scale, shift_x, shift_y):
+        self.frame.fill(0)
+        free = [cabbage for cabbage in cabbages if not cabbage.is_eaten() and not cabbage.being_eaten]
+        if goats:
+            x, y, size = self.columns(goats)
+            if alpha < 1.0:
+                count = len(goats)
+                prev_x = np.fromiter((goat.prev_x for goat in goats), float, count)
+                prev_y = np.fromiter((goat.prev_y for goat in goats), float, count)
+                x = prev_x + (x - prev_x) * alpha
+                y = prev_y + (y - prev_y) * alpha
+            self.paint_dots((x + size / 2) * scale + shift_x, (y + size / 2) * scale + shift_y, GOAT_COLOR.rgba())
+        if free:
+            x, y, size = self.columns(free)
+            self.paint_dots((x + size / 2) * scale + shift_x, (y + size / 2) * scale + shift_y, CABBAGE_COLOR.rgba())
+
+    @staticmethod
+    def columns(items):
+        count = len(items)
+        return (
+            np.fromiter((item.x for item in items), float, count),
+            np.fromiter((item.y for item in items), float, count),
+            np.fromiter((item.size for item in items), float, count),
+        )
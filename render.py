@@ -0,0 +1,236 @@
+from PyQt6.QtGui import QBrush, QColor, QFont, QFontMetrics, QPainter, QPen, QPixmap, QPolygonF, QStaticText, QTransform
+from PyQt6.QtCore import QPointF, QRect, QRectF, Qt
+
+
+GOAT_COLOR = QColor(255, 255, 255)
+CABBAGE_COLOR = QColor(0, 255, 0)
+HUD_BACKGROUND = QColor(0, 0, 0, 170)
+CHART_LINE = QColor(255, 200, 0)
+
+# В режиме "auto" растровый вывод включается с этого числа объектов
+RASTER_THRESHOLD = 3000
+
+# Шаг размеров спрайтов: 2 значит полпикселя
+SPRITE_STEPS = 2
+
+# Сторона точки в пикселях окна при упрощённом рисовании
+DOT_SIZE = 3
+
+# Панель графиков статистики: ширина, высота полосы одного ряда и ширина подписей
+CHART_WIDTH = 320
+CHART_ROW = 36
+CHART_LABEL_WIDTH = 110
+
+CABBAGE_TOOLTIP = "Size: {:.1f}, Nutrition: {:.1f}"
+GOAT_TOOLTIP = "Size: {:.1f}, Stamina: {:.1f}, Eating Speed: {:.1f}, Fertility: {:.1f}, Speed: {:.1f}"
+
+
+def wants_raster(render_mode, raster_threshold, entity_count):
+    """render_mode из конфига: "vector", "raster" или "auto"."""
+    if render_mode == "auto":
+        return entity_count >= raster_threshold
+    return render_mode == "raster"
+
+
+class FieldRenderer:
+    """Рисует поле с закэшированными кистями, шрифтом и спрайтами кругов.
+
+    Целые круги коз и капусты рисуются готовыми QPixmap по цвету и размеру,
+    половинки при поедании собираются по цвету, чтобы кисть менялась дважды
+    за кадр, а не на каждом объекте.
+
+    С dots каждый объект - точка в центре, все точки цвета рисуются одним
+    drawPoints: так окно держит огромное стадо, когда не успевает со спрайтами.
+    """
+
+    def __init__(self):
+        self.pen = QPen(QColor(0, 0, 0))
+        self.goat_brush = QBrush(GOAT_COLOR)
+        self.cabbage_brush = QBrush(CABBAGE_COLOR)
+        self.font = QFont('Arial', 10)
+        self.metrics = QFontMetrics(self.font)
+        # Столбцы чисел в сводке профайлера ровнее моноширинным шрифтом
+        self.hud_font = QFont('Monospace', 9)
+        self.hud_font.setStyleHint(QFont.StyleHint.TypeWriter)
+        self.hud_metrics = QFontMetrics(self.hud_font)
+
+        # Косметическое перо: точка одного размера при любом масштабе камеры
+        self.goat_dot_pen = QPen(GOAT_COLOR, DOT_SIZE)
+        self.goat_dot_pen.setCosmetic(True)
+        self.cabbage_dot_pen = QPen(CABBAGE_COLOR, DOT_SIZE)
+        self.cabbage_dot_pen.setCosmetic(True)
+        self.dots = False
+
+        self.sprites = {}
+        self.tooltip_key = None
+        self.tooltip = None
+        self.chart_pen = QPen(CHART_LINE)
+        self.chart_key = None
+        self.chart_lines = None
+
+    def sprite(self, brush, size):
+        # Размер округляется до полупикселя, чтобы кэш не рос от дробных размеров
+        key = (brush is self.goat_brush, round(size * SPRITE_STEPS))
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            size = key[1] / SPRITE_STEPS
+            sprite = QPixmap(int(size) + 3, int(size) + 3)
+            sprite.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(sprite)
+            painter.setPen(self.pen)
+            painter.setBrush(brush)
+            painter.drawEllipse(QRectF(1, 1, size, size))
+            painter.end()
+            self.sprites[key] = sprite
+        return sprite
+
+    def draw_field(self, painter, goats, cabbages, alpha=1.0, view=None):
+        """alpha: доля пути коз от положения до шага к текущему, 1.0 рисует текущее.
+
+        view - QTransform из координат огорода в координаты окна (камера).
+        """
+        draw = self._draw_dots if self.dots else self._draw_field
+        if view is None:
+            draw(painter, goats, cabbages, alpha)
+            return
+        painter.save()
+        painter.setWorldTransform(view)
+        draw(painter, goats, cabbages, alpha)
+        painter.restore()
+
+    def _draw_dots(self, painter, goats, cabbages, alpha):
+        # Поедаемая капуста скрыта под козой, как и у спрайтов; свободная капуста сверху
+        goat_points = []
+        for goat in goats:
+            x, y = (goat.x, goat.y) if alpha >= 1.0 else goat.position(alpha)
+            goat_points.append(QPointF(x + goat.size / 2, y + goat.size / 2))
+        cabbage_points = [QPointF(cabbage.x + cabbage.size / 2, cabbage.y + cabbage.size / 2)
+                          for cabbage in cabbages if not cabbage.is_eaten() and not cabbage.being_eaten]
+
+        painter.setPen(self.goat_dot_pen)
+        painter.drawPoints(QPolygonF(goat_points))
+        painter.setPen(self.cabbage_dot_pen)
+        painter.drawPoints(QPolygonF(cabbage_points))
+
+    def _draw_field(self, painter, goats, cabbages, alpha):
+        bitten = []
+        walking = []
+        for goat in goats:
+            if goat.eating and goat.target_cabbage:
+                bitten.append(goat)
+            else:
+                walking.append(goat)
+
+        # Половинки поедаемой капусты, потом козы, потом свободная капуста
+        if bitten:
+            painter.setPen(self.pen)
+            painter.setBrush(self.cabbage_brush)
+            centers = [self.bite_center(goat, alpha) for goat in bitten]
+            for goat, (center_x, center_y) in zip(bitten, centers):
+                half = goat.target_cabbage.size / 2
+                painter.drawPie(QRectF(center_x - half, center_y - half, goat.target_cabbage.size, goat.target_cabbage.size), 90 * 16, 180 * 16)
+
+            painter.setBrush(self.goat_brush)
+            for goat, (center_x, center_y) in zip(bitten, centers):
+                half = goat.size / 2
+                painter.drawPie(QRectF(center_x - half, center_y - half, goat.size, goat.size), 270 * 16, 180 * 16)
+
+        draw = painter.drawPixmap
+        if alpha >= 1.0:
+            for goat in walking:
+                draw(round(goat.x) - 1, round(goat.y) - 1, self.sprite(self.goat_brush, goat.size))
+        else:
+            for goat in walking:
+                x, y = goat.position(alpha)
+                draw(round(x) - 1, round(y) - 1, self.sprite(self.goat_brush, goat.size))
+
+        for cabbage in cabbages:
+            if not cabbage.is_eaten() and not cabbage.being_eaten:
+                draw(round(cabbage.x) - 1, round(cabbage.y) - 1, self.sprite(self.cabbage_brush, cabbage.size))
+
+    @staticmethod
+    def bite_center(goat, alpha):
+        x, y = (goat.x, goat.y) if alpha >= 1.0 else goat.position(alpha)
+        return (x + goat.target_cabbage.x) / 2, (y + goat.target_cabbage.y) / 2
+
+    def cabbage_tooltip(self, cabbage):
+        return self._tooltip(CABBAGE_TOOLTIP, (cabbage.size, cabbage.nutrition))
+
+    def goat_tooltip(self, goat):
+        return self._tooltip(GOAT_TOOLTIP, (goat.size, goat.stamina, goat.eating_speed, goat.fertility, goat.speed))
+
+    def _tooltip(self, template, values):
+        # Строка и раскладка текста пересобираются только при смене значений
+        key = (template, values)
+        if key != self.tooltip_key:
+            self.tooltip_key = key
+            self.tooltip = QStaticText(template.format(*values))
+            self.tooltip.setTextFormat(Qt.TextFormat.PlainText)
+            self.tooltip.prepare(QTransform(), self.font)
+        return self.tooltip
+
+    def tooltip_rect(self, x, y, tooltip):
+        return self.metrics.boundingRect(tooltip.text()).translated(int(x + 20), int(y - 10)).adjusted(-2, -2, 2, 2)
+
+    def draw_tooltip(self, painter, x, y, tooltip):
+        # drawText ставил базовую линию в (x + 20, y - 10), QStaticText рисуется от верхнего края
+        painter.setFont(self.font)
+        painter.drawStaticText(QPointF(int(x + 20), int(y - 10) - self.metrics.ascent()), tooltip)
+
+    def hud_rect(self, right, top, lines):
+        width = max(self.hud_metrics.horizontalAdvance(line) for line in lines) + 8
+        return QRect(right - width, top, width, self.hud_metrics.lineSpacing() * len(lines) + 8)
+
+    def draw_hud(self, painter, rect, lines):
+        painter.save()
+        painter.fillRect(rect, HUD_BACKGROUND)
+        painter.setPen(GOAT_COLOR)
+        painter.setFont(self.hud_font)
+        baseline = rect.top() + 4 + self.hud_metrics.ascent()
+        for line in lines:
+            painter.drawText(rect.left() + 4, baseline, line)
+            baseline += self.hud_metrics.lineSpacing()
+        painter.restore()
+
+    def chart_rect(self, right, bottom, rows):
+        height = self.hud_metrics.lineSpacing() + rows * CHART_ROW + 8
+        return QRect(right - CHART_WIDTH, bottom - height, CHART_WIDTH, height)
+
+    def draw_chart(self, painter, rect, key, title, rows):
+        """rows: (подпись, значения) по рядам; каждый ряд растянут на высоту своей полосы.
+
+        Ломаные собираются заново, только когда меняется key (версия статистики и место панели).
+        """
+        if key != self.chart_key:
+            self.chart_key = key
+            self.chart_lines = [(label, self._chart_line(values, rect, row)) for row, (label, values) in enumerate(rows)]
+
+        painter.save()
+        painter.fillRect(rect, HUD_BACKGROUND)
+        painter.setFont(self.hud_font)
+        painter.setPen(GOAT_COLOR)
+        painter.drawText(rect.left() + 4, rect.top() + 4 + self.hud_metrics.ascent(), title)
+        for row, (label, line) in enumerate(self.chart_lines):
+            painter.setPen(GOAT_COLOR)
+            painter.drawText(rect.left() + 4, self._chart_top(rect, row) + CHART_ROW // 2 + self.hud_metrics.ascent() // 2, label)
+            painter.setPen(self.chart_pen)
+            painter.drawPolyline(line)
+        painter.restore()
+
+    def _chart_top(self, rect, row):
+        return rect.top() + 4 + self.hud_metrics.lineSpacing() + row * CHART_ROW
+
+    def _chart_line(self, values, rect, row):
+        # Точек не больше, чем пикселей по ширине графика
+        left = rect.left() + CHART_LABEL_WIDTH
+        width = rect.right() - 4 - left
+        stride = max(1, -(-len(values) // width))
+        values = values[::-1][::stride][::-1]
+        if not len(values):
+            return QPolygonF()
+        low, high = float(values.min()), float(values.max())
+        scale = (CHART_ROW - 6) / (high - low) if high > low else 0.0
+        bottom = self._chart_top(rect, row) + CHART_ROW - 3
+        step = width / max(len(values) - 1, 1)
+        return QPolygonF([QPointF(left + index * step, bottom - (value - low) * scale)
+                          for index, value in enumerate(values.tolist())])
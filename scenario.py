@@ -0,0 +1,112 @@
+import json
+
+import numpy as np
+
+# Столбцы сценария и значения для пропущенных; без x и y объекта нет
+SCENARIO_FIELDS = {
+    "goats": {"x": None, "y": None, "size": 20.0, "speed": 2.0, "eating_speed": 2.0, "fertility": 0.5, "stamina": 100.0},
+    "cabbages": {"x": None, "y": None, "size": 20.0},
+}
+# Приставки имён массивов в .npz, как в checkpoint.py
+NPZ_PREFIXES = {"goats": "goat_", "cabbages": "cabbage_"}
+
+# По столько объектов в куске: строка JSONL при записи, срез массивов .npz при чтении
+CHUNK_ROWS = 65536
+
+
+def _columns(kind, given, where):
+    fields = SCENARIO_FIELDS[kind]
+    unknown = set(given) - set(fields)
+    if unknown:
+        raise ValueError(f"{where}: у {kind} неизвестные столбцы {sorted(unknown)}")
+    missing = [name for name, default in fields.items() if default is None and name not in given]
+    if missing:
+        raise ValueError(f"{where}: у {kind} нет столбцов {missing}")
+
+    count = len(given["x"])
+    columns = {}
+    for name, default in fields.items():
+        if name not in given:
+            columns[name] = np.full(count, default)
+            continue
+        columns[name] = np.asarray(given[name], np.float64)
+        if len(columns[name]) != count:
+            raise ValueError(f"{where}: у {kind} столбцы разной длины")
+    return columns
+
+
+def _jsonl_chunks(path):
+    # Строка - кусок по столбцам: {"goats": {"x": [...], "y": [...], ...}, "cabbages": {...}}
+    with open(path) as file:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            where = f"{path}:{number}"
+            unknown = set(chunk) - set(SCENARIO_FIELDS)
+            if unknown:
+                raise ValueError(f"{where}: неизвестные ключи {sorted(unknown)}")
+            for kind in SCENARIO_FIELDS:
+                if kind in chunk:
+                    yield kind, _columns(kind, chunk[kind], where)
+
+
+def _npz_chunks(path, chunk_rows):
+    with np.load(path, allow_pickle=False) as data:
+        for kind, prefix in NPZ_PREFIXES.items():
+            given = {name[len(prefix):]: data[name] for name in data.files if name.startswith(prefix)}
+            if not given:
+                continue
+            columns = _columns(kind, given, path)
+            for start in range(0, len(columns["x"]), chunk_rows):
+                yield kind, {name: column[start:start + chunk_rows] for name, column in columns.items()}
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS):
+    """Куски сценария по очереди: ("goats" или "cabbages", столбцы float64).
+
+    .npz - массивы goat_x, goat_y, ..., cabbage_x, ...; остальное читается
+    как JSONL, по куску на строку. В памяти всегда только один кусок JSONL.
+    """
+    if path.endswith(".npz"):
+        return _npz_chunks(path, chunk_rows)
+    return _jsonl_chunks(path)
+
+
+def load_scenario(world, path, chunk_rows=CHUNK_ROWS):
+    """Добавить в огород коз и капусту из сценария; вернуть, сколько добавлено тех и других."""
+    objects = not hasattr(world, "goat")
+    added = dict.fromkeys(SCENARIO_FIELDS, 0)
+    for kind, columns in read_chunks(path, chunk_rows):
+        if objects:
+            # Объекты Garden хранят числа Python: со скалярами NumPy шаг заметно медленнее
+            columns = {name: column.tolist() for name, column in columns.items()}
+        if kind == "goats":
+            world.add_goats(columns)
+        else:
+            world.add_cabbages(columns)
+        added[kind] += len(columns["x"])
+    if objects:
+        # Сетки были нарезаны под капусту из конфига, а не из сценария
+        world.reindex()
+    return added["goats"], added["cabbages"]
+
+
+def save_scenario(path, goats=None, cabbages=None, chunk_rows=CHUNK_ROWS):
+    """Записать столбцы коз и капусты в .npz или JSONL по chunk_rows объектов в строке."""
+    given = {"goats": goats or {}, "cabbages": cabbages or {}}
+    if path.endswith(".npz"):
+        arrays = {NPZ_PREFIXES[kind] + name: np.asarray(column, np.float64)
+                  for kind, columns in given.items() for name, column in columns.items()}
+        with open(path, 'wb') as file:
+            np.savez(file, **arrays)
+        return
+
+    with open(path, 'w') as file:
+        for kind, columns in given.items():
+            if not columns:
+                continue
+            columns = {name: np.asarray(column, np.float64) for name, column in columns.items()}
+            for start in range(0, len(columns["x"]), chunk_rows):
+                chunk = {name: column[start:start + chunk_rows].tolist() for name, column in columns.items()}
+                file.write(json.dumps({kind: chunk}) + "\n")
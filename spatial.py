@@ -0,0 +1,210 @@
+# До стольких объектов поиск ближайшего быстрее простым обходом, чем кольцами
+SCAN_COUNT = 24
+
+
+class SpatialGrid:
+    """Равномерная сетка по координатам x, y объектов (левый верхний угол)."""
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.count = 0
+        self.min_cell = None
+        self.max_cell = None
+
+    def cell_of(self, x, y):
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def insert(self, item):
+        key = self.cell_of(item.x, item.y)
+        self.cells.setdefault(key, []).append(item)
+        self.count += 1
+
+        if self.min_cell is None:
+            self.min_cell = key
+            self.max_cell = key
+        else:
+            self.min_cell = (min(self.min_cell[0], key[0]), min(self.min_cell[1], key[1]))
+            self.max_cell = (max(self.max_cell[0], key[0]), max(self.max_cell[1], key[1]))
+
+    def extend(self, items):
+        """Вставка пачкой: границы сетки обновляются один раз в конце."""
+        cells = self.cells
+        size = self.cell_size
+        keys = []
+        for item in items:
+            key = (int(item.x // size), int(item.y // size))
+            cell = cells.get(key)
+            if cell is None:
+                cells[key] = [item]
+                keys.append(key)
+            else:
+                cell.append(item)
+            self.count += 1
+
+        if keys:
+            xs = [key[0] for key in keys]
+            ys = [key[1] for key in keys]
+            if self.min_cell is not None:
+                xs += [self.min_cell[0], self.max_cell[0]]
+                ys += [self.min_cell[1], self.max_cell[1]]
+            self.min_cell = (min(xs), min(ys))
+            self.max_cell = (max(xs), max(ys))
+
+    def remove(self, item):
+        key = self.cell_of(item.x, item.y)
+        cell = self.cells[key]
+        cell.remove(item)
+        if not cell:
+            del self.cells[key]
+        self.count -= 1
+        # Границы при удалении не сжимаются, но пустой сетке они не нужны
+        if not self.count:
+            self.min_cell = None
+            self.max_cell = None
+
+    def __len__(self):
+        return self.count
+
+    def rebuild(self, items):
+        self.cells = {}
+        self.count = 0
+        self.min_cell = None
+        self.max_cell = None
+        self.extend(items)
+
+    def query_rect(self, left, top, right, bottom):
+        """Объекты из клеток, которые задевает прямоугольник; точную проверку делает вызывающий."""
+        if not self.count:
+            return
+
+        min_x, min_y = self.cell_of(left, top)
+        max_x, max_y = self.cell_of(right, bottom)
+        for gx in range(max(min_x, self.min_cell[0]), min(max_x, self.max_cell[0]) + 1):
+            for gy in range(max(min_y, self.min_cell[1]), min(max_y, self.max_cell[1]) + 1):
+                cell = self.cells.get((gx, gy))
+                if cell:
+                    yield from cell
+
+    def _ring(self, center, radius):
+        # Только клетки на краю квадрата: O(radius) на кольцо вместо O(radius ** 2)
+        cx, cy = center
+        cells = self.cells
+        min_x = max(cx - radius, self.min_cell[0])
+        max_x = min(cx + radius, self.max_cell[0])
+        min_y = max(cy - radius, self.min_cell[1])
+        max_y = min(cy + radius, self.max_cell[1])
+        if min_x > max_x or min_y > max_y:
+            return
+
+        if not radius:
+            cell = cells.get(center)
+            if cell:
+                yield cell
+            return
+
+        # Верхняя и нижняя строки целиком, если попали в границы
+        for gy in (cy - radius, cy + radius):
+            if min_y <= gy <= max_y:
+                for gx in range(min_x, max_x + 1):
+                    cell = cells.get((gx, gy))
+                    if cell:
+                        yield cell
+        # Левый и правый столбцы без углов
+        for gx in (cx - radius, cx + radius):
+            if min_x <= gx <= max_x:
+                for gy in range(max(min_y, cy - radius + 1), min(max_y, cy + radius - 1) + 1):
+                    cell = cells.get((gx, gy))
+                    if cell:
+                        yield cell
+
+    def _sparse(self):
+        # Объектов мало сами по себе или на площадь в границах сетки:
+        # кольца обойдут больше пустых клеток, чем есть объектов
+        if self.count <= SCAN_COUNT:
+            return True
+        width = self.max_cell[0] - self.min_cell[0] + 1
+        height = self.max_cell[1] - self.min_cell[1] + 1
+        return self.count * self.count <= width * height
+
+    def nearest(self, x, y, accept=None, max_distance=None):
+        """Ближайший объект, для которого accept(item) истинно.
+
+        При равном расстоянии побеждает объект с меньшим id, то есть созданный
+        раньше, как при линейном обходе списка. С max_distance кольца дальше
+        этого расстояния не просматриваются.
+        """
+        if not self.count:
+            return None
+
+        if self._sparse():
+            # Обход всех объектов; max_distance здесь ничего не сокращает
+            return self._closest(x, y, accept, self.cells.values(), float('inf'))[1]
+
+        center = self.cell_of(x, y)
+        max_radius = max(
+            abs(center[0] - self.min_cell[0]), abs(center[0] - self.max_cell[0]),
+            abs(center[1] - self.min_cell[1]), abs(center[1] - self.max_cell[1]),
+        )
+
+        if max_distance is not None:
+            max_radius = min(max_radius, int(max_distance // self.cell_size) + 1)
+
+        best = None
+        best_distance = float('inf')
+        for radius in range(max_radius + 1):
+            best_distance, best = self._closest(x, y, accept, self._ring(center, radius), best_distance, best)
+
+            # Всё, что дальше этого кольца, не ближе radius * cell_size
+            if best is not None and best_distance < (radius * self.cell_size) ** 2:
+                break
+
+        return best
+
+    @staticmethod
+    def _closest(x, y, accept, cells, best_distance, best=None):
+        for cell in cells:
+            for item in cell:
+                if accept is not None and not accept(item):
+                    continue
+                distance = (x - item.x) ** 2 + (y - item.y) ** 2
+                if distance < best_distance or (distance == best_distance and item.id < best.id):
+                    best_distance = distance
+                    best = item
+        return best_distance, best
+
+    def nearest_k(self, x, y, k, accept=None):
+        """До k ближайших объектов списком пар (квадрат расстояния, объект) по возрастанию."""
+        if not self.count or k <= 0:
+            return []
+
+        found = []
+        if self._sparse():
+            for cell in self.cells.values():
+                for item in cell:
+                    if accept is None or accept(item):
+                        found.append(((x - item.x) ** 2 + (y - item.y) ** 2, item.id, item))
+            found.sort(key=lambda entry: entry[:2])
+            return [(distance, item) for distance, _, item in found[:k]]
+
+        center = self.cell_of(x, y)
+        max_radius = max(
+            abs(center[0] - self.min_cell[0]), abs(center[0] - self.max_cell[0]),
+            abs(center[1] - self.min_cell[1]), abs(center[1] - self.max_cell[1]),
+        )
+
+        for radius in range(max_radius + 1):
+            for cell in self._ring(center, radius):
+                for item in cell:
+                    if accept is None or accept(item):
+                        found.append(((x - item.x) ** 2 + (y - item.y) ** 2, item.id, item))
+
+            if len(found) >= k:
+                found.sort(key=lambda entry: entry[:2])
+                del found[k:]
+                if found[-1][0] < (radius * self.cell_size) ** 2:
+                    break
+        else:
+            found.sort(key=lambda entry: entry[:2])
+
+        return [(distance, item) for distance, _, item in found[:k]]
@@ -0,0 +1,159 @@
+import os
+
+import numpy as np
+
+# Столбцы выборки; eating и wandering - доли коз, которые ели и бродили на шаге
+STAT_FIELDS = ("goats", "cabbage_mass", "mean_stamina", "eating", "wandering")
+
+# Разрешения рядов в шагах: строка ряда - среднее за столько шагов
+RESOLUTIONS = (1, 100, 10000)
+
+# Сколько последних строк помнит каждый ряд
+SERIES_SIZE = 1000
+
+# CSV пишется пачками по столько строк, новый файл начинается после rows_per_file строк
+CHUNK_ROWS = 4096
+ROWS_PER_FILE = 1000000
+
+
+def sample(world):
+    """Значения STAT_FIELDS для огорода после шага."""
+    count = world.goat_count
+    if hasattr(world, "goat"):
+        mass = float(world.cabbage["size"].sum())
+        stamina = float(world.goat["stamina"].sum())
+        eating = int(np.count_nonzero(world.goat["eating"]))
+    else:
+        mass = sum(cabbage.size for cabbage in world.cabbages)
+        stamina = sum(goat.stamina for goat in world.goats)
+        eating = sum(1 for goat in world.goats if goat.eating)
+    if not count:
+        return 0, mass, 0.0, 0.0, 0.0
+    return count, mass, stamina / count, eating / count, world.wandering / count
+
+
+class SeriesBuffer:
+    """Последние size строк ряда одного разрешения в кольце NumPy.
+
+    Строка - шаг, которым кончился интервал, и средние выборок за интервал
+    из resolution шагов. Незакрытый интервал копится в sums.
+    """
+
+    def __init__(self, resolution, size=SERIES_SIZE):
+        self.resolution = resolution
+        self.ticks = np.zeros(size, np.int64)
+        self.values = np.zeros((size, len(STAT_FIELDS)))
+        self.index = 0
+        self.count = 0
+
+        self.bucket = None
+        self.last_tick = 0
+        self.sums = np.zeros(len(STAT_FIELDS))
+        self.samples = 0
+
+    def add(self, tick, row):
+        """Добавить выборку шага tick; вернуть закрытые строки (шаг, средние)."""
+        closed = []
+        bucket = (tick - 1) // self.resolution
+        # Событийный огород перескакивает шаги, и выборка может попасть сразу в следующий интервал
+        if self.samples and bucket != self.bucket:
+            closed.append(self._close())
+        self.bucket = bucket
+        self.last_tick = tick
+        self.sums += row
+        self.samples += 1
+        if tick % self.resolution == 0:
+            closed.append(self._close())
+        return closed
+
+    def _close(self):
+        mean = self.sums / self.samples
+        self.ticks[self.index] = self.last_tick
+        self.values[self.index] = mean
+        self.index = (self.index + 1) % len(self.ticks)
+        self.count = min(self.count + 1, len(self.ticks))
+        self.sums[:] = 0.0
+        self.samples = 0
+        return self.last_tick, mean
+
+    def ordered(self):
+        """Шаги и строки от старых к новым."""
+        if self.count < len(self.ticks):
+            return self.ticks[:self.count], self.values[:self.count]
+        return np.roll(self.ticks, -self.index), np.roll(self.values, -self.index, axis=0)
+
+
+class ChunkedCSVWriter:
+    """Дописывает строки в каталог CSV-файлов stats-00000.csv, stats-00001.csv, ...
+
+    Строки копятся в массиве и пишутся пачками по chunk_rows; у каждого файла
+    свой заголовок, так что любой файл читается отдельно. Продолженный прогон
+    начинает новый файл после уже лежащих в каталоге.
+    """
+
+    def __init__(self, path, chunk_rows=CHUNK_ROWS, rows_per_file=ROWS_PER_FILE):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.rows_per_file = rows_per_file
+        self.file_index = sum(1 for name in os.listdir(path) if name.startswith("stats-") and name.endswith(".csv"))
+        self.file_rows = 0
+
+        self.chunk = np.zeros((chunk_rows, 1 + len(STAT_FIELDS)))
+        self.pending = 0
+
+    def write(self, tick, values):
+        self.chunk[self.pending, 0] = tick
+        self.chunk[self.pending, 1:] = values
+        self.pending += 1
+        if self.pending == len(self.chunk):
+            self.flush()
+
+    def flush(self):
+        written = 0
+        while written < self.pending:
+            if self.file_rows == self.rows_per_file:
+                self.file_index += 1
+                self.file_rows = 0
+            rows = self.chunk[written:written + min(self.pending - written, self.rows_per_file - self.file_rows)]
+            file_path = os.path.join(self.path, f"stats-{self.file_index:05d}.csv")
+            with open(file_path, 'a') as file:
+                if not self.file_rows:
+                    file.write(",".join(("tick",) + STAT_FIELDS) + "\n")
+                np.savetxt(file, rows, fmt=["%d"] + ["%.6g"] * len(STAT_FIELDS), delimiter=",")
+            self.file_rows += len(rows)
+            written += len(rows)
+        self.pending = 0
+
+    def close(self):
+        self.flush()
+
+
+class StatsRecorder:
+    """Статистика стада по шагам: ряды нескольких разрешений и, если задан writer, поток в файлы.
+
+    Огород с recorder в атрибуте stats вызывает record после каждого шага
+    (событийный - после каждого run). Память ограничена: каждый ряд - кольцо
+    из size строк, так что миллионы шагов помнятся точками по 1, 100 и 10000
+    шагов. В writer уходят строки ряда с разрешением write_resolution.
+    """
+
+    def __init__(self, resolutions=RESOLUTIONS, size=SERIES_SIZE, writer=None, write_resolution=1):
+        if writer is not None and write_resolution not in resolutions:
+            raise ValueError(f"разрешение {write_resolution} не из {resolutions}")
+        self.series = [SeriesBuffer(resolution, size) for resolution in resolutions]
+        self.writer = writer
+        self.write_resolution = write_resolution
+        # Растёт с каждой закрытой строкой, по нему окно понимает, что график пора перерисовать
+        self.version = 0
+
+    def record(self, world):
+        row = np.array(sample(world), np.float64)
+        for series in self.series:
+            for tick, values in series.add(world.tick_count, row):
+                self.version += 1
+                if self.writer is not None and series.resolution == self.write_resolution:
+                    self.writer.write(tick, values)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
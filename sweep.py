@@ -0,0 +1,164 @@
+import sys
+import os
+import csv
+import json
+import random
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from garden import Garden, RULES, DEFAULT_CONFIGS, check_config
+
+# Параметры конфига огорода и свойства коз (как ползунки в окне)
+CONFIG_PARAMS = ("num_goats", "num_cabbages", "cabbage_generation_choices")
+GOAT_TRAITS = ("speed", "fertility", "stamina", "eating_speed")
+
+METRICS = ("survival_ticks", "extinct", "final_goats", "final_cabbages", "food_eaten")
+
+
+def parse_value(text):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def parse_param(spec):
+    """name=a,b,c для сетки или name=lo:hi для случайной выборки."""
+    name, _, values = spec.partition("=")
+    if name not in CONFIG_PARAMS + GOAT_TRAITS:
+        raise argparse.ArgumentTypeError(f"неизвестный параметр: {name}")
+    if name == "cabbage_generation_choices":
+        # Каждое значение - список через "/": 1/2/4, а одно число 4 - список из одного выбора
+        if ":" in values:
+            raise argparse.ArgumentTypeError("у cabbage_generation_choices нет диапазона lo:hi")
+        return name, [[parse_value(part) for part in value.split("/") if part] for value in values.split(",")]
+    if ":" in values:
+        low, high = values.split(":")
+        return name, (parse_value(low), parse_value(high))
+    return name, [parse_value(value) for value in values.split(",")]
+
+
+def grid(params):
+    names = list(params)
+    for values in itertools.product(*(params[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def sample(params, count, rng):
+    for _ in range(count):
+        point = {}
+        for name, values in params.items():
+            if isinstance(values, tuple):
+                low, high = values
+                point[name] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) else rng.uniform(low, high)
+            else:
+                point[name] = rng.choice(values)
+        yield point
+
+
+def set_goat_traits(garden, traits):
+    if hasattr(garden, "goat"):
+        for name, value in traits.items():
+            garden.goat[name][:] = value
+    else:
+        for goat in garden.goats:
+            for name, value in traits.items():
+                setattr(goat, name, value)
+
+
+def run_one(job):
+    """Один прогон без окна; выполняется в процессе пула."""
+    config = dict(job["config"])
+    point = job["point"]
+    config.update({name: value for name, value in point.items() if name in CONFIG_PARAMS})
+
+    if job["backend"] == "arrays":
+        from garden_arrays import ArrayGarden
+        garden = ArrayGarden.from_config(config, rules=job["rules"], seed=job["seed"])
+    elif job["backend"] == "events":
+        from events import EventGarden
+        garden = EventGarden.from_config(config, rules=job["rules"], seed=job["seed"])
+    else:
+        garden = Garden.from_config(config, rules=job["rules"], seed=job["seed"])
+    set_goat_traits(garden, {name: value for name, value in point.items() if name in GOAT_TRAITS})
+
+    # Без коз огород дальше не меняется ничем, кроме новой капусты
+    survival_ticks = job["ticks"]
+    if job["backend"] == "events":
+        # Событийный огород не шагает по одному: он сам останавливается на вымирании
+        garden.run(job["ticks"], until_extinct=True)
+        survival_ticks = garden.tick_count
+    else:
+        for tick in range(job["ticks"]):
+            garden.step()
+            if not garden.goat_count:
+                survival_ticks = tick + 1
+                break
+
+    return {
+        "run": job["run"],
+        "seed": job["seed"],
+        **{name: json.dumps(value) if isinstance(value, list) else value for name, value in point.items()},
+        "survival_ticks": survival_ticks,
+        "extinct": int(garden.goat_count == 0),
+        "final_goats": garden.goat_count,
+        "final_cabbages": garden.cabbage_count,
+        "food_eaten": round(garden.food_eaten, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перебор параметров огорода в нескольких процессах")
+    parser.add_argument("--param", type=parse_param, action="append", default=[], metavar="NAME=VALUES",
+                        help="a,b,c для сетки, lo:hi для выборки; списки капусты через /: 1/2,2/4")
+    parser.add_argument("--sample", type=int, default=None, help="взять столько случайных точек вместо сетки")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument("--ticks", type=int, default=5000)
+    parser.add_argument("--rules", choices=sorted(RULES), default="prac_3")
+    parser.add_argument("--config", default=None, help="базовый config.json, иначе настройки по умолчанию")
+    parser.add_argument("--backend", choices=["objects", "arrays", "events"], default="objects")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", default="sweep.csv")
+    args = parser.parse_args()
+
+    config = DEFAULT_CONFIGS[args.rules]
+    if args.config:
+        with open(args.config, 'r') as file:
+            config = json.load(file)
+
+    params = dict(args.param)
+    if args.sample is not None:
+        points = list(sample(params, args.sample, random.Random(0)))
+    else:
+        if any(isinstance(values, tuple) for values in params.values()):
+            parser.error("диапазон lo:hi имеет смысл только с --sample")
+        points = list(grid(params))
+
+    # Плохое значение проверяется до пула: иначе оно уронит прогон посреди перебора
+    for point in points:
+        try:
+            check_config({**config, **{name: value for name, value in point.items() if name in CONFIG_PARAMS}})
+        except ValueError as error:
+            parser.error(f"{json.dumps(point)}: {error}")
+
+    jobs = [
+        {"run": run, "point": point, "seed": seed, "config": config,
+         "rules": args.rules, "ticks": args.ticks, "backend": args.backend}
+        for run, (point, seed) in enumerate(itertools.product(points, args.seeds))
+    ]
+
+    fields = ["run", "seed", *params, *METRICS]
+    with open(args.out, 'w', newline='') as file, ProcessPoolExecutor(max_workers=args.workers) as pool:
+        writer = csv.DictWriter(file, fieldnames=fields)
+        writer.writeheader()
+        # Строки пишутся по мере готовности, чтобы прерванный прогон не терял результаты
+        for done, future in enumerate(as_completed(pool.submit(run_one, job) for job in jobs), 1):
+            writer.writerow(future.result())
+            file.flush()
+            print(f"\r{done}/{len(jobs)}", end="", file=sys.stderr)
+    print(file=sys.stderr)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
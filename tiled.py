@@ -0,0 +1,437 @@
+import os
+import time
+import traceback
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from garden import check_choices, check_config
+from garden_arrays import ArrayGarden, GOAT_FIELDS, CABBAGE_FIELDS
+
+# Служебные столбцы шага. У козы: номер плитки, капуста, которую она заняла, и цель движения.
+# У капусты: после какой козы она освободилась и какая коза её заняла (см. ArrayGarden._search)
+GOAT_SCRATCH = (("tile", np.int32), ("claim", np.int64), ("move_target", np.int64))
+CABBAGE_SCRATCH = (("free_after", np.int64), ("claimed_by", np.int64))
+
+# Меньше этого столбцы не создаются, чтобы огород не пересоздавал их на первых же козах
+MIN_CAPACITY = 1024
+
+# Сколько секунд close ждёт процесс плитки, прежде чем остановить его силой
+STOP_TIMEOUT = 5
+
+
+class SharedColumns:
+    """Столбцы в multiprocessing.shared_memory с запасом места под рост.
+
+    Создатель (names is None) владеет блоками и удаляет их в close;
+    процессы-исполнители открывают те же блоки по layout().
+    """
+
+    def __init__(self, fields, capacity, names=None):
+        self.fields = fields
+        self.capacity = capacity
+        self.owner = names is None
+        self.blocks = {}
+        self.arrays = {}
+        for name, dtype in fields:
+            if self.owner:
+                block = shared_memory.SharedMemory(create=True, size=max(capacity * np.dtype(dtype).itemsize, 1))
+            else:
+                # Процессы плиток запущены огородом и делят с ним resource_tracker, так что
+                # открытый по имени блок не удаляется при выходе исполнителя
+                block = shared_memory.SharedMemory(name=names[name])
+            self.blocks[name] = block
+            self.arrays[name] = np.ndarray((capacity,), dtype, buffer=block.buf)
+
+    def layout(self):
+        return self.capacity, {name: block.name for name, block in self.blocks.items()}
+
+    def views(self, count, fields):
+        return {name: self.arrays[name][:count] for name, _ in fields}
+
+    def grown(self, count, needed):
+        """Столбцы на needed строк: эти же или новые, вдвое больше, с первыми count строками."""
+        if needed <= self.capacity:
+            return self
+        columns = SharedColumns(self.fields, max(needed, 2 * self.capacity))
+        for name, _ in self.fields:
+            columns.arrays[name][:count] = self.arrays[name][:count]
+        self.close()
+        return columns
+
+    def close(self):
+        self.arrays = {}
+        for block in self.blocks.values():
+            try:
+                block.close()
+            except BufferError:
+                # Кто-то ещё держит вид на столбец; память освободится вместе с ним
+                pass
+            if self.owner:
+                block.unlink()
+        self.blocks = {}
+
+
+def tile_grid(tiles, width, height):
+    """Число плиток по x и по y: в произведении tiles, форма плитки ближе всего к квадрату."""
+    best = None
+    for columns in range(1, tiles + 1):
+        if tiles % columns == 0:
+            rows = tiles // columns
+            skew = abs(np.log(width / columns * rows / height))
+            if best is None or skew < best[0]:
+                best = (skew, columns, rows)
+    return best[1], best[2]
+
+
+class Tile(ArrayGarden):
+    """Плитка в процессе-исполнителе: методы ArrayGarden над общими столбцами, но только для своих коз.
+
+    Свои козы - те, что в начале шага стоят в прямоугольнике плитки. Капусту
+    плитка ищет в полосе halo вокруг него; если найденная капуста дальше края
+    полосы, за полосой может найтись ближе, и такая коза ищет по всему огороду.
+    """
+
+    def __init__(self, index, band, width, height, rules, seed):
+        super().__init__(width, height, 0, 0, [], rules=rules, seed=seed)
+        self.index = index
+        self.band = band
+        self.goat_columns = None
+        self.cabbage_columns = None
+        self.searchers = np.empty(0, np.int64)
+
+    def attach(self, goat_layout, cabbage_layout, goat_count, cabbage_count):
+        # Огород пересоздаёт столбцы, когда они переполняются; тогда меняются имена блоков
+        if self.goat_columns is None or self.goat_columns.layout() != goat_layout:
+            self.goat = self.goat_scratch = None
+            if self.goat_columns is not None:
+                self.goat_columns.close()
+            self.goat_columns = SharedColumns(GOAT_FIELDS + GOAT_SCRATCH, *goat_layout)
+        if self.cabbage_columns is None or self.cabbage_columns.layout() != cabbage_layout:
+            self.cabbage = self.cabbage_scratch = None
+            if self.cabbage_columns is not None:
+                self.cabbage_columns.close()
+            self.cabbage_columns = SharedColumns(CABBAGE_FIELDS + CABBAGE_SCRATCH, *cabbage_layout)
+        self.goat = self.goat_columns.views(goat_count, GOAT_FIELDS)
+        self.goat_scratch = self.goat_columns.views(goat_count, GOAT_SCRATCH)
+        self.cabbage = self.cabbage_columns.views(cabbage_count, CABBAGE_FIELDS)
+        self.cabbage_scratch = self.cabbage_columns.views(cabbage_count, CABBAGE_SCRATCH)
+
+    def close(self):
+        self.goat = self.goat_scratch = self.cabbage = self.cabbage_scratch = None
+        for columns in (self.goat_columns, self.cabbage_columns):
+            if columns is not None:
+                columns.close()
+
+    def begin(self, goat_layout, cabbage_layout, goat_count, cabbage_count):
+        """Силы, еда и список своих коз, которым искать капусту; вернуть, сколько съедено."""
+        self.attach(goat_layout, cabbage_layout, goat_count, cabbage_count)
+        goat = self.goat
+        members = np.flatnonzero(self.goat_scratch["tile"] == self.index)
+        stamina = np.maximum(goat["stamina"][members] - self.stamina_decay * (goat["size"][members] / 20), 0)
+        goat["stamina"][members] = stamina
+        goat["size"][members[stamina <= 0]] -= 0.01
+
+        active = goat["size"][members] > 5
+        eating = active & goat["eating"][members]
+        self.searchers = members[active & ~eating]
+
+        food_before = self.food_eaten
+        released_by, released = self.eat_cabbage(members[eating])
+        # Капусту ест одна коза, так что эти строки больше никто не пишет
+        self.cabbage_scratch["free_after"][released] = released_by
+        return self.food_eaten - food_before
+
+    def search(self, revoked, first):
+        """Круг поиска для своих коз; вернуть заявки на захват (коза, капуста) или None, если искать некому."""
+        move_target = self.goat_scratch["move_target"]
+        claimed_by = self.cabbage_scratch["claimed_by"]
+        if first:
+            pending = self.searchers
+        else:
+            # Как в ArrayGarden._search: цель заняла коза раньше в списке или захват козы перебили
+            chasers = self.searchers[move_target[self.searchers] >= 0]
+            stale = chasers[claimed_by[move_target[chasers]] < chasers]
+            pending = np.union1d(stale, revoked[self.goat_scratch["tile"][revoked] == self.index])
+            move_target[pending] = -1
+        if not len(pending):
+            return None
+
+        closest = self.find_closest_cabbages(pending, self.cabbage_scratch["free_after"], claimed_by)
+        found = closest >= 0
+        near = np.zeros(len(pending), np.bool_)
+        near[found] = self._is_near(pending[found], closest[found])
+        move_target[pending] = np.where(found, closest, -1)
+        return pending[near], closest[near]
+
+    def find_closest_cabbages(self, goats, free_after=None, claimed_by=None):
+        closest = np.full(len(goats), -1)
+        if not len(goats):
+            return closest
+
+        # Полоса вокруг плитки; со стороны края огорода она не ограничена
+        left, top, right, bottom = self.band
+        x, y = self.cabbage["x"], self.cabbage["y"]
+        in_band = np.flatnonzero((free_after < claimed_by) & (x >= left) & (x < right) & (y >= top) & (y < bottom))
+        exact = np.zeros(len(goats), np.bool_)
+        if len(in_band):
+            closest = self._closest_among(goats, in_band, free_after, claimed_by)
+            found = np.flatnonzero(closest >= 0)
+            goat_x, goat_y = self.goat["x"][goats[found]], self.goat["y"][goats[found]]
+            # Капуста за полосой не ближе, чем край полосы
+            margin = np.minimum(np.minimum(goat_x - left, right - goat_x), np.minimum(goat_y - top, bottom - goat_y))
+            distance = (goat_x - x[closest[found]]) ** 2 + (goat_y - y[closest[found]]) ** 2
+            exact[found] = distance < margin ** 2
+        if np.isinf(self.band).all():
+            # Полоса - весь огород: чего нет в ней, нет нигде
+            exact[:] = True
+
+        rest = np.flatnonzero(~exact)
+        if len(rest):
+            closest[rest] = super().find_closest_cabbages(goats[rest], free_after, claimed_by)
+        return closest
+
+    def finish(self):
+        """Захваты, движение к цели и блуждание своих коз; вернуть число бродивших."""
+        goat = self.goat
+        searchers = self.searchers
+        claim = self.goat_scratch["claim"][searchers]
+        move_target = self.goat_scratch["move_target"][searchers]
+
+        won = claim >= 0
+        goat["eating"][searchers[won]] = True
+        goat["target"][searchers[won]] = claim[won]
+        self.cabbage["being_eaten"][claim[won]] = True
+
+        moving = move_target >= 0
+        self._move_towards(searchers[moving], move_target[moving])
+        wanderers = searchers[~goat["eating"][searchers] & ~moving]
+        self._wander(wanderers)
+        return len(wanderers)
+
+
+def _tile_worker(connection, index, band, width, height, rules, seed):
+    tile = Tile(index, band, width, height, rules, seed)
+    while True:
+        try:
+            command, args = connection.recv()
+        except EOFError:
+            # Огород пропал, не закрыв плитки
+            break
+        if command == "stop":
+            break
+        try:
+            connection.send((True, getattr(tile, command)(*args)))
+        except Exception:
+            connection.send((False, traceback.format_exc()))
+    tile.close()
+    connection.close()
+
+
+class TiledGarden(ArrayGarden):
+    """ArrayGarden, разрезанный на плитки, каждую из которых шагает свой процесс.
+
+    Столбцы коз и капусты лежат в multiprocessing.shared_memory, их видят
+    все процессы без копирования. Плитка - прямоугольник огорода: ей
+    принадлежат козы, стоящие в нём в начале шага, так что коза, перешедшая
+    границу, со следующего шага сама переходит к соседу. Капусту плитка
+    ищет в полосе шириной halo вокруг себя, читая её прямо из общей памяти;
+    это и есть обмен краями, только без копий.
+
+    Захват капусты идёт кругами, как в ArrayGarden._search: плитки ищут
+    параллельно и присылают заявки, огород отдаёт каждую капусту козе
+    раньше в списке, а перебитые и опоздавшие козы ищут в следующем круге.
+    Поэтому being_eaten остаётся исключительным и на границах плиток.
+    Поиск, захват, движение и еда совпадают с ArrayGarden; блуждание у
+    каждой плитки разыгрывается своим генератором, так что с ArrayGarden
+    прогон совпадает только статистически.
+
+    Процессы живут, пока огород не закрыт через close. Сохраняется огород
+    (checkpoint.py) как обычный ArrayGarden.
+    """
+
+    def __init__(self, width, height, num_goats, num_cabbages, cabbage_generation_choices, rules="prac_3", seed=None,
+                 workers=None, halo=None):
+        self.goat_columns = SharedColumns(GOAT_FIELDS + GOAT_SCRATCH, max(num_goats, MIN_CAPACITY))
+        self.cabbage_columns = SharedColumns(CABBAGE_FIELDS + CABBAGE_SCRATCH, max(num_cabbages, MIN_CAPACITY))
+        self.goat_rows = 0
+        self.cabbage_rows = 0
+        super().__init__(width, height, num_goats, num_cabbages, cabbage_generation_choices, rules=rules, seed=seed)
+
+        workers = workers or os.cpu_count() or 1
+        self.tiles_x, self.tiles_y = tile_grid(workers, width, height)
+        self.tile_width = width / self.tiles_x
+        self.tile_height = height / self.tiles_y
+        if halo is None:
+            halo = self.default_halo(width, height, num_cabbages)
+        self.halo = halo
+
+        seeds = np.random.SeedSequence(seed).spawn(workers)
+        self.connections = []
+        self.processes = []
+        for index in range(workers):
+            column, row = index % self.tiles_x, index // self.tiles_x
+            band = (
+                column * self.tile_width - halo if column > 0 else -np.inf,
+                row * self.tile_height - halo if row > 0 else -np.inf,
+                (column + 1) * self.tile_width + halo if column < self.tiles_x - 1 else np.inf,
+                (row + 1) * self.tile_height + halo if row < self.tiles_y - 1 else np.inf,
+            )
+            connection, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_tile_worker, daemon=True,
+                                              args=(child, index, band, width, height, rules, seeds[index]))
+            process.start()
+            child.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    @staticmethod
+    def default_halo(width, height, cabbage_count):
+        # Несколько средних расстояний между кочанами: дальше полосы ищет малая доля коз
+        return max(64.0, 4 * (width * height / max(cabbage_count, 1)) ** 0.5)
+
+    @classmethod
+    def from_config(cls, config, rules="prac_3", seed=None, workers=None):
+        check_config(config)
+        return cls(
+            config.get("world_width", config["window_width"]),
+            config.get("world_height", config["window_height"]),
+            config["num_goats"],
+            config["num_cabbages"],
+            config["cabbage_generation_choices"],
+            rules=rules,
+            seed=seed,
+            workers=workers,
+        )
+
+    def reconfigure(self, config):
+        width = config.get("world_width", config["window_width"])
+        height = config.get("world_height", config["window_height"])
+        if (width, height) != (self.width, self.height):
+            # Плитки нарезаны и знают края огорода с запуска
+            raise ValueError("размер плиточного огорода на ходу не меняется")
+        check_choices(config["cabbage_generation_choices"])
+        self.cabbage_generation_choices = config["cabbage_generation_choices"]
+
+    def _append(self, columns, fields, values):
+        added = len(np.atleast_1d(values["x"]))
+        if fields is GOAT_FIELDS:
+            self.goat_columns = self.goat_columns.grown(self.goat_rows, self.goat_rows + added)
+            shared, start = self.goat_columns, self.goat_rows
+            self.goat_rows += added
+        else:
+            self.cabbage_columns = self.cabbage_columns.grown(self.cabbage_rows, self.cabbage_rows + added)
+            shared, start = self.cabbage_columns, self.cabbage_rows
+            self.cabbage_rows += added
+        for name, dtype in fields:
+            shared.arrays[name][start:start + added] = np.asarray(values[name], dtype=dtype)
+        self._views()
+
+    def _views(self):
+        self.goat = self.goat_columns.views(self.goat_rows, GOAT_FIELDS)
+        self.goat_scratch = self.goat_columns.views(self.goat_rows, GOAT_SCRATCH)
+        self.cabbage = self.cabbage_columns.views(self.cabbage_rows, CABBAGE_FIELDS)
+        self.cabbage_scratch = self.cabbage_columns.views(self.cabbage_rows, CABBAGE_SCRATCH)
+
+    def _compact(self):
+        # ArrayGarden._compact собирает новые столбцы; выжившие строки переписываются в начало общих
+        super()._compact()
+        for shared, columns, fields in ((self.goat_columns, self.goat, GOAT_FIELDS),
+                                        (self.cabbage_columns, self.cabbage, CABBAGE_FIELDS)):
+            for name, _ in fields:
+                if not np.may_share_memory(columns[name], shared.arrays[name]):
+                    shared.arrays[name][:len(columns[name])] = columns[name]
+        self.goat_rows = len(self.goat["x"])
+        self.cabbage_rows = len(self.cabbage["x"])
+        self._views()
+
+    def _command(self, command, *args, each=None):
+        """Команда всем плиткам; each - свои аргументы для каждой. Вернуть ответы по порядку плиток."""
+        for index, connection in enumerate(self.connections):
+            connection.send((command, each[index] if each is not None else args))
+        replies = []
+        for index, connection in enumerate(self.connections):
+            ok, reply = connection.recv()
+            if not ok:
+                raise RuntimeError(f"плитка {index}:\n{reply}")
+            replies.append(reply)
+        return replies
+
+    def tick(self):
+        profiler = self.profiler
+        if profiler is not None:
+            mark = time.perf_counter()
+
+        goat_count = self.goat_count
+        goat_scratch, cabbage_scratch = self.goat_scratch, self.cabbage_scratch
+        column = np.clip((self.goat["x"] // self.tile_width).astype(np.int64), 0, self.tiles_x - 1)
+        row = np.clip((self.goat["y"] // self.tile_height).astype(np.int64), 0, self.tiles_y - 1)
+        goat_scratch["tile"][:] = row * self.tiles_x + column
+        goat_scratch["claim"][:] = -1
+        goat_scratch["move_target"][:] = -1
+        cabbage_scratch["free_after"][:] = np.where(self.cabbage["being_eaten"], goat_count, -1)
+        cabbage_scratch["claimed_by"][:] = goat_count
+
+        self.food_eaten += sum(self._command("begin", self.goat_columns.layout(), self.cabbage_columns.layout(),
+                                             goat_count, self.cabbage_count))
+        if profiler is not None:
+            mark = profiler.lap("eating", mark)
+
+        claim = goat_scratch["claim"]
+        claimed_by = cabbage_scratch["claimed_by"]
+        revoked = np.empty(0, np.int64)
+        first = True
+        while True:
+            replies = [reply for reply in self._command("search", revoked, first) if reply is not None]
+            if not replies:
+                break
+            first = False
+            goats = np.concatenate([goats for goats, _ in replies])
+            cabbages = np.concatenate([cabbages for _, cabbages in replies])
+            # Заявки от разных плиток: спор за капусту выигрывает коза раньше в списке
+            order = np.argsort(goats, kind='stable')
+            claims, winner = np.unique(cabbages[order], return_index=True)
+            winners = goats[order][winner]
+            previous = claimed_by[claims]
+            revoked = previous[previous < goat_count]
+            claim[revoked] = -1
+            claimed_by[claims] = winners
+            claim[winners] = claims
+            goat_scratch["move_target"][winners] = -1
+        if profiler is not None:
+            mark = profiler.lap("search", mark)
+
+        self.wandering = sum(self._command("finish"))
+        if profiler is not None:
+            mark = profiler.lap("movement", mark)
+
+        self._compact()
+        self.tick_count += 1
+        if profiler is not None:
+            profiler.lap("compaction", mark)
+
+    def close(self):
+        """Остановить процессы плиток и освободить общую память; повторный вызов ничего не делает."""
+        for connection in self.connections:
+            try:
+                connection.send(("stop", ()))
+            except OSError:
+                # Процесс плитки уже упал, и труба закрыта
+                pass
+        for process in self.processes:
+            process.join(STOP_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.connections = []
+        self.processes = []
+        self.goat = self.goat_scratch = self.cabbage = self.cabbage_scratch = None
+        self.goat_columns.close()
+        self.cabbage_columns.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,198 @@
+import os
+import json
+
+import numpy as np
+
+from worker import CabbageView, GoatView, Snapshot
+
+FORMAT_VERSION = 1
+
+# Записи в файлах идут подряд без заголовков; target - номер капусты в том же шаге или -1
+GOAT_RECORD = np.dtype([
+    ("id", "<i8"), ("x", "<f4"), ("y", "<f4"), ("size", "<f4"), ("speed", "<f4"), ("eating_speed", "<f4"),
+    ("stamina", "<f4"), ("fertility", "<f4"), ("eating", "?"), ("target", "<i4"),
+])
+CABBAGE_RECORD = np.dtype([
+    ("id", "<i8"), ("x", "<f4"), ("y", "<f4"), ("size", "<f4"), ("nutrition", "<f4"), ("being_eaten", "?"),
+])
+# Одна запись на шаг фиксированной длины: кадр N лежит по смещению N * itemsize
+TICK_RECORD = np.dtype([
+    ("tick", "<i8"), ("goat_start", "<i8"), ("goat_count", "<i8"), ("cabbage_start", "<i8"), ("cabbage_count", "<i8"),
+])
+
+FILES = {"ticks": TICK_RECORD, "goats": GOAT_RECORD, "cabbages": CABBAGE_RECORD}
+
+
+def _records(world):
+    """Козы и капуста шага в виде структурированных массивов."""
+    goats = np.zeros(world.goat_count, GOAT_RECORD)
+    cabbages = np.zeros(world.cabbage_count, CABBAGE_RECORD)
+
+    if hasattr(world, "goat"):
+        # У ArrayGarden нет id, их заменяет номер строки
+        goats["id"] = np.arange(world.goat_count)
+        cabbages["id"] = np.arange(world.cabbage_count)
+        for name in GOAT_RECORD.names[1:]:
+            goats[name] = world.goat[name]
+        for name in CABBAGE_RECORD.names[1:]:
+            cabbages[name] = world.cabbage[name]
+        return goats, cabbages
+
+    count = world.goat_count
+    for name in GOAT_RECORD.names[:-1]:
+        goats[name] = np.fromiter((getattr(goat, name) for goat in world.goats), GOAT_RECORD[name], count)
+    rows = {cabbage.id: row for row, cabbage in enumerate(world.cabbages)}
+    goats["target"] = np.fromiter(
+        (rows.get(goat.target_cabbage.id, -1) if goat.target_cabbage is not None else -1 for goat in world.goats),
+        np.int32, count,
+    )
+    for name in CABBAGE_RECORD.names:
+        cabbages[name] = np.fromiter((getattr(cabbage, name) for cabbage in world.cabbages), CABBAGE_RECORD[name],
+                                     world.cabbage_count)
+    return goats, cabbages
+
+
+class TrajectoryRecorder:
+    """Дописывает шаги огорода в каталог: meta.json и три файла записей.
+
+    Файлы только растут, так что запись можно продолжить после перезапуска,
+    а Trajectory может читать каталог, пока в него ещё пишут.
+    """
+
+    def __init__(self, path, world):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            if hasattr(world, "cabbage_index"):
+                cell_size = world.cabbage_index.cell_size
+            else:
+                cell_size = max(32, int((world.width * world.height / max(world.cabbage_count, 1)) ** 0.5))
+            meta = {"version": FORMAT_VERSION, "width": world.width, "height": world.height, "rules": world.rules,
+                    "cell_size": cell_size}
+            with open(meta_path, 'w') as file:
+                json.dump(meta, file, indent=4)
+
+        self.files = {name: open(os.path.join(path, name + ".bin"), 'ab') for name in FILES}
+        self.goat_total = self.files["goats"].tell() // GOAT_RECORD.itemsize
+        self.cabbage_total = self.files["cabbages"].tell() // CABBAGE_RECORD.itemsize
+
+    def record(self, world):
+        goats, cabbages = _records(world)
+        entry = np.array([(world.tick_count, self.goat_total, len(goats), self.cabbage_total, len(cabbages))],
+                         TICK_RECORD)
+        # Запись шага пишется последней: читатель не увидит шаг раньше его данных
+        goats.tofile(self.files["goats"])
+        cabbages.tofile(self.files["cabbages"])
+        entry.tofile(self.files["ticks"])
+        self.goat_total += len(goats)
+        self.cabbage_total += len(cabbages)
+
+    def flush(self):
+        for name in ("goats", "cabbages", "ticks"):
+            self.files[name].flush()
+
+    def close(self):
+        self.flush()
+        for file in self.files.values():
+            file.close()
+
+
+class ReplayGoat(GoatView):
+    __slots__ = ()
+
+    def __init__(self, id, x, y, size, speed, eating_speed, stamina, fertility, eating, target_cabbage):
+        self.id = id
+        self.x = self.prev_x = x
+        self.y = self.prev_y = y
+        self.size = size
+        self.speed = speed
+        self.eating_speed = eating_speed
+        self.stamina = stamina
+        self.fertility = fertility
+        self.eating = eating
+        self.target_cabbage = target_cabbage
+
+
+class ReplayCabbage(CabbageView):
+    __slots__ = ()
+
+    def __init__(self, id, x, y, size, nutrition, being_eaten):
+        self.id = id
+        self.x = x
+        self.y = y
+        self.size = size
+        self.nutrition = nutrition
+        self.being_eaten = being_eaten
+
+
+class ReplayFrame(Snapshot):
+    """Шаг из записи; окно показывает его так же, как снимок потока."""
+
+    def __init__(self, tick_count, goats, cabbages, cell_size):
+        self.tick_count = tick_count
+        self.cabbages = tuple(ReplayCabbage(*values) for values in zip(*(cabbages[name].tolist() for name in CABBAGE_RECORD.names)))
+        self.cabbages_by_id = {cabbage.id: cabbage for cabbage in self.cabbages}
+        columns = [goats[name].tolist() for name in GOAT_RECORD.names[:-1]]
+        targets = [self.cabbages[row] if row >= 0 else None for row in goats["target"].tolist()]
+        self.goats = tuple(ReplayGoat(*values) for values in zip(*columns, targets))
+        self.goats_by_id = {goat.id: goat for goat in self.goats}
+
+        self.cell_size = cell_size
+        self.cabbage_index = None
+        self.goat_index = None
+
+        # Записанные шаги не интерполируются
+        self.alpha_at_publish = 1.0
+        self.step_seconds = 1.0
+        self.published = 0.0
+
+
+class Trajectory:
+    """Чтение записи через np.memmap: кадр по номеру достаётся без чтения остального файла."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), 'r') as file:
+            self.meta = json.load(file)
+        if self.meta["version"] != FORMAT_VERSION:
+            raise ValueError(f"неизвестная версия записи: {self.meta['version']}")
+        self.width = self.meta["width"]
+        self.height = self.meta["height"]
+        self.sizes = {}
+        self.arrays = {}
+        self.refresh()
+
+    def refresh(self):
+        """Подхватить шаги, дописанные с прошлого вызова."""
+        for name, dtype in FILES.items():
+            file_path = os.path.join(self.path, name + ".bin")
+            count = os.path.getsize(file_path) // dtype.itemsize
+            if count != self.sizes.get(name):
+                # np.memmap не открывает пустой файл
+                self.arrays[name] = np.memmap(file_path, dtype, 'r', shape=(count,)) if count else np.empty(0, dtype)
+                self.sizes[name] = count
+
+        # Шаг, чьи данные ещё не дописаны на диск, пока не считается
+        ticks = self.arrays["ticks"]
+        count = len(ticks)
+        while count and (ticks["goat_start"][count - 1] + ticks["goat_count"][count - 1] > self.sizes["goats"]
+                         or ticks["cabbage_start"][count - 1] + ticks["cabbage_count"][count - 1] > self.sizes["cabbages"]):
+            count -= 1
+        self.frame_count = count
+
+    def __len__(self):
+        return self.frame_count
+
+    def frame(self, index):
+        if not self.frame_count:
+            return ReplayFrame(0, self.arrays["goats"][:0], self.arrays["cabbages"][:0], self.meta["cell_size"])
+        entry = self.arrays["ticks"][index]
+        goat_start, cabbage_start = int(entry["goat_start"]), int(entry["cabbage_start"])
+        goats = self.arrays["goats"][goat_start:goat_start + int(entry["goat_count"])]
+        cabbages = self.arrays["cabbages"][cabbage_start:cabbage_start + int(entry["cabbage_count"])]
+        return ReplayFrame(int(entry["tick"]), goats, cabbages, self.meta["cell_size"])
+
+    def frame_of_tick(self, tick):
+        """Номер кадра с шагом tick или ближайшим после него."""
+        return min(int(np.searchsorted(self.arrays["ticks"]["tick"][:self.frame_count], tick)), self.frame_count - 1)
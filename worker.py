@@ -0,0 +1,217 @@
+import queue
+import threading
+import time
+import traceback
+
+from garden import FixedStepClock, WARP_BUDGET_MS, first_hit
+from spatial import SpatialGrid
+
+# Методы огорода, которые окно может вызвать через submit
+COMMANDS = ("add_cabbage", "add_goat", "modify_goat", "modify_cabbage", "reconfigure", "save_checkpoint")
+
+
+class CabbageView:
+    """Неизменяемая копия капусты для окна."""
+
+    __slots__ = ("id", "x", "y", "size", "nutrition", "being_eaten")
+
+    def __init__(self, cabbage):
+        self.id = cabbage.id
+        self.x = cabbage.x
+        self.y = cabbage.y
+        self.size = cabbage.size
+        self.nutrition = cabbage.nutrition
+        self.being_eaten = cabbage.being_eaten
+
+    def is_eaten(self):
+        return self.size <= 0
+
+
+class GoatView:
+    """Неизменяемая копия козы; target_cabbage указывает на CabbageView того же снимка."""
+
+    __slots__ = ("id", "x", "y", "prev_x", "prev_y", "size", "speed", "eating_speed", "stamina", "fertility",
+                 "eating", "target_cabbage")
+
+    def __init__(self, goat, target_cabbage):
+        self.id = goat.id
+        self.x = goat.x
+        self.y = goat.y
+        self.prev_x = goat.prev_x
+        self.prev_y = goat.prev_y
+        self.size = goat.size
+        self.speed = goat.speed
+        self.eating_speed = goat.eating_speed
+        self.stamina = goat.stamina
+        self.fertility = goat.fertility
+        self.eating = goat.eating
+        self.target_cabbage = target_cabbage
+
+    def position(self, alpha):
+        return self.prev_x + (self.x - self.prev_x) * alpha, self.prev_y + (self.y - self.prev_y) * alpha
+
+
+class Snapshot:
+    """Состояние огорода после шага: окно читает его без блокировок, поток его не меняет."""
+
+    def __init__(self, garden, alpha, step_seconds):
+        self.tick_count = garden.tick_count
+        self.cabbages = tuple(CabbageView(cabbage) for cabbage in garden.cabbages)
+        self.cabbages_by_id = {cabbage.id: cabbage for cabbage in self.cabbages}
+        self.goats = tuple(
+            GoatView(goat, goat.target_cabbage and self.cabbages_by_id.get(goat.target_cabbage.id))
+            for goat in garden.goats
+        )
+        self.goats_by_id = {goat.id: goat for goat in self.goats}
+
+        self.cell_size = garden.cabbage_index.cell_size
+        self.cabbage_index = None
+        self.goat_index = None
+
+        self.alpha_at_publish = alpha
+        self.step_seconds = step_seconds
+        self.published = time.perf_counter()
+
+    @property
+    def goat_count(self):
+        return len(self.goats)
+
+    @property
+    def cabbage_count(self):
+        return len(self.cabbages)
+
+    def alpha(self):
+        # Поток публикует снимок раз в шаг, между публикациями доля шага досчитывается по часам
+        elapsed = time.perf_counter() - self.published
+        return min(self.alpha_at_publish + elapsed / self.step_seconds, 1.0)
+
+    def _cabbage_grid(self):
+        # Сетки строятся в окне и только когда понадобились
+        if self.cabbage_index is None:
+            self.cabbage_index = SpatialGrid(self.cell_size)
+            self.cabbage_index.rebuild(self.cabbages)
+            self.max_cabbage_size = max((cabbage.size for cabbage in self.cabbages), default=0)
+        return self.cabbage_index
+
+    def _goat_grid(self):
+        if self.goat_index is None:
+            self.goat_index = SpatialGrid(self.cell_size)
+            self.goat_index.rebuild(self.goats)
+            self.max_goat_size = max((goat.size for goat in self.goats), default=0)
+            self.max_goat_shift = max((max(abs(goat.x - goat.prev_x), abs(goat.y - goat.prev_y)) for goat in self.goats), default=0)
+        return self.goat_index
+
+    def cabbage_at(self, x, y, box=False):
+        grid = self._cabbage_grid()
+        size = self.max_cabbage_size
+        return first_hit(grid.query_rect(x - size, y - size, x, y), x, y, box)
+
+    def goat_at(self, x, y, box=False):
+        grid = self._goat_grid()
+        size = self.max_goat_size
+        return first_hit(grid.query_rect(x - size, y - size, x, y), x, y, box)
+
+    def goats_in_rect(self, left, top, right, bottom):
+        """Козы, которые могут быть нарисованы в прямоугольнике; лишние по краям не мешают."""
+        grid = self._goat_grid()
+        self._cabbage_grid()
+        # Как в Garden.goats_in_rect: половинки при еде и сдвиг между шагами
+        margin = self.max_goat_size + self.max_cabbage_size + self.max_goat_shift
+        return grid.query_rect(left - margin, top - margin, right + margin, bottom + margin)
+
+    def cabbages_in_rect(self, left, top, right, bottom):
+        grid = self._cabbage_grid()
+        size = self.max_cabbage_size
+        return grid.query_rect(left - size, top - size, right, bottom)
+
+
+class SimulationWorker(threading.Thread):
+    """Поток, который шагает огород по FixedStepClock и публикует снимки.
+
+    Окно меняет огород только через submit: команды выполняются в потоке
+    между шагами. Снимки двойной буферизацией: следующий собирается в
+    потоке целиком и подменяет snapshot одним присваиванием, так что окно
+    всегда видит целый кадр. Пока идёт шаг, GIL отдаётся окну каждые
+    sys.getswitchinterval() секунд, поэтому тяжёлый шаг не замораживает
+    интерфейс.
+
+    Исключение в шаге или команде останавливает поток: оно остаётся в error,
+    а snapshot - состоянием огорода на момент сбоя.
+    """
+
+    def __init__(self, garden):
+        super().__init__(daemon=True)
+        self.garden = garden
+        self.clock = FixedStepClock()
+        self.commands = queue.Queue()
+        self.paused = False
+        # Ускорение времени из WARP_LEVELS; окно меняет его вместе с clock.speed
+        self.warp = 1
+        self.running = True
+        self.error = None
+        self.snapshot = Snapshot(garden, 0.0, self.clock.step_seconds)
+
+    def submit(self, method, *args, **kwargs):
+        """Вызвать garden.<method> из COMMANDS в потоке; GoatView и CabbageView заменяются живыми объектами по id."""
+        if method not in COMMANDS:
+            raise ValueError(f"неизвестная команда огорода: {method}")
+        self.commands.put((method, args, kwargs))
+
+    def stop(self):
+        self.running = False
+        self.join()
+
+    def run(self):
+        while self.running:
+            try:
+                self.run_once()
+            except Exception as error:
+                # Поток не умирает молча: окно видит error, последний снимок - огород на момент сбоя
+                traceback.print_exc()
+                self.error = error
+                self.running = False
+                self.snapshot = Snapshot(self.garden, 1.0, self.clock.step_seconds)
+
+    def run_once(self):
+        changed = False
+        try:
+            # Ожидание команды заодно служит паузой между шагами
+            command = self.commands.get(timeout=self.clock.step_seconds / 4)
+            while True:
+                changed = self.apply(command) or changed
+                command = self.commands.get_nowait()
+        except queue.Empty:
+            pass
+
+        if self.paused:
+            self.clock.reset()
+            steps = 0
+        elif self.warp == 1:
+            steps = self.clock.advance()
+            for _ in range(steps):
+                self.garden.step()
+        else:
+            # В ускоренном режиме снимок публикуется раз на пачку шагов
+            steps = self.clock.advance()
+            steps = self.garden.run_for(WARP_BUDGET_MS / 1000, steps if self.warp else None)
+
+        if steps or changed:
+            self.snapshot = Snapshot(self.garden, self.clock.alpha, self.clock.step_seconds)
+
+    def apply(self, command):
+        method, args, kwargs = command
+        if method not in COMMANDS:
+            raise ValueError(f"неизвестная команда огорода: {method}")
+        args = [self.resolve(arg) for arg in args]
+        if any(arg is None for arg in args):
+            # Объект успели съесть или он умер, пока открывалось меню
+            return False
+        getattr(self.garden, method)(*args, **kwargs)
+        return True
+
+    def resolve(self, value):
+        if isinstance(value, GoatView):
+            return self.garden.goats_by_id.get(value.id)
+        if isinstance(value, CabbageView):
+            return self.garden.cabbages_by_id.get(value.id)
+        return value